@@ -16,9 +16,17 @@ from dapmeet.models import user
 from dapmeet.models import meeting
 from dapmeet.models import segment
 from dapmeet.models import chat_message
+from dapmeet.models.segment import SEGMENT_UPSERT_INDEX
 
 target_metadata = Base.metadata
 
+
+def include_object(object, name, type_, reflected, compare_to):
+    # Уникальный индекс режима upsert живёт только в БД, не в моделях
+    if type_ == "index" and name == SEGMENT_UPSERT_INDEX:
+        return False
+    return True
+
 def get_url():
     url = config.get_main_option("sqlalchemy.url")
     if url is None:
@@ -34,6 +42,7 @@ def run_migrations_offline() -> None:
         dialect_opts={"paramstyle": "named"},
         compare_type=True,
         compare_server_default=True,
+        include_object=include_object,
     )
 
     with context.begin_transaction():
@@ -56,6 +65,7 @@ def run_migrations_online() -> None:
             compare_type=True,
             compare_server_default=True,
             render_as_batch=True,
+            include_object=include_object,
         )
 
         with context.begin_transaction():
@@ -0,0 +1,64 @@
+"""segment upsert key
+
+Revision ID: 3cad433c8bbf
+Revises: cbb40db1ed4c
+Create Date: 2026-10-17 09:00:00.000000
+
+Applies only when SEGMENT_STORAGE_MODE=upsert is set for the migration run:
+collapses superseded segment versions and adds the unique key used by
+INSERT ... ON CONFLICT. In append mode the key would reject new versions,
+so the migration is a no-op there; switch later with
+`python -m dapmeet.cmd.segments enable-upsert`.
+"""
+import os
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3cad433c8bbf'
+down_revision: Union[str, None] = 'cbb40db1ed4c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if os.getenv("SEGMENT_STORAGE_MODE", "append").lower() != "upsert":
+        return
+
+    op.execute("""
+        WITH ranked AS (
+            SELECT id,
+                   row_number() OVER (
+                       PARTITION BY session_id, google_meet_user_id, message_id
+                       ORDER BY version DESC, id DESC
+                   ) AS rn,
+                   min(created_at) OVER (
+                       PARTITION BY session_id, google_meet_user_id, message_id
+                   ) AS first_seen
+            FROM transcript_segments
+            WHERE message_id IS NOT NULL
+        ),
+        winners AS (
+            UPDATE transcript_segments t
+            SET created_at = r.first_seen
+            FROM ranked r
+            WHERE t.id = r.id AND r.rn = 1 AND t.created_at <> r.first_seen
+        )
+        DELETE FROM transcript_segments t
+        USING ranked r
+        WHERE t.id = r.id AND r.rn > 1
+    """)
+    op.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_transcript_segments_message "
+        "ON transcript_segments (session_id, google_meet_user_id, message_id)"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Удалённые версии не восстанавливаются, снимаем только ключ
+    op.execute("DROP INDEX IF EXISTS uq_transcript_segments_message")
@@ -0,0 +1,55 @@
+"""transcript segments latest
+
+Revision ID: 7b1e4f2a9c05
+Revises: 3cad433c8bbf
+Create Date: 2026-10-17 09:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7b1e4f2a9c05'
+down_revision: Union[str, None] = '3cad433c8bbf'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('transcript_segments_latest',
+        sa.Column('session_id', sa.String(), nullable=False),
+        sa.Column('google_meet_user_id', sa.String(length=100), nullable=False),
+        sa.Column('message_id', sa.String(length=100), nullable=False),
+        sa.Column('segment_id', sa.Integer(), nullable=False),
+        sa.Column('speaker_username', sa.String(length=100), nullable=False),
+        sa.Column('timestamp', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('text', sa.Text(), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('first_seen_at', sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(['session_id'], ['meetings.unique_session_id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('session_id', 'google_meet_user_id', 'message_id')
+    )
+
+    # Заполняем последними версиями из существующей истории
+    op.execute("""
+        INSERT INTO transcript_segments_latest (
+            session_id, google_meet_user_id, message_id, segment_id, speaker_username,
+            timestamp, text, version, created_at, first_seen_at
+        )
+        SELECT DISTINCT ON (session_id, google_meet_user_id, coalesce(message_id, ''))
+               session_id, google_meet_user_id, coalesce(message_id, ''), id, speaker_username,
+               timestamp, text, version, created_at,
+               min(created_at) OVER (PARTITION BY session_id, google_meet_user_id, coalesce(message_id, ''))
+        FROM transcript_segments
+        ORDER BY session_id, google_meet_user_id, coalesce(message_id, ''), version DESC, id DESC
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('transcript_segments_latest')
@@ -0,0 +1,76 @@
+"""segment composite indexes
+
+Revision ID: d41c6e8b7a20
+Revises: 7b1e4f2a9c05
+Create Date: 2026-10-17 10:00:00.000000
+
+Indexes matched to the hot queries: per-session version lookup, the
+speakers DISTINCT, the admin activity feed and the ordered transcript read.
+Built CONCURRENTLY so ingestion is not blocked on large tables.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd41c6e8b7a20'
+down_revision: Union[str, None] = '7b1e4f2a9c05'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_transcript_segments_session_message_version', 'transcript_segments',
+            ['session_id', 'google_meet_user_id', 'message_id', sa.text('version DESC')],
+            unique=False, postgresql_concurrently=True, if_not_exists=True,
+        )
+        op.create_index(
+            'ix_transcript_segments_session_speaker', 'transcript_segments',
+            ['session_id', 'speaker_username'],
+            unique=False, postgresql_concurrently=True, if_not_exists=True,
+        )
+        op.create_index(
+            'ix_transcript_segments_created_at', 'transcript_segments',
+            [sa.text('created_at DESC')],
+            unique=False, postgresql_concurrently=True, if_not_exists=True,
+        )
+        op.create_index(
+            'ix_transcript_segments_latest_session_order', 'transcript_segments_latest',
+            ['session_id', 'first_seen_at', 'timestamp', 'version'],
+            unique=False, postgresql_concurrently=True, if_not_exists=True,
+        )
+        op.create_index(
+            op.f('ix_meetings_created_at'), 'meetings', ['created_at'],
+            unique=False, postgresql_concurrently=True, if_not_exists=True,
+        )
+
+        # session_id покрывается префиксом составного индекса, а по google_meet_user_id
+        # отдельно никто не фильтрует — оба индекса только замедляли вставку
+        op.drop_index('ix_transcript_segments_session_id', table_name='transcript_segments',
+                      postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_transcript_segments_google_meet_user_id', table_name='transcript_segments',
+                      postgresql_concurrently=True, if_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index('ix_transcript_segments_google_meet_user_id', 'transcript_segments',
+                        ['google_meet_user_id'], unique=False, postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_transcript_segments_session_id', 'transcript_segments',
+                        ['session_id'], unique=False, postgresql_concurrently=True, if_not_exists=True)
+        op.drop_index(op.f('ix_meetings_created_at'), table_name='meetings',
+                      postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_transcript_segments_latest_session_order', table_name='transcript_segments_latest',
+                      postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_transcript_segments_created_at', table_name='transcript_segments',
+                      postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_transcript_segments_session_speaker', table_name='transcript_segments',
+                      postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_transcript_segments_session_message_version', table_name='transcript_segments',
+                      postgresql_concurrently=True, if_exists=True)
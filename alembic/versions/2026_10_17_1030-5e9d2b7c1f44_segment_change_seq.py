@@ -0,0 +1,86 @@
+"""segment change seq
+
+Revision ID: 5e9d2b7c1f44
+Revises: d41c6e8b7a20
+Create Date: 2026-10-17 10:30:00.000000
+
+Adds the change_seq cursor used by GET /api/meetings/{id}/segments/changes.
+The column on transcript_segments is added without a rewrite (default is set
+separately) and is only backfilled in upsert mode, where it is read.
+"""
+import os
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e9d2b7c1f44'
+down_revision: Union[str, None] = 'd41c6e8b7a20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+NEXTVAL = sa.text("nextval('transcript_segment_change_seq')")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE SEQUENCE IF NOT EXISTS transcript_segment_change_seq")
+
+    op.add_column('transcript_segments_latest', sa.Column('change_seq', sa.BigInteger(), nullable=True))
+    op.alter_column('transcript_segments_latest', 'change_seq', server_default=NEXTVAL)
+    op.execute("""
+        UPDATE transcript_segments_latest l
+        SET change_seq = o.seq
+        FROM (
+            SELECT session_id, google_meet_user_id, message_id,
+                   nextval('transcript_segment_change_seq') AS seq
+            FROM (
+                SELECT session_id, google_meet_user_id, message_id
+                FROM transcript_segments_latest
+                ORDER BY first_seen_at, timestamp, version
+            ) ordered
+        ) o
+        WHERE l.session_id = o.session_id
+          AND l.google_meet_user_id = o.google_meet_user_id
+          AND l.message_id = o.message_id
+    """)
+    op.alter_column('transcript_segments_latest', 'change_seq', nullable=False)
+
+    op.add_column('transcript_segments', sa.Column('change_seq', sa.BigInteger(), nullable=True))
+    op.alter_column('transcript_segments', 'change_seq', server_default=NEXTVAL)
+    if os.getenv("SEGMENT_STORAGE_MODE", "append").lower() == "upsert":
+        op.execute("""
+            UPDATE transcript_segments t
+            SET change_seq = o.seq
+            FROM (
+                SELECT id, nextval('transcript_segment_change_seq') AS seq
+                FROM (SELECT id FROM transcript_segments WHERE change_seq IS NULL ORDER BY created_at, id) ordered
+            ) o
+            WHERE t.id = o.id
+        """)
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_transcript_segments_latest_session_change_seq', 'transcript_segments_latest',
+            ['session_id', 'change_seq'],
+            unique=False, postgresql_concurrently=True, if_not_exists=True,
+        )
+        op.create_index(
+            'ix_transcript_segments_session_change_seq', 'transcript_segments',
+            ['session_id', 'change_seq'],
+            unique=False, postgresql_concurrently=True, if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_transcript_segments_session_change_seq', table_name='transcript_segments',
+                      postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_transcript_segments_latest_session_change_seq', table_name='transcript_segments_latest',
+                      postgresql_concurrently=True, if_exists=True)
+    op.drop_column('transcript_segments', 'change_seq')
+    op.drop_column('transcript_segments_latest', 'change_seq')
+    op.execute("DROP SEQUENCE IF EXISTS transcript_segment_change_seq")
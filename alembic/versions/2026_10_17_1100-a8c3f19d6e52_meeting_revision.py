@@ -0,0 +1,30 @@
+"""meeting revision
+
+Revision ID: a8c3f19d6e52
+Revises: 5e9d2b7c1f44
+Create Date: 2026-10-17 11:00:00.000000
+
+Adds meetings.revision, bumped on every transcript write and used as the
+ETag of GET /api/meetings/{id}. A constant default does not rewrite the table.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a8c3f19d6e52'
+down_revision: Union[str, None] = '5e9d2b7c1f44'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('meetings', sa.Column('revision', sa.BigInteger(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('meetings', 'revision')
@@ -0,0 +1,41 @@
+"""meetings user created index
+
+Revision ID: f2b7d04c9e31
+Revises: a8c3f19d6e52
+Create Date: 2026-10-17 11:30:00.000000
+
+Keyset pagination of GET /api/meetings walks (user_id, created_at DESC,
+unique_session_id DESC); the plain user_id index is its prefix and is dropped.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2b7d04c9e31'
+down_revision: Union[str, None] = 'a8c3f19d6e52'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_meetings_user_created', 'meetings',
+            ['user_id', sa.text('created_at DESC'), sa.text('unique_session_id DESC')],
+            unique=False, postgresql_concurrently=True, if_not_exists=True,
+        )
+        op.drop_index(op.f('ix_meetings_user_id'), table_name='meetings',
+                      postgresql_concurrently=True, if_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index(op.f('ix_meetings_user_id'), 'meetings', ['user_id'],
+                        unique=False, postgresql_concurrently=True, if_not_exists=True)
+        op.drop_index('ix_meetings_user_created', table_name='meetings',
+                      postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,45 @@
+"""meeting speakers
+
+Revision ID: 6d0a5e8b3f17
+Revises: f2b7d04c9e31
+Create Date: 2026-10-17 12:00:00.000000
+
+Speakers recorded at write time. The backfill below covers existing history;
+segments written between this migration and the new code going live are
+picked up by `python -m dapmeet.cmd.segments backfill-speakers`.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6d0a5e8b3f17'
+down_revision: Union[str, None] = 'f2b7d04c9e31'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('meeting_speakers',
+        sa.Column('session_id', sa.String(), nullable=False),
+        sa.Column('speaker_username', sa.String(length=100), nullable=False),
+        sa.Column('first_seen_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['session_id'], ['meetings.unique_session_id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('session_id', 'speaker_username')
+    )
+
+    op.execute("""
+        INSERT INTO meeting_speakers (session_id, speaker_username, first_seen_at)
+        SELECT session_id, speaker_username, min(created_at)
+        FROM transcript_segments
+        GROUP BY session_id, speaker_username
+        ON CONFLICT DO NOTHING
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('meeting_speakers')
@@ -0,0 +1,43 @@
+"""meeting base session id
+
+Revision ID: 91e4c7a2b5d8
+Revises: 6d0a5e8b3f17
+Create Date: 2026-10-17 12:30:00.000000
+
+base_session_id is a stored generated column, so Postgres fills it for
+existing rows during ADD COLUMN (a rewrite of the small meetings table) and
+for every insert afterwards, including ones made by the previous release.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '91e4c7a2b5d8'
+down_revision: Union[str, None] = '6d0a5e8b3f17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('meetings', sa.Column(
+        'base_session_id', sa.String(),
+        sa.Computed("meeting_id || '-' || user_id", persisted=True),
+    ))
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_meetings_base_session_created', 'meetings',
+            ['base_session_id', sa.text('created_at DESC')],
+            unique=False, postgresql_concurrently=True, if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_meetings_base_session_created', table_name='meetings',
+                      postgresql_concurrently=True, if_exists=True)
+    op.drop_column('meetings', 'base_session_id')
@@ -0,0 +1,89 @@
+"""partition transcript_segments
+
+Revision ID: e7a94c0b2d16
+Revises: c5f1a7e3d902
+Create Date: 2026-10-17 13:30:00.000000
+
+Converts transcript_segments into a table range-partitioned by created_at,
+one partition per month (UTC), plus a DEFAULT partition as a safety net.
+Partitions cover the existing data and the next PARTITION_MONTHS_AHEAD
+months; later months are created by the application
+(services/segment_partitions.py) or `python -m dapmeet.cmd.segments
+create-partitions`. The primary key becomes (id, created_at).
+
+The rows are copied into the new table under an ACCESS EXCLUSIVE lock, so
+the conversion applies only when SEGMENT_PARTITION_TABLE=1 is set for the
+migration run; otherwise the migration is a no-op and the table stays as is
+(the application works with both layouts). Convert later, in a maintenance
+window with segment ingestion stopped, with
+`python -m dapmeet.cmd.segments partition`.
+
+Refuses to run with SEGMENT_STORAGE_MODE=upsert and is skipped when
+uq_transcript_segments_message exists: a unique index on a partitioned table
+must include created_at, which would break ON CONFLICT on the message key.
+The ORM model keeps describing the unpartitioned table. Written as DO
+blocks so the checks also work with `alembic upgrade --sql`.
+"""
+import os
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from dapmeet.services.segment_partitions import (
+    DROP_SEGMENT_INDEXES_SQL,
+    SEGMENT_INDEXES_SQL,
+    SEGMENT_PARTITION_TABLE,
+    partition_table_sql,
+)
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7a94c0b2d16'
+down_revision: Union[str, None] = 'c5f1a7e3d902'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PARTITION_MONTHS_AHEAD = 2
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if not SEGMENT_PARTITION_TABLE:
+        return
+    if os.getenv("SEGMENT_STORAGE_MODE", "append").lower() == "upsert":
+        raise RuntimeError("SEGMENT_PARTITION_TABLE=1 cannot be combined with SEGMENT_STORAGE_MODE=upsert")
+
+    op.execute(partition_table_sql(PARTITION_MONTHS_AHEAD))
+    # Статистика по партициям нужна оценкам на дашборде и планировщику
+    op.execute("ANALYZE transcript_segments")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute(f"""
+        DO $$
+        DECLARE
+            id_sequence text := pg_get_serial_sequence('transcript_segments', 'id');
+        BEGIN
+            IF (SELECT relkind FROM pg_class WHERE oid = 'transcript_segments'::regclass) <> 'p' THEN
+                RETURN;
+            END IF;
+
+            LOCK TABLE transcript_segments IN ACCESS EXCLUSIVE MODE;
+            ALTER TABLE transcript_segments RENAME TO transcript_segments_partitioned;
+            ALTER TABLE transcript_segments_partitioned
+                RENAME CONSTRAINT transcript_segments_pkey TO transcript_segments_partitioned_pkey;
+            {DROP_SEGMENT_INDEXES_SQL}
+
+            CREATE TABLE transcript_segments (LIKE transcript_segments_partitioned INCLUDING DEFAULTS);
+            INSERT INTO transcript_segments SELECT * FROM transcript_segments_partitioned;
+            ALTER TABLE transcript_segments ADD CONSTRAINT transcript_segments_pkey PRIMARY KEY (id);
+            IF id_sequence IS NOT NULL THEN
+                EXECUTE format('ALTER SEQUENCE %s OWNED BY transcript_segments.id', id_sequence);
+            END IF;
+            -- Отцеплённые ранее партиции сюда не возвращаются
+            DROP TABLE transcript_segments_partitioned;
+            {SEGMENT_INDEXES_SQL}
+        END $$
+    """)
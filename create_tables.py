@@ -18,15 +18,15 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 try:
-    # Импортируем engine и Base.
-    # db.py сам позаботится о загрузке .env и создании engine.
-    from dapmeet.db.db import Base, engine
+    # Импортируем Base и фабрику engine.
+    # db.py сам позаботится о загрузке .env, engine создаётся при вызове get_engine().
+    from dapmeet.db.db import Base, get_engine
     # Импортируем все модели, чтобы они зарегистрировались в Base.metadata
     from dapmeet.models import user, meeting, segment, chat_message
 
     logger.info("Attempting to create all tables in the database...")
     # Создаем все таблицы
-    Base.metadata.create_all(bind=engine)
+    Base.metadata.create_all(bind=get_engine())
     logger.info("Successfully created tables.")
 
 except ImportError as e:
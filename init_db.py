@@ -1,5 +1,5 @@
 # src/dapmeet/db/init_db.py
-from dapmeet.db.db import Base, engine
+from dapmeet.db.db import Base, get_engine
 
 from os import getenv
 from dotenv import load_dotenv
@@ -9,7 +9,7 @@ load_dotenv()
 
 def init_db():
     # создаст ВСЕ таблицы, описанные в Base.metadata, которые ещё не созданы
-    Base.metadata.create_all(bind=engine)
+    Base.metadata.create_all(bind=get_engine())
 
 if __name__ == "__main__":
 
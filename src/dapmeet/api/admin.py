@@ -1,22 +1,34 @@
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Optional
 from datetime import datetime, date
 
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import text, and_, func, select
+from sqlalchemy import text, func, select
 
-from dapmeet.core.deps import get_async_db
+from dapmeet.core.deps import get_async_db, get_segment_buffer
+from dapmeet.core.metrics import request_metrics
+from dapmeet.db.db import get_pool_settings
+from dapmeet.db.pool import pool_metrics
 from dapmeet.services.admin_auth import (
     get_current_admin,
+    require_metrics_access,
     verify_admin_credentials,
     create_admin_jwt,
 )
 from dapmeet.models.user import User
 from dapmeet.models.meeting import Meeting
 from dapmeet.models.segment import TranscriptSegment
-from dapmeet.models.chat_message import ChatMessage
-from dapmeet.models.prompt import Prompt
+from dapmeet.services.activity_metrics import (
+    ACTIVE_USERS_MAX_WINDOW_MINUTES,
+    ACTIVE_USERS_WINDOW_MINUTES,
+    active_users,
+    meetings_per_day,
+)
+from dapmeet.services.admin_metrics import get_dashboard_metrics
+from dapmeet.services.auth import invalidate_cached_user
+from dapmeet.services.segment_buffer import SegmentWriteBuffer
 
 
 router = APIRouter()
@@ -56,21 +68,12 @@ def admin_logout(_: Dict[str, Any] = Depends(get_current_admin)):
 
 
 @router.get("/dashboard/metrics")
-async def dashboard_metrics(_: Dict[str, Any] = Depends(get_current_admin), db: AsyncSession = Depends(get_async_db)):
-    users_count = await db.scalar(select(func.count(User.id)))
-    meetings_count = await db.scalar(select(func.count(Meeting.unique_session_id)))
-    segments_count = await db.scalar(select(func.count(TranscriptSegment.id)))
-    messages_count = await db.scalar(select(func.count(ChatMessage.id)))
-    admin_prompts_count = await db.scalar(select(func.count(Prompt.id)).where(Prompt.prompt_type == "admin"))
-    user_prompts_count = await db.scalar(select(func.count(Prompt.id)).where(Prompt.prompt_type == "user"))
-    return {
-        "users": users_count,
-        "meetings": meetings_count,
-        "segments": segments_count,
-        "chat_messages": messages_count,
-        "admin_prompts": admin_prompts_count,
-        "user_prompts": user_prompts_count,
-    }
+async def dashboard_metrics(
+    exact: bool = Query(False, description="Точные COUNT(*) вместо оценок по статистике Postgres"),
+    _: Dict[str, Any] = Depends(get_current_admin),
+    db: AsyncSession = Depends(get_async_db),
+):
+    return await get_dashboard_metrics(db, exact=exact)
 
 
 @router.get("/dashboard/activity-feed")
@@ -114,15 +117,24 @@ def dashboard_system_health(_: Dict[str, Any] = Depends(get_current_admin)):
     return {"status": "ok"}
 
 
-# Real-time metrics (placeholders — can be wired to real telemetry later)
+# Real-time metrics (in-memory, per worker — see services/activity_metrics.py)
 @router.get("/metrics/users/active")
-def metrics_users_active(_: Dict[str, Any] = Depends(get_current_admin)):
-    return {"active_users": 0}
+def metrics_users_active(
+    minutes: int = Query(ACTIVE_USERS_WINDOW_MINUTES, ge=1, le=ACTIVE_USERS_MAX_WINDOW_MINUTES),
+    _: Dict[str, Any] = Depends(get_current_admin),
+):
+    """Оценка числа разных пользователей с запросами за последние `minutes` минут."""
+    return {
+        "active_users": active_users.count(minutes),
+        "window_minutes": minutes,
+        "since": active_users.since,
+    }
 
 
 @router.get("/metrics/meetings/today")
 def metrics_meetings_today(_: Dict[str, Any] = Depends(get_current_admin)):
-    return {"meetings_today": 0}
+    """Встречи, созданные за текущие сутки (UTC) с момента `since`."""
+    return {"meetings_today": meetings_per_day.get(), "since": meetings_per_day.since}
 
 
 @router.get("/metrics/ai/usage")
@@ -132,7 +144,32 @@ def metrics_ai_usage(_: Dict[str, Any] = Depends(get_current_admin)):
 
 @router.get("/metrics/system/performance")
 def metrics_system_performance(_: Dict[str, Any] = Depends(get_current_admin)):
-    return {"latency_ms_p50": 0, "latency_ms_p95": 0}
+    """Задержки, частота запросов и доля ошибок по маршрутам (для этого воркера)."""
+    return request_metrics.snapshot()
+
+
+@router.get("/metrics/prometheus", response_class=PlainTextResponse)
+def metrics_prometheus(_: None = Depends(require_metrics_access)):
+    return PlainTextResponse(
+        request_metrics.render_prometheus() + pool_metrics.render_prometheus(),
+        media_type="text/plain; version=0.0.4",
+    )
+
+
+@router.get("/metrics/db/pool")
+def metrics_db_pool(_: Dict[str, Any] = Depends(get_current_admin)):
+    """Состояние пула соединений этого воркера: занятость, ожидание соединения, таймауты."""
+    return {"settings": get_pool_settings(), **pool_metrics.snapshot()}
+
+
+@router.get("/metrics/segments/buffer")
+def metrics_segment_buffer(
+    segment_buffer: Optional[SegmentWriteBuffer] = Depends(get_segment_buffer),
+    _: Dict[str, Any] = Depends(get_current_admin),
+):
+    if segment_buffer is None:
+        return {"enabled": False}
+    return segment_buffer.stats()
 
 
 # =====================
@@ -237,6 +274,7 @@ async def update_user(
     db.add(user)
     await db.commit()
     await db.refresh(user)
+    invalidate_cached_user(user.id)
     return {
         "id": user.id,
         "email": user.email,
@@ -1,16 +1,25 @@
+from datetime import datetime, timezone
+from typing import Optional
+
 from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.security import HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
 import httpx
 
 from dapmeet.core.deps import get_async_db, get_http_client
-from dapmeet.schemas.auth import CodePayload
+from dapmeet.models.user import User
+from dapmeet.schemas.auth import CodePayload, LogoutPayload, RefreshPayload
+from dapmeet.services.auth import decode_token, oauth2_scheme, verify_access_token
 from dapmeet.services.google_auth_service import (
+    ACCESS_TOKEN_TTL_SECONDS,
     authenticate_with_google_token,
     exchange_code_for_token,
     get_google_user_info,
     find_or_create_user,
-    generate_jwt
+    generate_jwt,
+    generate_refresh_token,
 )
+from dapmeet.services.token_revocation import token_revocations
 
 router = APIRouter()
 
@@ -25,7 +34,12 @@ async def google_auth(
     user = await find_or_create_user(user_info, db)
     jwt_token = generate_jwt(user_info)
 
-    return {"access_token": jwt_token, "user": user_info}
+    return {
+        "access_token": jwt_token,
+        "refresh_token": generate_refresh_token(user.id),
+        "expires_in": ACCESS_TOKEN_TTL_SECONDS,
+        "user": user_info,
+    }
 
 @router.post("/validate")
 async def validate_chrome_extension_auth(
@@ -45,9 +59,62 @@ async def validate_chrome_extension_auth(
     
     return {
         "token": jwt_token,
+        "refresh_token": generate_refresh_token(user.id),
+        "expires_in": ACCESS_TOKEN_TTL_SECONDS,
         "user": {
             "id": user.id,
             "email": user.email,
             "name": user.name
         }
-    }
\ No newline at end of file
+    }
+
+
+def _expires_at(claims: dict) -> datetime:
+    return datetime.fromtimestamp(claims["exp"], tz=timezone.utc)
+
+
+@router.post("/refresh")
+async def refresh_tokens(
+    payload: RefreshPayload,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Обменивает refresh token на новую пару токенов. Старый refresh token
+    отзывается (ротация): повторное использование того же токена даёт 401.
+    """
+    claims = decode_token(payload.refresh_token, token_type="refresh")
+    if not await token_revocations.revoke(claims["jti"], _expires_at(claims), db):
+        raise HTTPException(status_code=401, detail="Token has been revoked")
+
+    user = await db.get(User, claims["sub"])
+    if not user:
+        raise HTTPException(status_code=401, detail="User not found")
+
+    user_info = {"id": user.id, "email": user.email, "name": user.name or ""}
+    return {
+        "access_token": generate_jwt(user_info),
+        "refresh_token": generate_refresh_token(user.id),
+        "token_type": "bearer",
+        "expires_in": ACCESS_TOKEN_TTL_SECONDS,
+    }
+
+
+@router.post("/logout")
+async def logout(
+    payload: Optional[LogoutPayload] = None,
+    token: HTTPAuthorizationCredentials = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Отзывает текущий access token и, если передан, refresh token."""
+    claims = await verify_access_token(token.credentials, db)
+    # У токенов, выданных до появления jti, отзывать нечего — они истекут сами
+    if claims.get("jti") and claims.get("exp"):
+        await token_revocations.revoke(claims["jti"], _expires_at(claims), db)
+
+    if payload is not None and payload.refresh_token:
+        refresh_claims = decode_token(payload.refresh_token, token_type="refresh")
+        if refresh_claims["sub"] != claims["sub"]:
+            raise HTTPException(status_code=403, detail="Refresh token belongs to another user")
+        await token_revocations.revoke(refresh_claims["jti"], _expires_at(refresh_claims), db)
+
+    return {"status": "ok"}
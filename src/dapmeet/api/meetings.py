@@ -1,58 +1,181 @@
-from fastapi import APIRouter, HTTPException, Depends
+import asyncio
+import base64
+import json
+import logging
+from typing import Literal, Optional, Union
+
+from fastapi import APIRouter, HTTPException, Depends, Header, Query, Request, Response, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import noload
-from sqlalchemy import select, desc
+from sqlalchemy import select
 from dapmeet.models.user import User
 from dapmeet.models.meeting import Meeting
-from dapmeet.models.segment import TranscriptSegment
-from dapmeet.services.auth import get_current_user
-from dapmeet.core.deps import get_async_db
+from dapmeet.services.auth import (
+    STREAM_TICKET_TTL_SECONDS,
+    generate_stream_ticket,
+    get_current_user,
+    get_current_user_id,
+    redeem_stream_ticket,
+    verify_access_token,
+)
+from dapmeet.core.deps import get_async_db, get_segment_buffer
+from dapmeet.db.db import get_async_sessionmaker
 from dapmeet.services.meetings import MeetingService
-from dapmeet.schemas.meetings import MeetingCreate, MeetingOut, MeetingPatch, MeetingOutList
-from dapmeet.schemas.segment import TranscriptSegmentCreate, TranscriptSegmentOut
+from dapmeet.services.segment_buffer import SegmentWriteBuffer
+from dapmeet.services.segment_events import segment_events
+from dapmeet.schemas.auth import StreamTicketOut
+from dapmeet.schemas.meetings import MeetingCreate, MeetingOut, MeetingOutList, MeetingSummaryOut
+from dapmeet.schemas.segment import (
+    TranscriptSegmentCreate,
+    TranscriptSegmentBatchCreate,
+    TranscriptSegmentFrame,
+    TranscriptSegmentOut,
+    TranscriptSegmentChangesOut,
+    TranscriptSegmentsQueuedOut,
+)
 from datetime import datetime, timezone, timedelta
-from sqlalchemy import select
-from sqlalchemy.orm import selectinload
+
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
+# Размер страницы списка встреч, если передан cursor без limit
+MEETINGS_PAGE_SIZE = 50
+MEETINGS_MAX_PAGE_SIZE = 200
+
+# Микробатчи WebSocket-потока: сбрасываем накопленные кадры либо по таймеру,
+# либо как только набралось WS_FLUSH_MAX_FRAMES.
+WS_FLUSH_INTERVAL_SECONDS = 0.25
+WS_FLUSH_MAX_FRAMES = 100
+
+# SSE-поток: комментарий-keepalive, чтобы прокси не закрывали простаивающее соединение
+SSE_KEEPALIVE_SECONDS = 15.0
+SSE_BATCH_LIMIT = 500
+
+def _encode_meetings_cursor(meeting: MeetingOutList) -> str:
+    raw = json.dumps([meeting.created_at.isoformat(), meeting.unique_session_id])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_meetings_cursor(cursor: str) -> tuple[datetime, str]:
+    try:
+        created_at, session_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(created_at), session_id
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
 @router.get("/", response_model=list[MeetingOutList])
 async def get_meetings(
-    user: User = Depends(get_current_user), 
+    response: Response,
+    limit: Optional[int] = Query(
+        None, ge=1, le=MEETINGS_MAX_PAGE_SIZE,
+        description="Page size; without limit and cursor all meetings are returned",
+    ),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
+    user_id: str = Depends(get_current_user_id), 
     db: AsyncSession = Depends(get_async_db)
 ):
+    """
+    Встречи пользователя, от новых к старым. Без limit и cursor — весь список,
+    как раньше; с limit (или cursor) — постранично, и если есть следующая
+    страница, её курсор приходит в заголовке X-Next-Cursor.
+    """
     meeting_service = MeetingService(db)
-    return await meeting_service.get_meetings_with_speakers(user.id)
+    if limit is None and cursor is None:
+        return await meeting_service.get_meetings_with_speakers(user_id)
+
+    limit = limit or MEETINGS_PAGE_SIZE
+    after = _decode_meetings_cursor(cursor) if cursor else None
+    # Берём на одну встречу больше, чтобы понять, есть ли следующая страница
+    meetings = await meeting_service.get_meetings_with_speakers(user_id, limit=limit + 1, after=after)
+    if len(meetings) > limit:
+        meetings = meetings[:limit]
+        response.headers["X-Next-Cursor"] = _encode_meetings_cursor(meetings[-1])
+    return meetings
     
-@router.post("/", response_model=MeetingOut)
+@router.post("/", response_model=Union[MeetingOut, MeetingSummaryOut])
 async def create_or_get_meeting(
     data: MeetingCreate,
+    view: Literal["full", "summary"] = Query(
+        "full", description="summary: metadata, segment_count and cursor instead of the transcript"
+    ),
     db: AsyncSession = Depends(get_async_db),
     user: User = Depends(get_current_user),
 ):
     meeting_service = MeetingService(db)
-    meeting = await meeting_service.get_or_create_meeting(meeting_data=data, user=user)
+    meeting, created = await meeting_service.get_or_create_meeting(meeting_data=data, user=user)
 
-    # Re-load with segments eagerly fetched so Pydantic won't trigger IO later
-    stmt = (
-        select(Meeting)
-        .options(selectinload(Meeting.segments))  # <- key line
-        .where(Meeting.unique_session_id == meeting.unique_session_id)
+    # Лёгкий ответ для переподключения расширения: без транскрипта,
+    # недостающие сегменты клиент дочитывает по курсору
+    if view == "summary":
+        segment_count, cursor = (0, 0) if created else await meeting_service.get_segment_summary(
+            meeting.unique_session_id
+        )
+        return MeetingSummaryOut(
+            unique_session_id=meeting.unique_session_id,
+            meeting_id=meeting.meeting_id,
+            user_id=meeting.user_id,
+            title=meeting.title,
+            created_at=meeting.created_at,
+            segment_count=segment_count,
+            cursor=cursor,
+        )
+
+    # У только что созданной встречи сегментов нет — обходимся без второго запроса
+    segments = [] if created else await meeting_service.get_latest_segments_for_session(
+        session_id=meeting.unique_session_id
+    )
+    return MeetingOut(
+        unique_session_id=meeting.unique_session_id,
+        meeting_id=meeting.meeting_id,
+        user_id=meeting.user_id,
+        title=meeting.title,
+        created_at=meeting.created_at,
+        segments=[TranscriptSegmentOut.model_validate(segment, from_attributes=True) for segment in segments],
     )
-    result = await db.execute(stmt)
-    meeting_loaded = result.scalar_one()
-    return meeting_loaded
+
+
+def _meeting_etag(meeting: Meeting) -> str:
+    """Сильный ETag транскрипта: меняется при каждой записи сегментов встречи."""
+    return f'"{meeting.unique_session_id}.{meeting.revision}"'
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(candidate.strip().removeprefix("W/") == etag for candidate in if_none_match.split(","))
+
+
+def _not_modified_or_tag(meeting: Meeting, if_none_match: Optional[str], response: Response) -> Optional[Response]:
+    """Возвращает 304, если у клиента актуальная версия, иначе проставляет ETag в ответ."""
+    etag = _meeting_etag(meeting)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
 
 
 @router.get("/{meeting_id}", response_model=MeetingOut)
-async def get_meeting(meeting_id: str, user: User = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
+async def get_meeting(
+    meeting_id: str,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    user_id: str = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_async_db),
+):
     meeting_service = MeetingService(db)
-    session_id = f"{meeting_id}-{user.id}"
+    session_id = f"{meeting_id}-{user_id}"
     
     # Get the meeting and verify ownership
     result = await db.execute(
         select(Meeting).where(
             Meeting.unique_session_id == session_id,
-            Meeting.user_id == user.id,
+            Meeting.user_id == user_id,
         ).limit(1)
     )
     meeting = result.scalar_one_or_none()
@@ -60,17 +183,16 @@ async def get_meeting(meeting_id: str, user: User = Depends(get_current_user), d
     if not meeting:
         raise HTTPException(status_code=404, detail="Meeting not found")
 
-    
+    # Транскрипт не менялся с прошлого запроса — отвечаем 304 без чтения сегментов
+    not_modified = _not_modified_or_tag(meeting, if_none_match, response)
+    if not_modified is not None:
+        return not_modified
+
     # Get segments for this meeting
     segments = await meeting_service.get_latest_segments_for_session(session_id=session_id)
     
     # Get speakers for this specific meeting
-    speakers_result = await db.execute(
-        select(TranscriptSegment.speaker_username)
-        .where(TranscriptSegment.session_id == session_id)
-        .distinct()
-    )
-    meeting_speakers = speakers_result.scalars().all()
+    meeting_speakers = await meeting_service.get_speakers(session_id)
     
     # Convert segments to schemas - ADD from_attributes=True
     segments_out = [TranscriptSegmentOut.model_validate(segment, from_attributes=True) for segment in segments]
@@ -90,27 +212,125 @@ async def get_meeting(meeting_id: str, user: User = Depends(get_current_user), d
 
 
 
+@router.get("/{meeting_id}/segments/changes", response_model=TranscriptSegmentChangesOut)
+async def get_segment_changes(
+    meeting_id: str,
+    response: Response,
+    since: int = Query(0, ge=0, description="Cursor from the previous response; 0 returns the whole transcript"),
+    limit: int = Query(500, ge=1, le=1000, description="Maximum number of segments to return"),
+    if_none_match: Optional[str] = Header(None),
+    user_id: str = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Инкрементальная выдача транскрипта: только сегменты, добавленные или
+    перезаписанные новой версией после курсора, и новый курсор для следующего опроса.
+    """
+    meeting_service = MeetingService(db)
+    meeting = await meeting_service.get_meeting_by_session_id(session_id=meeting_id, user_id=user_id)
+    if not meeting:
+        raise HTTPException(status_code=404, detail="Meeting not found")
+
+    not_modified = _not_modified_or_tag(meeting, if_none_match, response)
+    if not_modified is not None:
+        return not_modified
+
+    segments, cursor, has_more = await meeting_service.get_segment_changes(
+        session_id=meeting.unique_session_id, since=since, limit=limit
+    )
+    return TranscriptSegmentChangesOut(
+        segments=[TranscriptSegmentOut.model_validate(segment, from_attributes=True) for segment in segments],
+        cursor=cursor,
+        has_more=has_more,
+    )
+
+
+@router.get("/{meeting_id}/segments/stream")
+async def stream_segment_changes(
+    request: Request,
+    meeting_id: str,
+    since: Optional[int] = Query(None, ge=0, description="Cursor to resume from; defaults to Last-Event-ID or 0"),
+    ticket: Optional[str] = Query(None, description="One-time ticket from POST /{meeting_id}/stream-ticket"),
+    token: Optional[str] = Query(None, deprecated=True),
+    last_event_id: Optional[int] = Header(None, alias="Last-Event-ID"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Server-Sent Events с живым транскриптом встречи.
+
+    Каждое событие `segments` содержит TranscriptSegmentChangesOut, а его id —
+    курсор change_seq, поэтому EventSource после обрыва сам продолжает с места
+    остановки через Last-Event-ID. Новые данные дочитываются по уведомлению
+    от segment_events сразу после коммита записи.
+
+    EventSource не умеет слать заголовки, поэтому авторизация — одноразовым
+    билетом из POST /{meeting_id}/stream-ticket (?ticket=). Автоматическое
+    переподключение с тем же URL получит 401 и остановит EventSource: клиент
+    по onerror берёт новый билет и открывает поток заново с ?since=<id
+    последнего события>. ?token= и заголовок Authorization оставлены для
+    старых клиентов.
+    """
+    user_id = await _stream_user_id(meeting_id, ticket, token, request.headers.get("Authorization"), db)
+    meeting = await MeetingService(db).get_meeting_by_session_id(session_id=meeting_id, user_id=user_id)
+    if not meeting:
+        raise HTTPException(status_code=404, detail="Meeting not found")
+    session_id = meeting.unique_session_id
+    cursor = since if since is not None else (last_event_id or 0)
+    # Соединение из пула на всё время потока не держим: каждое чтение — своя сессия
+    await db.commit()
+
+    session_factory = get_async_sessionmaker()
+
+    async def events():
+        nonlocal cursor
+        # Подписываемся до первого чтения, чтобы не потерять запись между ними
+        async with segment_events.subscribe(session_id) as changed:
+            while True:
+                has_more = True
+                while has_more:
+                    async with session_factory() as stream_db:
+                        segments, cursor, has_more = await MeetingService(stream_db).get_segment_changes(
+                            session_id=session_id, since=cursor, limit=SSE_BATCH_LIMIT
+                        )
+                    if not segments:
+                        break
+                    payload = TranscriptSegmentChangesOut(
+                        segments=[TranscriptSegmentOut.model_validate(segment, from_attributes=True) for segment in segments],
+                        cursor=cursor,
+                        has_more=has_more,
+                    )
+                    yield f"id: {cursor}\nevent: segments\ndata: {payload.model_dump_json()}\n\n"
+
+                try:
+                    await asyncio.wait_for(changed.wait(), SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        return
+                    yield ": keepalive\n\n"
+                changed.clear()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get("/{meeting_id}/info", response_model=MeetingOutList)
 async def get_meeting_info(
     meeting_id: str,
-    user: User = Depends(get_current_user),
+    user_id: str = Depends(get_current_user_id),
     db: AsyncSession = Depends(get_async_db),
 ):
     """
     Возвращает последнюю актуальную встречу (< 24 часов).
     Если встречи нет или последняя >= 24 часов назад — 404.
     """
-    base_session_id = f"{meeting_id}-{user.id}"
+    base_session_id = f"{meeting_id}-{user_id}"
     now_utc = datetime.now(timezone.utc)
 
     # Берём самую свежую встречу для base_session_id (с учётом возможных суффиксов даты)
-    result = await db.execute(
-        select(Meeting)
-        .where(Meeting.unique_session_id.like(f"{base_session_id}%"))
-        .order_by(desc(Meeting.created_at))
-        .limit(1)
-    )
-    last_meeting = result.scalar_one_or_none()
+    last_meeting = await MeetingService(db).get_latest_meeting(base_session_id)
 
     if not last_meeting:
         raise HTTPException(status_code=404, detail="Meeting not found")
@@ -124,39 +344,217 @@ async def get_meeting_info(
     # Актуальная — возвращаем
     return last_meeting
 
+# Ответ при включённой отложенной записи вместо 201 с сохранёнными сегментами
+SEGMENTS_QUEUED_RESPONSES = {
+    202: {"model": TranscriptSegmentsQueuedOut, "description": "Segments queued for write-behind"},
+}
+
 @router.post("/{meeting_id}/segments", 
     response_model=TranscriptSegmentOut, 
-    status_code=201,)
+    status_code=201,
+    responses=SEGMENTS_QUEUED_RESPONSES,)
 async def add_segment(
     meeting_id: str,
     seg_in: TranscriptSegmentCreate,
-    user: User = Depends(get_current_user),
+    user_id: str = Depends(get_current_user_id),
     db: AsyncSession = Depends(get_async_db),
+    segment_buffer: Optional[SegmentWriteBuffer] = Depends(get_segment_buffer),
 ):
     
     # Проверяем, что встреча существует и принадлежит текущему пользователю
     meeting_service = MeetingService(db)
-    meeting = await meeting_service.get_meeting_by_session_id(session_id=meeting_id, user_id=user.id)
+    meeting = await meeting_service.get_meeting_by_session_id(session_id=meeting_id, user_id=user_id)
     if not meeting:
         raise HTTPException(status_code=404, detail="Meeting not found")
-    session_id = meeting.unique_session_id
+
+    # При включённой отложенной записи только ставим сегмент в очередь
+    rows = meeting_service.build_segment_rows(meeting.unique_session_id, [seg_in])
+    if segment_buffer is not None and segment_buffer.enqueue(rows):
+        return JSONResponse(status_code=202, content=TranscriptSegmentsQueuedOut(queued=len(rows)).model_dump())
+
     # Создаем новый сегмент с переданными данными
-    segment = TranscriptSegment(
-        session_id=session_id,
-        google_meet_user_id=seg_in.google_meet_user_id,
-        speaker_username=seg_in.username,
-        timestamp=seg_in.timestamp,
-        text=seg_in.text,
-        version=seg_in.ver,
-        message_id=seg_in.mess_id
-    )
-    
-    db.add(segment)
-    await db.commit()
-    await db.refresh(segment)
+    [segment] = await meeting_service.insert_segment_rows(rows)
     return segment
 
 
+@router.post("/{meeting_id}/segments/batch",
+    response_model=list[TranscriptSegmentOut],
+    status_code=201,
+    responses=SEGMENTS_QUEUED_RESPONSES,)
+async def add_segments_batch(
+    meeting_id: str,
+    batch_in: TranscriptSegmentBatchCreate,
+    user_id: str = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_async_db),
+    segment_buffer: Optional[SegmentWriteBuffer] = Depends(get_segment_buffer),
+):
+    """
+    Пакетная загрузка сегментов: встреча проверяется один раз,
+    все сегменты пишутся одним INSERT в одной транзакции.
+    """
+    meeting_service = MeetingService(db)
+    meeting = await meeting_service.get_meeting_by_session_id(session_id=meeting_id, user_id=user_id)
+    if not meeting:
+        raise HTTPException(status_code=404, detail="Meeting not found")
+
+    rows = meeting_service.build_segment_rows(meeting.unique_session_id, batch_in.segments)
+    if segment_buffer is not None and segment_buffer.enqueue(rows):
+        return JSONResponse(status_code=202, content=TranscriptSegmentsQueuedOut(queued=len(rows)).model_dump())
+
+    return await meeting_service.insert_segment_rows(rows)
+
+
+def _bearer_token(token: Optional[str], auth_header: Optional[str]) -> Optional[str]:
+    """Токен из query-параметра или заголовка Authorization (для WebSocket и SSE)."""
+    if token is None and auth_header and auth_header.startswith("Bearer "):
+        token = auth_header.split(" ")[1]
+    return token
+
+
+async def _stream_user_id(
+    meeting_id: str,
+    ticket: Optional[str],
+    token: Optional[str],
+    auth_header: Optional[str],
+    db: AsyncSession,
+) -> str:
+    """
+    Пользователь потока: по одноразовому билету (?ticket=), иначе по access token
+    из заголовка Authorization или ?token= (устаревший способ, оставлен для старых клиентов).
+    """
+    if ticket is not None:
+        return (await redeem_stream_ticket(ticket, meeting_id, db))["sub"]
+    token = _bearer_token(token, auth_header)
+    if not token:
+        raise HTTPException(status_code=401, detail="Missing token")
+    return (await verify_access_token(token, db))["sub"]
+
+
+@router.post("/{meeting_id}/stream-ticket", response_model=StreamTicketOut)
+async def create_stream_ticket(
+    meeting_id: str,
+    user_id: str = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Одноразовый билет на подключение к /segments/ws или /segments/stream этой встречи
+    (?ticket=). Живёт STREAM_TICKET_TTL_SECONDS; на каждое (пере)подключение нужен новый.
+    """
+    meeting = await MeetingService(db).get_meeting_by_session_id(session_id=meeting_id, user_id=user_id)
+    if not meeting:
+        raise HTTPException(status_code=404, detail="Meeting not found")
+    return StreamTicketOut(ticket=generate_stream_ticket(user_id, meeting_id), expires_in=STREAM_TICKET_TTL_SECONDS)
+
+
+def _frame_seq(raw: str) -> Optional[int]:
+    """Достаёт seq из невалидного кадра, чтобы клиент понял, какой кадр отклонён."""
+    try:
+        seq = json.loads(raw).get("seq")
+    except (ValueError, AttributeError):
+        return None
+    return seq if isinstance(seq, int) else None
+
+
+@router.websocket("/{meeting_id}/segments/ws")
+async def stream_segments(
+    websocket: WebSocket,
+    meeting_id: str,
+    ticket: Optional[str] = Query(None, description="One-time ticket from POST /{meeting_id}/stream-ticket"),
+    token: Optional[str] = Query(None, deprecated=True),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Потоковая загрузка сегментов по WebSocket.
+
+    Аутентификация и поиск встречи выполняются один раз при подключении:
+    по билету из POST /{meeting_id}/stream-ticket (?ticket=), по заголовку
+    Authorization или, для старых клиентов, по ?token=. Затем каждый кадр —
+    это TranscriptSegmentFrame; кадры копятся и пишутся пачками через
+    MeetingService.add_segments, после чего клиенту уходит список ack'ов —
+    по одному {"seq", "status": "ok", "id"} или {"seq", "status": "error", "detail"}
+    на каждый кадр пачки. Бинарный кадр получает ack с ошибкой. Принятые, но ещё
+    не записанные кадры сохраняются при любом завершении соединения.
+    """
+    meeting_service = MeetingService(db)
+    try:
+        user_id = await _stream_user_id(meeting_id, ticket, token, websocket.headers.get("Authorization"), db)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    meeting = await meeting_service.get_meeting_by_session_id(session_id=meeting_id, user_id=user_id)
+    if not meeting:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    session_id = meeting.unique_session_id
+    # Завершаем транзакцию, чтобы не держать соединение из пула между пачками
+    await db.commit()
+
+    await websocket.accept()
+
+    loop = asyncio.get_running_loop()
+    pending: list[TranscriptSegmentFrame] = []
+    flush_deadline = 0.0
+
+    async def flush(send_acks: bool = True) -> None:
+        frames = pending[:]
+        pending.clear()
+        try:
+            segments = await meeting_service.add_segments(session_id=session_id, segments=frames)
+        except Exception:
+            await db.rollback()
+            logger.exception(f"Failed to store {len(frames)} streamed segments for {session_id}")
+            if send_acks:
+                await websocket.send_json([
+                    {"seq": frame.seq, "status": "error", "detail": "Failed to store segment"}
+                    for frame in frames
+                ])
+            return
+        if send_acks:
+            await websocket.send_json([
+                {"seq": frame.seq, "status": "ok", "id": segment.id}
+                for frame, segment in zip(frames, segments)
+            ])
+
+    try:
+        while True:
+            timeout = max(flush_deadline - loop.time(), 0) if pending else None
+            try:
+                message = await asyncio.wait_for(websocket.receive(), timeout)
+            except asyncio.TimeoutError:
+                await flush()
+                continue
+            if message["type"] == "websocket.disconnect":
+                break
+            raw = message.get("text")
+            if raw is None:
+                # Кадры — JSON-текст; бинарный кадр отклоняем, не закрывая поток
+                await websocket.send_json([
+                    {"seq": None, "status": "error", "detail": "Binary frames are not supported"}
+                ])
+                continue
+
+            try:
+                frame = TranscriptSegmentFrame.model_validate_json(raw)
+            except ValidationError as e:
+                await websocket.send_json([
+                    {"seq": _frame_seq(raw), "status": "error", "detail": e.errors(include_url=False, include_context=False, include_input=False)}
+                ])
+                continue
+
+            if not pending:
+                flush_deadline = loop.time() + WS_FLUSH_INTERVAL_SECONDS
+            pending.append(frame)
+            if len(pending) >= WS_FLUSH_MAX_FRAMES:
+                await flush()
+    except WebSocketDisconnect:
+        # Клиент ушёл, пока мы отправляли ack
+        pass
+    finally:
+        # Клиент ушёл или обработчик упал — сохраняем то, что успели принять, без подтверждений
+        if pending:
+            await flush(send_acks=False)
+
+
 # @router.get("/test/segments/{session_id}", response_model=list[TranscriptSegmentOut])
 # def get_test_segments(session_id: str, db: Session = Depends(get_db)):
 #     """
@@ -27,6 +27,7 @@ def setup_paths():
 setup_paths()
 
 # Теперь можно импортировать модули
+import logging
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
@@ -38,6 +39,14 @@ load_dotenv()
 
 # Импортируем роутер после настройки всех путей
 from dapmeet.api import api_router as main_router
+from dapmeet.core.log_filters import RedactQuerySecretsFilter
+from dapmeet.core.metrics import RequestMetricsMiddleware, request_metrics
+from dapmeet.core.query_metrics import instrument_engine
+from dapmeet.db.db import DATABASE_URL_ASYNC, dispose_async_engine, get_async_engine, init_async_engine
+from dapmeet.services.segment_buffer import SegmentWriteBuffer
+from dapmeet.services.segment_events import segment_events, start_segment_events
+from dapmeet.services.segment_partitions import segment_partitions
+from dapmeet.services.token_revocation import token_revocations
 
 
 @asynccontextmanager
@@ -47,13 +56,37 @@ async def lifespan(app: FastAPI):
         timeout=httpx.Timeout(10.0),
         limits=httpx.Limits(max_keepalive_connections=50, max_connections=100)
     )
+    # Startup: async engine and session factory (drivers are not imported before this)
+    session_factory = init_async_engine()
+    if session_factory is not None:
+        # Per-request SQL accounting and slow-query log
+        instrument_engine(get_async_engine().sync_engine)
+    # Startup: pub/sub for live transcript streams (in-process or Postgres LISTEN/NOTIFY)
+    await start_segment_events(DATABASE_URL_ASYNC)
+    # Startup: periodic reload of the revoked-token filter
+    token_revocations.start(session_factory)
+    # Startup: monthly transcript_segments partitions ahead of time
+    segment_partitions.start(session_factory)
+    # Startup: optional write-behind buffer for transcript segments
+    app.state.segment_buffer = SegmentWriteBuffer.from_env(session_factory)
+    if app.state.segment_buffer is not None:
+        app.state.segment_buffer.start()
     try:
         yield
     finally:
-        # Shutdown: close HTTP client
+        # Shutdown: drain buffered segments, then stop pub/sub and close HTTP client
+        if app.state.segment_buffer is not None:
+            await app.state.segment_buffer.stop()
+        await segment_events.stop()
+        await token_revocations.stop()
+        await segment_partitions.stop()
         await app.state.http_client.aclose()
+        await dispose_async_engine()
 
 
+# ?token= и ?ticket= маршрутов WebSocket и SSE не должны попадать в access-логи
+logging.getLogger("uvicorn.access").addFilter(RedactQuerySecretsFilter())
+
 app = FastAPI(
     title="Dapmeet API",
     description="API for Dapmeet meeting transcription service",
@@ -67,7 +100,10 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor", "X-DB-Queries", "X-DB-Time-Ms", "X-DB-Rows"],
 )
+# Outermost: latency histograms and SQL accounting per route for /admin/metrics/*
+app.add_middleware(RequestMetricsMiddleware, metrics=request_metrics)
 
 app.include_router(main_router)
 
@@ -0,0 +1,285 @@
+# Служебные команды для таблицы transcript_segments.
+#
+#   python -m dapmeet.cmd.segments collapse [--batch-size 500]
+#       Удаляет устаревшие версии сегментов (оставляет старшую версию каждой
+#       реплики с временем первого появления). Работает пачками по сессиям,
+#       поэтому его можно запускать на живой базе перед переключением режима.
+#
+#   python -m dapmeet.cmd.segments rebuild-latest [--batch-size 500]
+#       Пересобирает transcript_segments_latest из истории версий. Нужен при
+#       возврате из режима upsert в append (в upsert таблица не ведётся).
+#
+#   python -m dapmeet.cmd.segments backfill-speakers [--batch-size 500]
+#       Дописывает в meeting_speakers спикеров из истории сегментов. Идемпотентна;
+#       запускать после деплоя, чтобы подхватить записи, сделанные старым кодом.
+#
+#   python -m dapmeet.cmd.segments enable-upsert
+#       collapse + CREATE UNIQUE INDEX CONCURRENTLY для SEGMENT_STORAGE_MODE=upsert.
+#       Запускать, когда запись сегментов остановлена или уже идёт в режиме upsert,
+#       иначе новые версии будут мешать построению индекса. На секционированной
+#       таблице недоступен.
+#
+#   python -m dapmeet.cmd.segments partition [--months-ahead 2]
+#       Переводит transcript_segments на помесячные партиции (то же, что миграция
+#       e7a94c0b2d16 при SEGMENT_PARTITION_TABLE=1). Строки копируются под
+#       ACCESS EXCLUSIVE блокировкой: запускать в окно обслуживания с остановленной
+#       записью сегментов. Повторный запуск ничего не делает.
+#
+#   python -m dapmeet.cmd.segments create-partitions [--months-ahead 2]
+#       Создаёт помесячные партиции на текущий и следующие месяцы (то же делает
+#       приложение в фоне). Нужен, если приложение долго не запускалось.
+#
+#   python -m dapmeet.cmd.segments detach-partitions --before YYYY-MM
+#       Отцепляет партиции за месяцы раньше указанного. Они остаются обычными
+#       таблицами transcript_segments_pYYYY_MM: их можно выгрузить pg_dump и удалить.
+#       Транскрипты встреч при этом не теряются — последние версии хранятся в
+#       transcript_segments_latest, уходит только история версий.
+
+import argparse
+import logging
+import sys
+from datetime import datetime
+
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+
+from dapmeet.db.db import get_engine
+from dapmeet.models.segment import SEGMENT_UPSERT_INDEX
+from dapmeet.services.segment_partitions import (
+    IS_PARTITIONED_SQL,
+    PARTITIONS_SQL,
+    SEGMENT_PARTITION_MONTHS_AHEAD,
+    SEGMENTS_TABLE,
+    ensure_segment_partitions_sync,
+    parse_partition_month,
+    partition_table_sql,
+)
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Переносим created_at первой версии на победившую строку и удаляем остальные версии.
+COLLAPSE_SQL = text("""
+    WITH ranked AS (
+        SELECT id,
+               row_number() OVER (
+                   PARTITION BY session_id, google_meet_user_id, message_id
+                   ORDER BY version DESC, id DESC
+               ) AS rn,
+               min(created_at) OVER (
+                   PARTITION BY session_id, google_meet_user_id, message_id
+               ) AS first_seen
+        FROM transcript_segments
+        WHERE session_id = ANY(:session_ids) AND message_id IS NOT NULL
+    ),
+    winners AS (
+        UPDATE transcript_segments t
+        SET created_at = r.first_seen
+        FROM ranked r
+        WHERE t.id = r.id AND r.rn = 1 AND t.created_at <> r.first_seen
+    )
+    DELETE FROM transcript_segments t
+    USING ranked r
+    WHERE t.id = r.id AND r.rn > 1
+""")
+
+# Последняя версия каждой реплики; конфликт с параллельной записью решается в пользу старшей версии.
+REBUILD_LATEST_SQL = text("""
+    INSERT INTO transcript_segments_latest (
+        session_id, google_meet_user_id, message_id, segment_id, speaker_username,
+        timestamp, text, version, created_at, first_seen_at
+    )
+    SELECT DISTINCT ON (session_id, google_meet_user_id, coalesce(message_id, ''))
+           session_id, google_meet_user_id, coalesce(message_id, ''), id, speaker_username,
+           timestamp, text, version, created_at,
+           min(created_at) OVER (PARTITION BY session_id, google_meet_user_id, coalesce(message_id, ''))
+    FROM transcript_segments
+    WHERE session_id = ANY(:session_ids)
+    ORDER BY session_id, google_meet_user_id, coalesce(message_id, ''), version DESC, id DESC
+    ON CONFLICT (session_id, google_meet_user_id, message_id) DO UPDATE
+    SET segment_id = excluded.segment_id,
+        speaker_username = excluded.speaker_username,
+        timestamp = excluded.timestamp,
+        text = excluded.text,
+        version = excluded.version,
+        created_at = excluded.created_at,
+        first_seen_at = least(transcript_segments_latest.first_seen_at, excluded.first_seen_at),
+        change_seq = nextval('transcript_segment_change_seq')
+    WHERE excluded.version >= transcript_segments_latest.version
+""")
+
+# Курсор change_seq для строк, записанных до включения режима upsert.
+BACKFILL_CHANGE_SEQ_SQL = text("""
+    UPDATE transcript_segments t
+    SET change_seq = o.seq
+    FROM (
+        SELECT id, nextval('transcript_segment_change_seq') AS seq
+        FROM (
+            SELECT id FROM transcript_segments
+            WHERE session_id = ANY(:session_ids) AND change_seq IS NULL
+            ORDER BY created_at, id
+        ) ordered
+    ) o
+    WHERE t.id = o.id
+""")
+
+BACKFILL_SPEAKERS_SQL = text("""
+    INSERT INTO meeting_speakers (session_id, speaker_username, first_seen_at)
+    SELECT session_id, speaker_username, min(created_at)
+    FROM transcript_segments
+    WHERE session_id = ANY(:session_ids)
+    GROUP BY session_id, speaker_username
+    ON CONFLICT DO NOTHING
+""")
+
+SESSIONS_SQL = text("""
+    SELECT DISTINCT session_id FROM transcript_segments
+    WHERE session_id > :after
+    ORDER BY session_id
+    LIMIT :limit
+""")
+
+
+def _for_session_batches(statement, batch_size: int, action: str) -> int:
+    """Выполняет statement пачками по batch_size сессий, каждая пачка — своя транзакция."""
+    affected = 0
+    after = ""
+    while True:
+        with get_engine().begin() as conn:
+            session_ids = conn.execute(SESSIONS_SQL, {"after": after, "limit": batch_size}).scalars().all()
+            if not session_ids:
+                break
+            result = conn.execute(statement, {"session_ids": list(session_ids)})
+            affected += result.rowcount or 0
+        after = session_ids[-1]
+        logger.info(f"{action} sessions up to {after!r}: {affected} rows so far")
+    return affected
+
+
+def collapse(batch_size: int) -> int:
+    """Схлопывает версии сегментов. Возвращает число удалённых строк."""
+    return _for_session_batches(COLLAPSE_SQL, batch_size, "Collapsed")
+
+
+def rebuild_latest(batch_size: int) -> int:
+    """Пересобирает transcript_segments_latest. Возвращает число записанных строк."""
+    return _for_session_batches(REBUILD_LATEST_SQL, batch_size, "Rebuilt latest segments for")
+
+
+def backfill_speakers(batch_size: int) -> int:
+    """Заполняет meeting_speakers. Возвращает число добавленных спикеров."""
+    return _for_session_batches(BACKFILL_SPEAKERS_SQL, batch_size, "Backfilled speakers for")
+
+
+def partition_table(months_ahead: int) -> None:
+    """Переводит transcript_segments на помесячные партиции."""
+    with get_engine().connect() as conn:
+        if conn.execute(IS_PARTITIONED_SQL).scalar():
+            logger.info(f"{SEGMENTS_TABLE} is already partitioned")
+            return
+        if conn.execute(text(f"SELECT to_regclass('{SEGMENT_UPSERT_INDEX}') IS NOT NULL")).scalar():
+            raise RuntimeError(
+                f"{SEGMENT_UPSERT_INDEX} exists (upsert mode): a partitioned table cannot keep "
+                "a unique key without created_at"
+            )
+    with get_engine().begin() as conn:
+        conn.execute(text(partition_table_sql(months_ahead)))
+    with get_engine().connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text(f"ANALYZE {SEGMENTS_TABLE}"))
+
+
+def create_partitions(months_ahead: int) -> list[str]:
+    """Создаёт недостающие партиции. Возвращает имена созданных."""
+    with get_engine().begin() as conn:
+        if not conn.execute(IS_PARTITIONED_SQL).scalar():
+            raise RuntimeError(f"{SEGMENTS_TABLE} is not partitioned; run the partition command first")
+        return ensure_segment_partitions_sync(conn, months_ahead)
+
+
+def detach_partitions(before: str) -> list[str]:
+    """Отцепляет помесячные партиции старше месяца before (YYYY-MM). Возвращает их имена."""
+    cutoff = datetime.strptime(before, "%Y-%m").date()
+    detached = []
+    with get_engine().connect() as conn:
+        names = sorted(conn.execute(PARTITIONS_SQL).scalars().all())
+    for name in names:
+        month = parse_partition_month(name)
+        if month is None or month >= cutoff:
+            continue
+        # Каждая партиция — отдельная короткая транзакция под блокировкой родителя
+        with get_engine().begin() as conn:
+            conn.execute(text(f"ALTER TABLE {SEGMENTS_TABLE} DETACH PARTITION {name}"))
+        detached.append(name)
+        logger.info(f"Detached {name}")
+    return detached
+
+
+def enable_upsert(batch_size: int, attempts: int = 3) -> None:
+    """Готовит таблицу к режиму upsert и строит уникальный индекс без блокировки записи."""
+    with get_engine().connect() as conn:
+        if conn.execute(IS_PARTITIONED_SQL).scalar():
+            raise RuntimeError(
+                f"{SEGMENTS_TABLE} is partitioned: a unique key without created_at is impossible, "
+                "keep SEGMENT_STORAGE_MODE=append"
+            )
+    for attempt in range(1, attempts + 1):
+        collapse(batch_size)
+        _for_session_batches(BACKFILL_CHANGE_SEQ_SQL, batch_size, "Assigned change_seq for")
+        try:
+            with get_engine().connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                conn.execute(text(
+                    f"CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS {SEGMENT_UPSERT_INDEX} "
+                    "ON transcript_segments (session_id, google_meet_user_id, message_id)"
+                ))
+            logger.info(f"Unique index {SEGMENT_UPSERT_INDEX} is ready; set SEGMENT_STORAGE_MODE=upsert")
+            return
+        except IntegrityError:
+            # Пока строили индекс, пришли новые версии: убираем невалидный индекс и повторяем
+            logger.warning(f"New duplicate versions appeared during index build (attempt {attempt}/{attempts})")
+            with get_engine().connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {SEGMENT_UPSERT_INDEX}"))
+    raise RuntimeError("Could not build the unique index; stop segment ingestion and retry.")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="transcript_segments maintenance commands")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    for name in ("collapse", "rebuild-latest", "backfill-speakers", "enable-upsert"):
+        subparser = subparsers.add_parser(name)
+        subparser.add_argument("--batch-size", type=int, default=500, help="Sessions per transaction")
+    for name in ("partition", "create-partitions"):
+        subparser = subparsers.add_parser(name)
+        subparser.add_argument("--months-ahead", type=int, default=SEGMENT_PARTITION_MONTHS_AHEAD,
+                               help="Months after the current one to create partitions for")
+    subparser = subparsers.add_parser("detach-partitions")
+    subparser.add_argument("--before", required=True, help="Detach monthly partitions older than YYYY-MM")
+    args = parser.parse_args()
+
+    try:
+        if args.command == "collapse":
+            deleted = collapse(args.batch_size)
+            logger.info(f"Done: {deleted} superseded segment rows removed")
+        elif args.command == "rebuild-latest":
+            written = rebuild_latest(args.batch_size)
+            logger.info(f"Done: {written} latest segment rows written")
+        elif args.command == "backfill-speakers":
+            added = backfill_speakers(args.batch_size)
+            logger.info(f"Done: {added} meeting speakers added")
+        elif args.command == "enable-upsert":
+            enable_upsert(args.batch_size)
+        elif args.command == "partition":
+            partition_table(args.months_ahead)
+            logger.info(f"Done: {SEGMENTS_TABLE} is partitioned")
+        elif args.command == "create-partitions":
+            created = create_partitions(args.months_ahead)
+            logger.info(f"Done: {len(created)} partitions created {created}")
+        elif args.command == "detach-partitions":
+            detached = detach_partitions(args.before)
+            logger.info(f"Done: {len(detached)} partitions detached")
+    except Exception as e:
+        logger.error(f"Command {args.command} failed: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,9 @@
-from fastapi import Depends, Request
-from sqlalchemy.orm import Session
-from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import Request
 import httpx
-from dapmeet.db.db import SessionLocal, AsyncSessionLocal
+from dapmeet.db.db import get_async_sessionmaker, get_session_local
 
 def get_db():
-    db = SessionLocal()
+    db = get_session_local()()
     try:
         yield db
     finally:
@@ -13,13 +11,19 @@ def get_db():
 
 
 async def get_async_db():
-    if AsyncSessionLocal is None:
+    session_factory = get_async_sessionmaker()
+    if session_factory is None:
         # Подсказка разработчику: требуется переменная окружения DATABASE_URL_ASYNC
         raise RuntimeError("Async session factory is not initialized. Set DATABASE_URL_ASYNC to a valid asyncpg DSN.")
-    async with AsyncSessionLocal() as session:  # type: AsyncSession
+    async with session_factory() as session:  # type: AsyncSession
         yield session
 
 
 def get_http_client(request: Request) -> httpx.AsyncClient:
     """Get the shared HTTP client from app state"""
     return request.app.state.http_client
+
+
+def get_segment_buffer(request: Request):
+    """Get the write-behind segment buffer from app state (None when disabled)"""
+    return getattr(request.app.state, "segment_buffer", None)
@@ -0,0 +1,37 @@
+import hashlib
+import math
+
+
+class HyperLogLog:
+    """
+    Оценка числа различных строк в фиксированной памяти (2^precision байт).
+    Стандартная ошибка ~1.04 / sqrt(2^precision): 1.6% при precision=12.
+    Экземпляры с одинаковой точностью объединяются через merge().
+    """
+
+    def __init__(self, precision: int = 12):
+        self.precision = precision
+        self.size = 1 << precision
+        self.registers = bytearray(self.size)
+
+    def add(self, item: str) -> None:
+        value = int.from_bytes(hashlib.blake2b(item.encode(), digest_size=8).digest(), "big")
+        index = value >> (64 - self.precision)
+        rest_bits = 64 - self.precision
+        # Позиция первой единицы в оставшихся битах (1, если старший бит уже единица)
+        rank = rest_bits - (value & ((1 << rest_bits) - 1)).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other: "HyperLogLog") -> None:
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def count(self) -> int:
+        size = self.size
+        alpha = 0.7213 / (1 + 1.079 / size)
+        estimate = alpha * size * size / sum(2.0 ** -register for register in self.registers)
+        zeros = self.registers.count(0)
+        # На малых множествах точнее linear counting по пустым регистрам
+        if estimate <= 2.5 * size and zeros:
+            estimate = size * math.log(size / zeros)
+        return int(round(estimate))
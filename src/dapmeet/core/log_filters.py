@@ -0,0 +1,23 @@
+import logging
+import re
+
+# Значения параметров, которые нельзя писать в access log
+_SECRET_QUERY_RE = re.compile(r"([?&](?:token|ticket)=)[^&\s]*")
+
+
+def redact_query_secrets(value: str) -> str:
+    return _SECRET_QUERY_RE.sub(r"\1***", value)
+
+
+class RedactQuerySecretsFilter(logging.Filter):
+    """
+    Маскирует ?token=/?ticket= в строках uvicorn.access. Аргументы записи
+    uvicorn: (client_addr, method, full_path, http_version, status_code).
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if isinstance(record.args, tuple):
+            record.args = tuple(
+                redact_query_secrets(arg) if isinstance(arg, str) else arg for arg in record.args
+            )
+        return True
@@ -0,0 +1,248 @@
+import time
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from dapmeet.core.query_metrics import DEBUG, QueryStats, current_query_stats
+
+# Лог-линейные корзины (как в HDR Histogram): каждая степень двойки от 2^-4 мс
+# до 2^17 мс (~2 мин) делится на SUB_BUCKETS равных частей — относительная
+# погрешность квантилей не больше 1/SUB_BUCKETS.
+SUB_BUCKETS = 8
+BUCKET_BOUNDS_MS: List[float] = [
+    2.0 ** exponent * (1 + step / SUB_BUCKETS)
+    for exponent in range(-4, 17)
+    for step in range(1, SUB_BUCKETS + 1)
+]
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class LatencyHistogram:
+    """
+    Гистограмма задержек с фиксированными корзинами. Обновляется только из
+    event loop своего воркера, поэтому обходится без блокировок.
+    """
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_BOUNDS_MS) + 1)
+        self.count = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, duration_ms: float) -> None:
+        self.counts[bisect_left(BUCKET_BOUNDS_MS, duration_ms)] += 1
+        self.count += 1
+        self.sum_ms += duration_ms
+        if duration_ms > self.max_ms:
+            self.max_ms = duration_ms
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        for index, value in enumerate(other.counts):
+            self.counts[index] += value
+        self.count += other.count
+        self.sum_ms += other.sum_ms
+        self.max_ms = max(self.max_ms, other.max_ms)
+
+    def quantile(self, q: float) -> float:
+        """Верхняя граница корзины, в которую попал q-квантиль (не больше максимума)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, value in enumerate(self.counts):
+            seen += value
+            if seen >= rank and value:
+                bound = BUCKET_BOUNDS_MS[index] if index < len(BUCKET_BOUNDS_MS) else self.max_ms
+                return min(bound, self.max_ms)
+        return self.max_ms
+
+
+class RouteStats:
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        self.status_classes: Dict[str, int] = {"2xx": 0, "3xx": 0, "4xx": 0, "5xx": 0}
+        self.db_queries = 0
+        self.db_time_ms = 0.0
+        self.db_rows = 0
+        self.db_queries_max = 0
+
+    def record(self, status_code: int, duration_ms: float, queries: Optional[QueryStats] = None) -> None:
+        self.latency.record(duration_ms)
+        status_class = f"{min(max(status_code // 100, 2), 5)}xx"
+        self.status_classes[status_class] += 1
+        if queries is not None:
+            self.add_queries(queries.count, queries.time_ms, queries.rows, queries.count)
+
+    def add_queries(self, count: int, time_ms: float, rows: int, max_count: int) -> None:
+        self.db_queries += count
+        self.db_time_ms += time_ms
+        self.db_rows += rows
+        self.db_queries_max = max(self.db_queries_max, max_count)
+
+    def summary(self, uptime: float) -> dict:
+        count = self.latency.count
+        return {
+            "requests": count,
+            "requests_per_second": round(count / uptime, 3) if uptime else 0.0,
+            "error_rate": round(self.status_classes["5xx"] / count, 4) if count else 0.0,
+            "client_error_rate": round(self.status_classes["4xx"] / count, 4) if count else 0.0,
+            "latency_ms_mean": round(self.latency.sum_ms / count, 2) if count else 0.0,
+            "latency_ms_p50": round(self.latency.quantile(0.5), 2),
+            "latency_ms_p95": round(self.latency.quantile(0.95), 2),
+            "latency_ms_p99": round(self.latency.quantile(0.99), 2),
+            "latency_ms_max": round(self.latency.max_ms, 2),
+            "status": dict(self.status_classes),
+            "db_queries_per_request": round(self.db_queries / count, 2) if count else 0.0,
+            "db_queries_max": self.db_queries_max,
+            "db_time_ms_per_request": round(self.db_time_ms / count, 2) if count else 0.0,
+            "db_rows_per_request": round(self.db_rows / count, 2) if count else 0.0,
+        }
+
+
+class RequestMetrics:
+    """Счётчики и гистограммы задержек по маршрутам (шаблон пути, не конкретный URL)."""
+
+    def __init__(self):
+        self.started_at = time.monotonic()
+        self.routes: Dict[Tuple[str, str], RouteStats] = {}
+
+    def record(
+        self,
+        method: str,
+        route: str,
+        status_code: int,
+        duration_ms: float,
+        queries: Optional[QueryStats] = None,
+    ) -> None:
+        stats = self.routes.get((method, route))
+        if stats is None:
+            stats = self.routes[(method, route)] = RouteStats()
+        stats.record(status_code, duration_ms, queries)
+
+    def uptime(self) -> float:
+        return time.monotonic() - self.started_at
+
+    def snapshot(self) -> dict:
+        uptime = self.uptime()
+        total = RouteStats()
+        for stats in self.routes.values():
+            total.latency.merge(stats.latency)
+            for status_class, value in stats.status_classes.items():
+                total.status_classes[status_class] += value
+            total.add_queries(stats.db_queries, stats.db_time_ms, stats.db_rows, stats.db_queries_max)
+        routes = [
+            {"method": method, "route": route, **stats.summary(uptime)}
+            for (method, route), stats in self.routes.items()
+        ]
+        routes.sort(key=lambda item: item["requests"], reverse=True)
+        return {"uptime_seconds": round(uptime, 1), **total.summary(uptime), "routes": routes}
+
+    def render_prometheus(self) -> str:
+        """Текстовый формат Prometheus: summary по задержкам и счётчик запросов."""
+        lines = [
+            "# HELP http_request_duration_seconds Time to response start by route (per worker).",
+            "# TYPE http_request_duration_seconds summary",
+        ]
+        for (method, route), stats in sorted(self.routes.items()):
+            labels = f'method="{method}",route="{_escape(route)}"'
+            for q in QUANTILES:
+                lines.append(
+                    f'http_request_duration_seconds{{{labels},quantile="{q}"}} {stats.latency.quantile(q) / 1000:.6f}'
+                )
+            lines.append(f"http_request_duration_seconds_sum{{{labels}}} {stats.latency.sum_ms / 1000:.6f}")
+            lines.append(f"http_request_duration_seconds_count{{{labels}}} {stats.latency.count}")
+        lines += [
+            "# HELP http_requests_total Requests by route and status class (per worker).",
+            "# TYPE http_requests_total counter",
+        ]
+        for (method, route), stats in sorted(self.routes.items()):
+            labels = f'method="{method}",route="{_escape(route)}"'
+            for status_class, value in stats.status_classes.items():
+                lines.append(f'http_requests_total{{{labels},status="{status_class}"}} {value}')
+        lines += [
+            "# HELP http_request_db_queries_total SQL statements executed while serving requests (per worker).",
+            "# TYPE http_request_db_queries_total counter",
+        ]
+        for (method, route), stats in sorted(self.routes.items()):
+            lines.append(
+                f'http_request_db_queries_total{{method="{method}",route="{_escape(route)}"}} {stats.db_queries}'
+            )
+        lines += [
+            "# HELP http_request_db_seconds_total Time spent in SQL statements while serving requests (per worker).",
+            "# TYPE http_request_db_seconds_total counter",
+        ]
+        for (method, route), stats in sorted(self.routes.items()):
+            lines.append(
+                f'http_request_db_seconds_total{{method="{method}",route="{_escape(route)}"}} {stats.db_time_ms / 1000:.6f}'
+            )
+        lines += [
+            "# HELP process_uptime_seconds Seconds since this worker started collecting metrics.",
+            "# TYPE process_uptime_seconds gauge",
+            f"process_uptime_seconds {self.uptime():.1f}",
+        ]
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"')
+
+
+class RequestMetricsMiddleware:
+    """
+    ASGI middleware: замеряет время обработки HTTP-запроса и пишет его в
+    RequestMetrics под шаблоном маршрута (scope["route"].path), чтобы
+    /api/meetings/{meeting_id} не плодил метку на каждую встречу.
+    Задержка считается до начала ответа (http.response.start): иначе SSE и
+    другие потоковые ответы, живущие минутами, забивали бы p95/p99. Вместе с
+    задержкой учитываются SQL-запросы (см. query_metrics); при DEBUG
+    их число, время и строки отдаются в заголовках ответа.
+    """
+
+    def __init__(self, app: ASGIApp, metrics: RequestMetrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        response_started: Optional[float] = None
+        status_code: Optional[int] = None
+        queries = QueryStats(scope)
+        token = current_query_stats.set(queries)
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal response_started, status_code
+            if message["type"] == "http.response.start":
+                response_started = time.perf_counter()
+                status_code = message["status"]
+                if DEBUG:
+                    # Запросы после начала ответа (стриминг) в заголовки уже не попадут
+                    headers = MutableHeaders(scope=message)
+                    headers["X-DB-Queries"] = str(queries.count)
+                    headers["X-DB-Time-Ms"] = f"{queries.time_ms:.2f}"
+                    headers["X-DB-Rows"] = str(queries.rows)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception:
+            status_code = 500
+            raise
+        finally:
+            current_query_stats.reset(token)
+            self.metrics.record(
+                scope["method"],
+                queries.route or "unmatched",
+                status_code or 500,
+                ((response_started or time.perf_counter()) - started) * 1000,
+                queries,
+            )
+
+
+request_metrics = RequestMetrics()
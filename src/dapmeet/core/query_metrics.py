@@ -0,0 +1,105 @@
+# Учёт SQL-запросов по HTTP-запросам.
+#
+# Обработчики событий SQLAlchemy (before/after_cursor_execute) на async engine
+# замеряют каждый запрос и прибавляют его к QueryStats текущего HTTP-запроса,
+# который RequestMetricsMiddleware кладёт в contextvar. SQLAlchemy выполняет
+# курсор в greenlet того же таска, поэтому contextvar там виден. Запросы вне
+# HTTP-запроса (фоновые задачи, CLI) не учитываются, но попадают в лог
+# медленных запросов.
+
+import logging
+import os
+import re
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger("dapmeet.sql")
+
+# Запросы дольше порога пишутся в лог (0 — отключить)
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+# В режиме отладки ответы получают заголовки X-DB-Queries / X-DB-Time-Ms / X-DB-Rows
+DEBUG = os.getenv("DEBUG", "").lower() in ("1", "true", "yes")
+SLOW_QUERY_MAX_CHARS = 2000
+
+
+class QueryStats:
+    __slots__ = ("count", "time_ms", "rows", "scope")
+
+    def __init__(self, scope: Optional[dict] = None):
+        self.count = 0
+        self.time_ms = 0.0
+        self.rows = 0
+        # ASGI scope запроса: роутер дописывает в него маршрут, он нужен логу
+        self.scope = scope
+
+    @property
+    def route(self) -> Optional[str]:
+        return getattr((self.scope or {}).get("route"), "path", None)
+
+
+current_query_stats: ContextVar[Optional[QueryStats]] = ContextVar("current_query_stats", default=None)
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"(?<![\w$])-?\d+(?:\.\d+)?\b")
+# IN ($1, $2, ...) / VALUES (...), (...) с разным числом параметров — один шаблон.
+# asyncpg приводит параметры к типу: $1::VARCHAR, $4::TIMESTAMP WITH TIME ZONE, $2::VARCHAR[]
+_PARAM = r"(?:\$\d+|%\(\w+\)s|\?|:\w+)(?:::\w+(?: \w+)*(?:\([^()]*\))?(?:\[\])*)?"
+_PARAM_LIST_RE = re.compile(rf"\((?:\s*{_PARAM}\s*,)+\s*{_PARAM}\s*\)")
+_VALUES_LIST_RE = re.compile(r"(VALUES \(\.\.\.\))(?:, \(\.\.\.\))+", re.IGNORECASE)
+
+
+def normalize_statement(statement: str) -> str:
+    """Текст запроса без литералов и с одинаковыми списками параметров — для группировки в логах."""
+    normalized = _WHITESPACE_RE.sub(" ", statement).strip()
+    normalized = _STRING_RE.sub("?", normalized)
+    normalized = _NUMBER_RE.sub("?", normalized)
+    normalized = _PARAM_LIST_RE.sub("(...)", normalized)
+    normalized = _VALUES_LIST_RE.sub(r"\1", normalized)
+    return normalized[:SLOW_QUERY_MAX_CHARS]
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_started"].pop()
+    duration_ms = (time.perf_counter() - started) * 1000
+    # Для SELECT/RETURNING драйвер отдаёт число строк в rowcount (asyncpg — из статуса команды)
+    rows = max(cursor.rowcount, 0) if cursor.description is not None else 0
+
+    stats = current_query_stats.get()
+    if stats is not None:
+        stats.count += 1
+        stats.time_ms += duration_ms
+        stats.rows += rows
+
+    if SLOW_QUERY_MS and duration_ms >= SLOW_QUERY_MS:
+        logger.warning(
+            "Slow query %.1f ms (rows=%d, route=%s): %s",
+            duration_ms,
+            rows,
+            (stats.route if stats is not None else None) or "-",
+            normalize_statement(statement),
+        )
+
+
+def _handle_error(exception_context):
+    # Запрос упал — убираем его отметку времени, чтобы стек не разъехался
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_started"):
+        conn.info["query_started"].pop()
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Подключает учёт запросов к engine (для async — к engine.sync_engine). Повторный вызов безопасен."""
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
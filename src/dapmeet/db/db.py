@@ -1,20 +1,23 @@
 # Этот файл является центральной точкой для конфигурации базы данных.
 # Он отвечает за:
 # 1. Загрузку переменных окружения из файла .env (с помощью python-dotenv).
-# 2. Создание SQLAlchemy `engine`, который является точкой входа к базе данных.
-# 3. Создание `SessionLocal` для управления сессиями.
+# 2. Ленивое создание SQLAlchemy engine'ов (get_engine / init_async_engine),
+#    которые являются точкой входа к базе данных.
+# 3. Фабрики сессий (get_session_local / get_async_sessionmaker).
 # 4. Определение `Base` для декларативных моделей SQLAlchemy.
 #
 # Любая часть приложения, которой нужен доступ к БД, должна импортировать
 # объекты из этого файла.
 
 import os
-from sqlalchemy import create_engine
+from typing import Optional
+
+from sqlalchemy.engine import Engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
 from sqlalchemy.ext.asyncio import (
-    create_async_engine,
+    AsyncEngine,
     async_sessionmaker,
     AsyncSession,
 )
@@ -26,31 +29,89 @@ load_dotenv()
 DATABASE_URL = os.getenv("DATABASE_URL")
 DATABASE_URL_ASYNC = os.getenv("DATABASE_URL_ASYNC")
 
-# Проверяем, что переменная установлена
-if DATABASE_URL is None:
-    raise ValueError("DATABASE_URL environment variable not set. Please create a .env file or set it manually.")
-
-# Для async-режима требуется отдельный DSN с asyncpg-драйвером
-if DATABASE_URL_ASYNC is None:
-    # Разрешаем отсутствовать на раннем этапе миграции — но укажем подсказку
-    # Реальное использование async-сессии упадет без этой переменной
-    DATABASE_URL_ASYNC = None
+# Настройки пула async engine (на один воркер)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# Сколько соединений приложению можно открыть суммарно на всех воркерах
+# (max_connections Postgres минус резерв под миграции, админку и LISTEN-соединения).
+# 0 — без ограничения. WEB_CONCURRENCY — число воркеров uvicorn (uvicorn читает его же).
+DB_MAX_CONNECTIONS = int(os.getenv("DB_MAX_CONNECTIONS", "0"))
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
 
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
-# Async engine/session (используется постепенно)
-async_engine = None
-AsyncSessionLocal = None
+# Движки создаются лениво: импорт моделей и приложения не подключает драйверы БД.
+# Синхронный (psycopg2) нужен только скриптам и CLI, асинхронный создаётся в lifespan.
+_engine: Optional[Engine] = None
+_session_local: Optional[sessionmaker] = None
+_async_engine: Optional[AsyncEngine] = None
+_async_session_local: Optional[async_sessionmaker] = None
+
+
+def get_engine() -> Engine:
+    """Синхронный engine для скриптов, CLI и Alembic-подобных задач."""
+    global _engine
+    if _engine is None:
+        # Проверяем, что переменная установлена
+        if DATABASE_URL is None:
+            raise ValueError("DATABASE_URL environment variable not set. Please create a .env file or set it manually.")
+        from sqlalchemy import create_engine
+
+        _engine = create_engine(DATABASE_URL)
+    return _engine
+
+
+def get_session_local() -> sessionmaker:
+    global _session_local
+    if _session_local is None:
+        _session_local = sessionmaker(autocommit=False, autoflush=False, bind=get_engine())
+    return _session_local
+
+
+def get_pool_settings() -> dict:
+    """
+    Размер пула на воркер: DB_POOL_SIZE/DB_MAX_OVERFLOW, урезанные так, чтобы
+    WEB_CONCURRENCY воркеров вместе не превысили DB_MAX_CONNECTIONS.
+    """
+    pool_size, max_overflow = DB_POOL_SIZE, DB_MAX_OVERFLOW
+    workers = max(WEB_CONCURRENCY, 1)
+    per_worker_limit = None
+    if DB_MAX_CONNECTIONS > 0:
+        per_worker_limit = max(DB_MAX_CONNECTIONS // workers, 1)
+        pool_size = min(pool_size, per_worker_limit)
+        max_overflow = max(min(max_overflow, per_worker_limit - pool_size), 0)
+    return {
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "workers": workers,
+        "max_connections": DB_MAX_CONNECTIONS or None,
+        "per_worker_limit": per_worker_limit,
+    }
+
 
-if DATABASE_URL_ASYNC:
+def init_async_engine() -> Optional[async_sessionmaker]:
+    """
+    Создаёт async engine и фабрику сессий (вызывается из lifespan приложения).
+    Без DATABASE_URL_ASYNC возвращает None — реальное использование async-сессии упадет.
+    """
+    global _async_engine, _async_session_local
+    if _async_session_local is not None or not DATABASE_URL_ASYNC:
+        return _async_session_local
+
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    from dapmeet.db.pool import InstrumentedAsyncPool
+
+    pool_settings = get_pool_settings()
     # Add SSL for production (Render requires it)
     engine_kwargs = {
         "pool_pre_ping": True,
-        "pool_size": 10,  # Reduced for Render's resource limits
-        "max_overflow": 10,  # Reduced for Render's resource limits
-        "pool_timeout": 30,  # Timeout for getting connection from pool
+        "poolclass": InstrumentedAsyncPool,  # Checkout wait / timeout telemetry
+        "pool_size": pool_settings["pool_size"],
+        "max_overflow": pool_settings["max_overflow"],
+        "pool_timeout": pool_settings["pool_timeout"],  # Timeout for getting connection from pool
     }
     
     # Add SSL for production databases (Render requires it)
@@ -60,9 +121,41 @@ if DATABASE_URL_ASYNC:
         # Render databases require SSL even for internal connections
         engine_kwargs["connect_args"] = {"sslmode": "require"}
     
-    async_engine = create_async_engine(DATABASE_URL_ASYNC, **engine_kwargs)
-    AsyncSessionLocal = async_sessionmaker(
-        async_engine,
+    _async_engine = create_async_engine(DATABASE_URL_ASYNC, **engine_kwargs)
+    _async_session_local = async_sessionmaker(
+        _async_engine,
         expire_on_commit=False,
         class_=AsyncSession,
     )
+    return _async_session_local
+
+
+def get_async_engine() -> Optional[AsyncEngine]:
+    init_async_engine()
+    return _async_engine
+
+
+def get_async_sessionmaker() -> Optional[async_sessionmaker]:
+    """Фабрика async-сессий; вне приложения (скрипты) создаётся при первом обращении."""
+    return init_async_engine()
+
+
+async def dispose_async_engine() -> None:
+    global _async_engine, _async_session_local
+    if _async_engine is not None:
+        await _async_engine.dispose()
+    _async_engine = None
+    _async_session_local = None
+
+
+def __getattr__(name: str):
+    # Совместимость со старыми импортами `from dapmeet.db.db import engine, AsyncSessionLocal`
+    if name == "engine":
+        return get_engine()
+    if name == "SessionLocal":
+        return get_session_local()
+    if name == "async_engine":
+        return get_async_engine()
+    if name == "AsyncSessionLocal":
+        return get_async_sessionmaker()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,133 @@
+# Пул соединений async engine с телеметрией.
+#
+# InstrumentedAsyncPool замеряет, сколько запрос ждал соединение из пула
+# (включая открытие нового, если пул ещё не заполнен), сколько заняло само
+# открытие соединения и сколько раз ожидание закончилось TimeoutError.
+# Метрики общие для всех экземпляров пула (engine.dispose() пересоздаёт пул)
+# и ведутся на воркер.
+
+import logging
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from dapmeet.core.metrics import LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+
+class PoolMetrics:
+    def __init__(self):
+        self.checkout_ms = LatencyHistogram()
+        self.connect_ms = LatencyHistogram()
+        self.timeouts = 0
+        self.peak_in_use = 0
+        self.pool: Optional["InstrumentedAsyncPool"] = None
+
+    def record_checkout(self, duration_ms: float, in_use: int) -> None:
+        self.checkout_ms.record(duration_ms)
+        self.peak_in_use = max(self.peak_in_use, in_use)
+
+    def snapshot(self) -> dict:
+        pool = self.pool
+        gauges = {}
+        if isinstance(pool, InstrumentedAsyncPool):
+            gauges = {
+                "size": pool.size(),
+                "in_use": pool.checkedout(),
+                "idle": pool.checkedin(),
+                # overflow() отрицателен, пока пул не открыл pool_size соединений
+                "overflow": max(pool.overflow(), 0),
+                "max_overflow": pool.max_overflow,
+                "timeout_seconds": pool.timeout(),
+            }
+        return {
+            **gauges,
+            "peak_in_use": self.peak_in_use,
+            "checkouts": self.checkout_ms.count,
+            "checkout_timeouts": self.timeouts,
+            "checkout_wait_ms": _histogram_summary(self.checkout_ms),
+            "connects": self.connect_ms.count,
+            "connect_ms": _histogram_summary(self.connect_ms),
+        }
+
+    def render_prometheus(self) -> str:
+        snapshot = self.snapshot()
+        lines = []
+        for name, key, kind, help_text in (
+            ("db_pool_size", "size", "gauge", "Configured pool_size."),
+            ("db_pool_in_use", "in_use", "gauge", "Connections checked out right now."),
+            ("db_pool_idle", "idle", "gauge", "Idle connections in the pool."),
+            ("db_pool_overflow", "overflow", "gauge", "Connections open beyond pool_size."),
+            ("db_pool_checkout_timeouts_total", "checkout_timeouts", "counter", "Checkouts that hit pool_timeout."),
+            ("db_pool_connects_total", "connects", "counter", "New connections opened by the pool."),
+        ):
+            if key in snapshot:
+                lines += [
+                    f"# HELP {name} {help_text} (per worker)",
+                    f"# TYPE {name} {kind}",
+                    f"{name} {snapshot[key]}",
+                ]
+        lines += [
+            "# HELP db_pool_checkout_wait_seconds Time to obtain a connection from the pool (per worker).",
+            "# TYPE db_pool_checkout_wait_seconds summary",
+        ]
+        for q in (0.5, 0.95, 0.99):
+            lines.append(f'db_pool_checkout_wait_seconds{{quantile="{q}"}} {self.checkout_ms.quantile(q) / 1000:.6f}')
+        lines.append(f"db_pool_checkout_wait_seconds_sum {self.checkout_ms.sum_ms / 1000:.6f}")
+        lines.append(f"db_pool_checkout_wait_seconds_count {self.checkout_ms.count}")
+        return "\n".join(lines) + "\n"
+
+
+def _histogram_summary(histogram: LatencyHistogram) -> dict:
+    count = histogram.count
+    return {
+        "mean": round(histogram.sum_ms / count, 3) if count else 0.0,
+        "p50": round(histogram.quantile(0.5), 3),
+        "p95": round(histogram.quantile(0.95), 3),
+        "p99": round(histogram.quantile(0.99), 3),
+        "max": round(histogram.max_ms, 3),
+    }
+
+
+pool_metrics = PoolMetrics()
+
+# QueuePool._do_get() иногда вызывает себя повторно — учитываем только внешний вызов
+_in_checkout: ContextVar[bool] = ContextVar("_in_checkout", default=False)
+
+
+class InstrumentedAsyncPool(AsyncAdaptedQueuePool):
+    def __init__(self, creator, pool_size: int = 5, max_overflow: int = 10, **kwargs):
+        super().__init__(creator, pool_size=pool_size, max_overflow=max_overflow, **kwargs)
+        # QueuePool хранит лимит только в приватном _max_overflow
+        self.max_overflow = max_overflow
+        # Гейджи снимаются с актуального пула (после dispose() он новый)
+        pool_metrics.pool = self
+
+    def _do_get(self):
+        if _in_checkout.get():
+            return super()._do_get()
+        token = _in_checkout.set(True)
+        started = time.perf_counter()
+        try:
+            record = super()._do_get()
+        except exc.TimeoutError:
+            pool_metrics.timeouts += 1
+            logger.warning(
+                f"DB pool checkout timed out after {self.timeout():g}s "
+                f"(size={self.size()}, overflow={self.overflow()}, in_use={self.checkedout()})"
+            )
+            raise
+        finally:
+            _in_checkout.reset(token)
+        pool_metrics.record_checkout((time.perf_counter() - started) * 1000, self.checkedout())
+        return record
+
+    def _create_connection(self):
+        started = time.perf_counter()
+        connection = super()._create_connection()
+        pool_metrics.connect_ms.record((time.perf_counter() - started) * 1000)
+        return connection
@@ -3,8 +3,9 @@
 # ОБЯЗАТЕЛЬНО импортировать ВСЕ модели для регистрации в SQLAlchemy MetaData
 from .user import User
 from .meeting import Meeting  
-from .segment import TranscriptSegment
+from .segment import TranscriptSegment, TranscriptSegmentLatest
 from .prompt import Prompt
+from .revoked_token import RevokedToken
 
 # Делаем их доступными при импорте пакета
-__all__ = ["User", "Meeting", "TranscriptSegment", "Prompt"]
\ No newline at end of file
+__all__ = ["User", "Meeting", "TranscriptSegment", "TranscriptSegmentLatest", "Prompt", "RevokedToken"]
\ No newline at end of file
@@ -1,5 +1,5 @@
 from sqlalchemy import (
-    Column, String, DateTime, ForeignKey, Table, UniqueConstraint
+    BigInteger, Column, Computed, String, DateTime, ForeignKey, Index, Table
 )
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -15,14 +15,28 @@ meeting_participants = Table(
     Column("left_at",    DateTime(timezone=True), nullable=True),
 )
 
+# Денормализованный список спикеров встречи: пополняется при записи сегментов,
+# чтобы не агрегировать transcript_segments ради списка имён
+meeting_speakers = Table(
+    "meeting_speakers",
+    Base.metadata,
+    Column("session_id",       String, ForeignKey("meetings.unique_session_id", ondelete="CASCADE"), primary_key=True),
+    Column("speaker_username", String(100), primary_key=True),
+    Column("first_seen_at",    DateTime(timezone=True), nullable=False, server_default=func.now()),
+)
+
 class Meeting(Base):
     __tablename__ = "meetings"
 
     unique_session_id = Column(String, primary_key=True, index=True)
     meeting_id      = Column(String, nullable=False, index=True)
-    user_id         = Column(String, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    user_id         = Column(String, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     title           = Column(String(255), nullable=True)
-    created_at      = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    # "<meeting_id>-<user_id>" без суффикса даты: по нему ищется последняя встреча серии
+    base_session_id = Column(String, Computed("meeting_id || '-' || user_id", persisted=True))
+    created_at      = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), index=True)
+    # Счётчик изменений транскрипта: увеличивается при каждой записи сегментов, основа ETag
+    revision        = Column(BigInteger, nullable=False, server_default="0")
 
     user        = relationship("User", back_populates="meetings")
     participants = relationship(
@@ -37,6 +51,14 @@ class Meeting(Base):
     )
     segments     = relationship(
         "TranscriptSegment", back_populates="meeting",
-        cascade="all, delete-orphan",
+        # Только для чтения: сегменты удаляет FK ON DELETE CASCADE вместе со встречей
+        viewonly=True,
         order_by="TranscriptSegment.timestamp, TranscriptSegment.version"
     )
+
+    __table_args__ = (
+        # Keyset-пагинация списка встреч пользователя (префикс user_id заменяет отдельный индекс)
+        Index("ix_meetings_user_created", "user_id", created_at.desc(), unique_session_id.desc()),
+        # Решение «продолжить или начать новую встречу» — одна проба этого индекса
+        Index("ix_meetings_base_session_created", "base_session_id", created_at.desc()),
+    )
@@ -0,0 +1,12 @@
+from sqlalchemy import Column, String, DateTime
+from sqlalchemy.sql import func
+from dapmeet.db.db import Base
+
+
+class RevokedToken(Base):
+    """Отозванные токены (по jti). Строка нужна только до истечения самого токена."""
+    __tablename__ = "revoked_tokens"
+
+    jti = Column(String(64), primary_key=True)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    revoked_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
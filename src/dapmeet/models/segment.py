@@ -1,20 +1,80 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, UniqueConstraint
+from sqlalchemy import Column, Integer, BigInteger, String, Text, DateTime, ForeignKey, Index, Sequence
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from dapmeet.db.db import Base
 
+# Ключ одной реплики в режиме SEGMENT_STORAGE_MODE=upsert. Уникальный индекс по нему
+# создаётся только в этом режиме (миграция / python -m dapmeet.cmd.segments enable-upsert),
+# поэтому в модели он не объявлен. С секционированной таблицей (см. ниже) режим upsert
+# несовместим: уникальный индекс на ней обязан включать created_at.
+SEGMENT_UPSERT_KEY = ("session_id", "google_meet_user_id", "message_id")
+SEGMENT_UPSERT_INDEX = "uq_transcript_segments_message"
+
+# Сквозной счётчик изменений сегментов: новое значение получает каждая вставленная
+# или перезаписанная актуальная версия. Служит курсором для инкрементальной выдачи.
+segment_change_seq = Sequence("transcript_segment_change_seq", metadata=Base.metadata)
+
 class TranscriptSegment(Base):
+    """
+    История версий сегментов. Модель описывает таблицу по умолчанию — обычную,
+    с первичным ключом id. Секционирование по created_at включается отдельно
+    (миграция e7a94c0b2d16 с SEGMENT_PARTITION_TABLE=1 или `python -m
+    dapmeet.cmd.segments partition`); ключ в базе тогда (id, created_at), но ORM
+    хватает id — он уникален благодаря последовательности.
+    """
     __tablename__ = "transcript_segments"
 
     id                  = Column(Integer, primary_key=True, autoincrement=True)
-    session_id          = Column(String, ForeignKey("meetings.unique_session_id", ondelete="CASCADE"), nullable=False, index=True)
-    google_meet_user_id = Column(String(100), nullable=False, index=True)
+    session_id          = Column(String, ForeignKey("meetings.unique_session_id", ondelete="CASCADE"), nullable=False)
+    google_meet_user_id = Column(String(100), nullable=False)
     speaker_username    = Column(String(100), nullable=False)
     timestamp           = Column(DateTime(timezone=True), nullable=False, index=True)
     text                = Column(Text, nullable=False)
     version             = Column(Integer, nullable=False, default=1)
     message_id          = Column(String(100), nullable=True)
     created_at          = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    # Заполнен для всех строк в режиме upsert; в append курсор ведёт transcript_segments_latest
+    change_seq          = Column(BigInteger, nullable=True, server_default=segment_change_seq.next_value())
 
     meeting             = relationship("Meeting", back_populates="segments")
 
+    __table_args__ = (
+        # Версии одной реплики внутри сессии (сборка последних версий, collapse)
+        Index("ix_transcript_segments_session_message_version",
+              session_id, google_meet_user_id, message_id, version.desc()),
+        # SELECT DISTINCT speaker_username ... WHERE session_id = ? — index-only scan
+        Index("ix_transcript_segments_session_speaker", session_id, speaker_username),
+        # Лента активности в админке: ORDER BY created_at DESC LIMIT n
+        Index("ix_transcript_segments_created_at", created_at.desc()),
+        # Инкрементальная выдача в режиме upsert: WHERE session_id = ? AND change_seq > ?
+        Index("ix_transcript_segments_session_change_seq", session_id, change_seq),
+    )
+
+
+
+class TranscriptSegmentLatest(Base):
+    """
+    Последняя версия каждой реплики (speaker + message_id) в режиме append.
+    Поддерживается при каждой записи сегментов, чтобы чтение транскрипта
+    не перебирало все версии в transcript_segments.
+    """
+    __tablename__ = "transcript_segments_latest"
+
+    session_id          = Column(String, ForeignKey("meetings.unique_session_id", ondelete="CASCADE"), primary_key=True)
+    google_meet_user_id = Column(String(100), primary_key=True)
+    message_id          = Column(String(100), primary_key=True)  # '' для сегментов без message_id
+    segment_id          = Column(Integer, nullable=False)  # transcript_segments.id этой версии
+    speaker_username    = Column(String(100), nullable=False)
+    timestamp           = Column(DateTime(timezone=True), nullable=False)
+    text                = Column(Text, nullable=False)
+    version             = Column(Integer, nullable=False)
+    created_at          = Column(DateTime(timezone=True), nullable=False)  # когда записана эта версия
+    first_seen_at       = Column(DateTime(timezone=True), nullable=False)  # когда записана первая версия
+    change_seq          = Column(BigInteger, nullable=False, server_default=segment_change_seq.next_value())
+
+    __table_args__ = (
+        # Чтение транскрипта в порядке get_latest_segments_for_session без сортировки
+        Index("ix_transcript_segments_latest_session_order", session_id, first_seen_at, timestamp, version),
+        # Инкрементальная выдача: WHERE session_id = ? AND change_seq > ?
+        Index("ix_transcript_segments_latest_session_change_seq", session_id, change_seq),
+    )
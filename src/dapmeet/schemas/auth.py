@@ -1,4 +1,19 @@
+from typing import Optional
+
 from pydantic import BaseModel
 
 class CodePayload(BaseModel):
-    code: str
\ No newline at end of file
+    code: str
+
+
+class RefreshPayload(BaseModel):
+    refresh_token: str
+
+
+class LogoutPayload(BaseModel):
+    refresh_token: Optional[str] = None
+
+
+class StreamTicketOut(BaseModel):
+    ticket: str
+    expires_in: int
@@ -26,6 +26,15 @@ class MeetingOut(BaseModel):
     class Config:
         orm_mode = True
 
+class MeetingSummaryOut(BaseModel):
+    unique_session_id: str
+    meeting_id: str
+    user_id: str
+    title: str
+    created_at: datetime
+    segment_count: int
+    cursor: int  # change_seq; сегменты дочитываются через /segments/changes?since=...
+
 class MeetingOutList(BaseModel):
     unique_session_id: str
     meeting_id: str
@@ -1,6 +1,8 @@
 from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import Optional
+from typing import List, Literal, Optional
+
+MAX_SEGMENTS_PER_BATCH = 500
 
 class TranscriptSegmentCreate(BaseModel):
     google_meet_user_id: str
@@ -10,6 +12,18 @@ class TranscriptSegmentCreate(BaseModel):
     ver: int = Field(..., gt=0, description="Version number, must be positive")
     mess_id: Optional[str] = None
 
+class TranscriptSegmentBatchCreate(BaseModel):
+    segments: List[TranscriptSegmentCreate] = Field(
+        ...,
+        min_length=1,
+        max_length=MAX_SEGMENTS_PER_BATCH,
+        description="Segments to store in a single transaction",
+    )
+
+class TranscriptSegmentFrame(TranscriptSegmentCreate):
+    """Один кадр WebSocket-потока: сегмент плюс порядковый номер для подтверждения."""
+    seq: int = Field(..., ge=0, description="Client-side frame number echoed back in the ack")
+
 class TranscriptSegmentOut(BaseModel):
     id: int
     session_id: str
@@ -23,3 +37,15 @@ class TranscriptSegmentOut(BaseModel):
 
     class Config:
         orm_mode = True
+
+
+class TranscriptSegmentChangesOut(BaseModel):
+    segments: List[TranscriptSegmentOut]
+    cursor: int = Field(..., description="Pass as ?since= on the next poll")
+    has_more: bool = Field(False, description="More changes are available right away")
+
+
+class TranscriptSegmentsQueuedOut(BaseModel):
+    """Ответ 202 при отложенной записи (SEGMENT_WRITE_BEHIND=1): строки ещё не в БД."""
+    status: Literal["queued"] = "queued"
+    queued: int = Field(..., description="Number of segments accepted into the write-behind buffer")
@@ -0,0 +1,65 @@
+# Живые показатели для админки без обращений к БД.
+#
+# Активные пользователи: на каждую минуту — HyperLogLog по id пользователей,
+# прошедших проверку access token; число активных за N минут — объединение
+# последних N корзин. Встречи за день — счётчик, который увеличивает
+# MeetingService.get_or_create_meeting при создании встречи.
+#
+# Оба счётчика живут в памяти процесса: при нескольких воркерах каждый видит
+# свою долю трафика, после перезапуска счёт начинается заново (см. "since").
+
+import os
+import time
+from datetime import date, datetime, timezone
+from typing import Dict, Optional
+
+from dapmeet.core.hll import HyperLogLog
+
+ACTIVE_USERS_WINDOW_MINUTES = int(os.getenv("ACTIVE_USERS_WINDOW_MINUTES", "5"))
+ACTIVE_USERS_MAX_WINDOW_MINUTES = 60
+MEETINGS_DAYS_KEPT = 7
+
+
+class ActiveUsersWindow:
+    def __init__(self, max_minutes: int = ACTIVE_USERS_MAX_WINDOW_MINUTES):
+        self.max_minutes = max_minutes
+        self._buckets: Dict[int, HyperLogLog] = {}
+        self.since = datetime.now(timezone.utc)
+
+    def record(self, user_id: str, now: Optional[float] = None) -> None:
+        minute = int((time.time() if now is None else now) // 60)
+        bucket = self._buckets.get(minute)
+        if bucket is None:
+            bucket = self._buckets[minute] = HyperLogLog()
+            # Новая минута — заодно выбрасываем корзины старше окна
+            for stale in [key for key in self._buckets if key <= minute - self.max_minutes]:
+                del self._buckets[stale]
+        bucket.add(user_id)
+
+    def count(self, minutes: int, now: Optional[float] = None) -> int:
+        minute = int((time.time() if now is None else now) // 60)
+        merged = HyperLogLog()
+        for key, bucket in self._buckets.items():
+            if minute - minutes < key <= minute:
+                merged.merge(bucket)
+        return merged.count()
+
+
+class DailyCounter:
+    def __init__(self, days_kept: int = MEETINGS_DAYS_KEPT):
+        self.days_kept = days_kept
+        self._counts: Dict[date, int] = {}
+        self.since = datetime.now(timezone.utc)
+
+    def increment(self, when: Optional[datetime] = None) -> None:
+        day = (when or datetime.now(timezone.utc)).astimezone(timezone.utc).date()
+        self._counts[day] = self._counts.get(day, 0) + 1
+        if len(self._counts) > self.days_kept:
+            del self._counts[min(self._counts)]
+
+    def get(self, day: Optional[date] = None) -> int:
+        return self._counts.get(day or datetime.now(timezone.utc).date(), 0)
+
+
+active_users = ActiveUsersWindow()
+meetings_per_day = DailyCounter()
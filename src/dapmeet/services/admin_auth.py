@@ -1,3 +1,4 @@
+import hmac
 import os
 import datetime as dt
 from typing import Any, Dict
@@ -11,6 +12,8 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 ADMIN_JWT_SECRET = os.getenv("ADMIN_JWT_SECRET")
 ADMIN_USERNAME = os.getenv("ADMIN_USERNAME")
 ADMIN_PASSWORD = os.getenv("ADMIN_PASSWORD")
+# Static bearer token for Prometheus scraping of /admin/metrics/prometheus (optional)
+METRICS_SCRAPE_TOKEN = os.getenv("METRICS_SCRAPE_TOKEN")
 
 
 admin_oauth2_scheme = HTTPBearer()
@@ -61,3 +64,11 @@ def get_current_admin(
     return payload
 
 
+def require_metrics_access(
+    token: HTTPAuthorizationCredentials = Depends(admin_oauth2_scheme),
+) -> None:
+    """Allows either the static METRICS_SCRAPE_TOKEN or a regular admin JWT."""
+    # compare_digest raises TypeError on non-ASCII str, so compare bytes
+    if METRICS_SCRAPE_TOKEN and hmac.compare_digest(token.credentials.encode(), METRICS_SCRAPE_TOKEN.encode()):
+        return
+    get_current_admin(token)
@@ -0,0 +1,67 @@
+# Счётчики для админского дашборда.
+#
+# Все показатели считаются одним запросом. По умолчанию размеры больших таблиц
+# берутся из статистики Postgres (pg_class.reltuples, обновляется ANALYZE/
+# autovacuum; для ещё не проанализированных таблиц — n_live_tup), так что
+# стоимость не зависит от размера transcript_segments. У секционированной
+# таблицы суммируются только партиции: reltuples самого родителя (PG14+)
+# хранит итог последнего ANALYZE всей иерархии, и autovacuum его не обновляет.
+# Промпты считаются точно — таблица маленькая. Режим exact делает честные
+# COUNT(*) тем же одним запросом. Результат кэшируется на
+# DASHBOARD_METRICS_TTL_SECONDS.
+
+import os
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from dapmeet.core.cache import TTLCache
+from dapmeet.models.chat_message import ChatMessage
+from dapmeet.models.meeting import Meeting
+from dapmeet.models.prompt import Prompt
+from dapmeet.models.segment import TranscriptSegment
+from dapmeet.models.user import User
+
+DASHBOARD_METRICS_TTL_SECONDS = float(os.getenv("DASHBOARD_METRICS_TTL_SECONDS", "30"))
+
+dashboard_cache = TTLCache(maxsize=2, ttl=DASHBOARD_METRICS_TTL_SECONDS)
+
+# Ключ ответа -> таблица
+COUNTED_TABLES = {
+    "users": User.__tablename__,
+    "meetings": Meeting.__tablename__,
+    "segments": TranscriptSegment.__tablename__,
+    "chat_messages": ChatMessage.__tablename__,
+}
+
+_ESTIMATE_SQL = """(
+    SELECT COALESCE(SUM(CASE WHEN c.reltuples >= 0 THEN c.reltuples ELSE COALESCE(s.n_live_tup, 0) END), 0)::bigint
+    FROM pg_class c
+    LEFT JOIN pg_stat_user_tables s ON s.relid = c.oid
+    WHERE c.relkind <> 'p'
+      AND (c.oid = '{table}'::regclass
+           OR c.oid IN (SELECT inhrelid FROM pg_inherits WHERE inhparent = '{table}'::regclass))
+)"""
+
+_EXACT_SQL = "(SELECT count(*) FROM {table})"
+
+
+def _dashboard_query(exact: bool):
+    template = _EXACT_SQL if exact else _ESTIMATE_SQL
+    columns = [f"{template.format(table=table)} AS {key}" for key, table in COUNTED_TABLES.items()]
+    columns += [
+        f"(SELECT count(*) FROM {Prompt.__tablename__} WHERE prompt_type = 'admin') AS admin_prompts",
+        f"(SELECT count(*) FROM {Prompt.__tablename__} WHERE prompt_type = 'user') AS user_prompts",
+    ]
+    return text("SELECT " + ",\n       ".join(columns))
+
+
+async def get_dashboard_metrics(db: AsyncSession, exact: bool = False) -> dict:
+    cached = dashboard_cache.get(exact)
+    if cached is not None:
+        return cached
+    row = (await db.execute(_dashboard_query(exact))).mappings().one()
+    metrics = {key: int(value) for key, value in row.items()}
+    metrics["estimated"] = not exact
+    dashboard_cache.set(exact, metrics)
+    return metrics
@@ -1,47 +1,147 @@
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+
 from fastapi import Depends, HTTPException
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
 from dapmeet.services.google_auth_service import JWT_SECRET
+from dapmeet.services.token_revocation import token_revocations
+from dapmeet.services.activity_metrics import active_users
 from dapmeet.models.user import User
+from dapmeet.core.cache import TTLCache
 from dapmeet.core.deps import get_async_db
 from dapmeet.services.prompts import PromptService
 import jwt
 
 oauth2_scheme = HTTPBearer()
 
-async def get_current_user(
-    token: HTTPAuthorizationCredentials = Depends(oauth2_scheme),
-    db: AsyncSession = Depends(get_async_db)
-):
+# Кэш пользователей по id: снимает SELECT users с каждого запроса.
+# Инвалидация локальна для процесса, поэтому в других воркерах изменения
+# (например, через админку) видны не позже чем через USER_CACHE_TTL_SECONDS.
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "60"))
+USER_CACHE_MAX_SIZE = int(os.getenv("USER_CACHE_MAX_SIZE", "10000"))
+
+user_cache = TTLCache(maxsize=USER_CACHE_MAX_SIZE, ttl=USER_CACHE_TTL_SECONDS)
+USER_CACHE_FIELDS = ("id", "email", "name", "created_at")
+
+
+def invalidate_cached_user(user_id: str) -> None:
+    user_cache.pop(user_id)
+
+
+# Токены, выданные до появления exp/jti, принимаются, пока клиенты не обновят их
+# через /auth/validate; выключить после раскатки: JWT_ALLOW_LEGACY_TOKENS=0
+JWT_ALLOW_LEGACY_TOKENS = os.getenv("JWT_ALLOW_LEGACY_TOKENS", "1").lower() in ("1", "true", "yes")
+REQUIRED_CLAIMS = [] if JWT_ALLOW_LEGACY_TOKENS else ["exp", "jti"]
+
+def decode_token(token: str, token_type: str = "access") -> dict:
+    """Проверяет подпись и срок действия нашего JWT и возвращает его payload."""
     try:
-        payload = jwt.decode(token.credentials, JWT_SECRET, algorithms=["HS256"])
+        payload = jwt.decode(token, JWT_SECRET, algorithms=["HS256"], options={"require": REQUIRED_CLAIMS})
+    except jwt.ExpiredSignatureError:
+        raise HTTPException(status_code=401, detail="Token has expired")
     except jwt.PyJWTError:
         raise HTTPException(status_code=401, detail="Invalid token")
+    # refresh token нельзя использовать вместо access и наоборот
+    if payload.get("typ", "access") != token_type:
+        raise HTTPException(status_code=401, detail="Invalid token type")
+    return payload
+
+
+async def verify_access_token(token: str, db: AsyncSession) -> dict:
+    """
+    Проверяет access token, включая отзыв. БД читается, только если jti
+    попал в фильтр отозванных (то есть почти никогда).
+    """
+    payload = decode_token(token)
+    jti = payload.get("jti")
+    if jti and await token_revocations.is_revoked(jti, db):
+        raise HTTPException(status_code=401, detail="Token has been revoked")
+    active_users.record(payload["sub"])
+    return payload
+
+
+# Билет на подключение к потоку (WebSocket/SSE): браузер не умеет слать туда
+# заголовок Authorization, а access token в query string оседает в логах
+# прокси и не обновляется при переподключении EventSource. Билет выдаётся
+# POST-запросом с обычной авторизацией, живёт STREAM_TICKET_TTL_SECONDS,
+# привязан к встрече и гасится первым же подключением.
+STREAM_TICKET_TTL_SECONDS = int(os.getenv("STREAM_TICKET_TTL_SECONDS", "30"))
+
+
+def generate_stream_ticket(user_id: str, meeting_id: str) -> str:
+    now = datetime.now(timezone.utc)
+    payload = {
+        "sub": user_id,
+        "sid": meeting_id,
+        "typ": "stream",
+        "jti": uuid.uuid4().hex,
+        "iat": now,
+        "exp": now + timedelta(seconds=STREAM_TICKET_TTL_SECONDS),
+    }
+    return jwt.encode(payload, JWT_SECRET, algorithm="HS256")
+
+
+async def redeem_stream_ticket(ticket: str, meeting_id: str, db: AsyncSession) -> dict:
+    """Проверяет билет на поток этой встречи и гасит его (повторное использование — 401)."""
+    payload = decode_token(ticket, token_type="stream")
+    if payload.get("sid") != meeting_id or "jti" not in payload or "exp" not in payload:
+        raise HTTPException(status_code=401, detail="Invalid stream ticket")
+    expires_at = datetime.fromtimestamp(payload["exp"], tz=timezone.utc)
+    if not await token_revocations.revoke(payload["jti"], expires_at, db):
+        raise HTTPException(status_code=401, detail="Stream ticket has already been used")
+    active_users.record(payload["sub"])
+    return payload
 
-    result = await db.execute(select(User).where(User.id == payload["sub"]))
+
+async def get_user_from_token(token: str, db: AsyncSession) -> User:
+    """Аутентифицирует пользователя по JWT вне HTTP-зависимостей."""
+    payload = await verify_access_token(token, db)
+    user_id = payload["sub"]
+
+    # Из кэша отдаём несвязанный с сессией объект: маршруты используют только поля
+    cached = user_cache.get(user_id)
+    if cached is not None:
+        return User(**cached)
+
+    result = await db.execute(select(User).where(User.id == user_id))
     user = result.scalar_one_or_none()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
+    user_cache.set(user_id, {field: getattr(user, field) for field in USER_CACHE_FIELDS})
     return user
 
 
+async def get_current_user_id(
+    token: HTTPAuthorizationCredentials = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_async_db),
+) -> str:
+    """
+    Быстрый путь для маршрутов, которым нужен только user.id: проверяем подпись
+    и не ходим в БД. Существование пользователя такие маршруты проверяют
+    косвенно — через владельца встречи (meetings.user_id с ON DELETE CASCADE).
+    """
+    payload = await verify_access_token(token.credentials, db)
+    return payload["sub"]
+
+
+async def get_current_user(
+    token: HTTPAuthorizationCredentials = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_async_db)
+):
+    return await get_user_from_token(token.credentials, db)
+
+
 async def get_current_user_with_prompts(
     token: HTTPAuthorizationCredentials = Depends(oauth2_scheme),
     db: AsyncSession = Depends(get_async_db)
 ):
     """Get current user with their prompt names included"""
-    try:
-        payload = jwt.decode(token.credentials, JWT_SECRET, algorithms=["HS256"])
-    except jwt.PyJWTError:
-        raise HTTPException(status_code=401, detail="Invalid token")
-
-    result = await db.execute(select(User).where(User.id == payload["sub"]))
-    user = result.scalar_one_or_none()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
+    user = await get_user_from_token(token.credentials, db)
 
     # Get user's prompt names
     prompt_service = PromptService(db)
@@ -2,11 +2,21 @@ import os
 from dotenv import load_dotenv
 load_dotenv(dotenv_path=os.path.join(os.getcwd(), ".env"))
 
+import asyncio
+import hashlib
+import logging
+import re
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+
 import httpx
 import jwt
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import HTTPException
+from dapmeet.core.cache import TTLCache
 from dapmeet.models.user import User
 
 GOOGLE_CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID")
@@ -15,6 +25,88 @@ GOOGLE_CLIENT_SECRET = os.getenv("GOOGLE_CLIENT_SECRET")
 GOOGLE_REDIRECT_URI = os.getenv("GOOGLE_REDIRECT_URI")
 JWT_SECRET = os.getenv("NEXTAUTH_SECRET")
 
+# Время жизни наших токенов: короткий access и долгий refresh (обменивается на /auth/refresh)
+ACCESS_TOKEN_TTL_SECONDS = int(os.getenv("ACCESS_TOKEN_TTL_SECONDS", "3600"))
+REFRESH_TOKEN_TTL_SECONDS = int(os.getenv("REFRESH_TOKEN_TTL_SECONDS", str(30 * 24 * 3600)))
+
+# Эндпоинты Google переопределяются для локальных заглушек в тестах и стендах
+GOOGLE_TOKEN_URL = os.getenv("GOOGLE_TOKEN_URL", "https://oauth2.googleapis.com/token")
+GOOGLE_TOKENINFO_URL = os.getenv("GOOGLE_TOKENINFO_URL", "https://www.googleapis.com/oauth2/v1/tokeninfo")
+GOOGLE_USERINFO_URL = os.getenv("GOOGLE_USERINFO_URL", "https://www.googleapis.com/oauth2/v2/userinfo")
+
+# Кэш проверенных access token'ов (ключ — sha256 токена, сам токен не хранится).
+# Запись живёт не дольше expires_in от Google и не дольше GOOGLE_TOKEN_CACHE_MAX_TTL_SECONDS,
+# чтобы отозванный в Google токен переставал приниматься в разумный срок.
+GOOGLE_TOKEN_CACHE_MAX_TTL_SECONDS = float(os.getenv("GOOGLE_TOKEN_CACHE_MAX_TTL_SECONDS", "300"))
+GOOGLE_TOKEN_CACHE_MAX_SIZE = int(os.getenv("GOOGLE_TOKEN_CACHE_MAX_SIZE", "10000"))
+
+google_token_cache = TTLCache(maxsize=GOOGLE_TOKEN_CACHE_MAX_SIZE, ttl=GOOGLE_TOKEN_CACHE_MAX_TTL_SECONDS)
+
+# Ключи Google для локальной проверки ID token'ов
+GOOGLE_JWKS_URL = os.getenv("GOOGLE_JWKS_URL", "https://www.googleapis.com/oauth2/v3/certs")
+GOOGLE_ID_TOKEN_ISSUERS = ("accounts.google.com", "https://accounts.google.com")
+# Если Google не прислал Cache-Control: max-age
+GOOGLE_JWKS_DEFAULT_TTL_SECONDS = 3600
+# Незнакомый kid (ротация ключей) вызывает внеочередное обновление не чаще этого интервала
+GOOGLE_JWKS_MIN_REFRESH_SECONDS = 60
+
+logger = logging.getLogger(__name__)
+
+
+class GoogleJWKS:
+    """
+    Кэш набора ключей Google. Обновляется по истечении Cache-Control max-age или
+    при появлении незнакомого kid; если Google недоступен, продолжаем проверять
+    подписи старыми ключами.
+    """
+
+    def __init__(self, url: str):
+        self.url = url
+        self._keys: Dict[str, jwt.PyJWK] = {}
+        self._expires_at = 0.0
+        self._fetched_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def get_key(self, kid: str, http_client: httpx.AsyncClient) -> jwt.PyJWK:
+        now = time.monotonic()
+        unknown_kid = kid not in self._keys and now - self._fetched_at >= GOOGLE_JWKS_MIN_REFRESH_SECONDS
+        if now >= self._expires_at or unknown_kid:
+            await self.refresh(http_client)
+        key = self._keys.get(kid)
+        if key is None:
+            if not self._keys:
+                raise HTTPException(status_code=503, detail="Google signing keys are unavailable")
+            raise HTTPException(status_code=401, detail="Unknown ID token signing key")
+        return key
+
+    async def refresh(self, http_client: httpx.AsyncClient) -> None:
+        fetched_at = self._fetched_at
+        async with self._lock:
+            # Пока ждали блокировку, ключи мог обновить другой запрос
+            if self._fetched_at != fetched_at:
+                return
+            try:
+                resp = await http_client.get(self.url)
+                resp.raise_for_status()
+                key_set = jwt.PyJWKSet.from_dict(resp.json())
+            except (httpx.HTTPError, jwt.PyJWTError, ValueError) as e:
+                logger.warning(f"Failed to refresh Google JWKS, keeping {len(self._keys)} cached keys: {str(e)}")
+                # Повторим не раньше чем через минимальный интервал
+                self._fetched_at = time.monotonic()
+                self._expires_at = self._fetched_at + GOOGLE_JWKS_MIN_REFRESH_SECONDS
+                return
+            self._keys = {key.key_id: key for key in key_set.keys}
+            self._fetched_at = time.monotonic()
+            self._expires_at = self._fetched_at + _max_age(resp.headers.get("Cache-Control"))
+
+
+def _max_age(cache_control: Optional[str]) -> float:
+    match = re.search(r"max-age=(\d+)", cache_control or "")
+    return float(match.group(1)) if match else GOOGLE_JWKS_DEFAULT_TTL_SECONDS
+
+
+google_jwks = GoogleJWKS(GOOGLE_JWKS_URL)
+
 
 async def exchange_code_for_token(code: str, http_client: httpx.AsyncClient) -> str:
     """
@@ -22,7 +114,7 @@ async def exchange_code_for_token(code: str, http_client: httpx.AsyncClient) ->
     Используется для стандартного OAuth flow на фронте
     """
     token_resp = await http_client.post(
-        "https://oauth2.googleapis.com/token",
+        GOOGLE_TOKEN_URL,
         data={
             "code": code,
             "client_id": GOOGLE_CLIENT_ID,
@@ -49,7 +141,7 @@ async def validate_google_access_token(access_token: str, http_client: httpx.Asy
     Проверяет audience для защиты от token substitution атак
     """
     token_info_resp = await http_client.get(
-        f"https://www.googleapis.com/oauth2/v1/tokeninfo?access_token={access_token}"
+        GOOGLE_TOKENINFO_URL, params={"access_token": access_token}
     )
     
     if token_info_resp.status_code != 200:
@@ -94,7 +186,7 @@ async def get_google_user_info(access_token: str, http_client: httpx.AsyncClient
     """    
     # Теперь безопасно получаем user info
     user_resp = await http_client.get(
-        "https://www.googleapis.com/oauth2/v2/userinfo",
+        GOOGLE_USERINFO_URL,
         headers={"Authorization": f"Bearer {access_token}"}
     )
 
@@ -111,15 +203,32 @@ async def validate_and_get_user_info(access_token: str, http_client: httpx.Async
     """
     Комбинированная функция: валидация токена + получение user info
     Для Chrome Identity API использования
+
+    Повторная проверка того же токена обслуживается из google_token_cache,
+    а при промахе tokeninfo и userinfo запрашиваются параллельно.
     """
-    # Валидируем токен
-    token_info = await validate_google_access_token(access_token, http_client)
-    
-    # Получаем user info
-    user_info = await get_google_user_info(access_token, http_client)
-    
+    cache_key = hashlib.sha256(access_token.encode()).hexdigest()
+    cached = google_token_cache.get(cache_key)
+    if cached is not None:
+        expires_at, result = cached
+        return {
+            **result,
+            "token_info": {**result["token_info"], "expires_in": max(int(expires_at - time.monotonic()), 0)},
+        }
+
+    token_info, user_info = await asyncio.gather(
+        validate_google_access_token(access_token, http_client),
+        get_google_user_info(access_token, http_client),
+        return_exceptions=True,
+    )
+    # Ошибка валидации важнее ошибки userinfo: без проверки audience данным не доверяем
+    if isinstance(token_info, BaseException):
+        raise token_info
+    if isinstance(user_info, BaseException):
+        raise user_info
+
     # Возвращаем объединенную информацию
-    return {
+    result = {
         **user_info,
         "token_info": {
             "audience": token_info.get("audience"),
@@ -128,6 +237,57 @@ async def validate_and_get_user_info(access_token: str, http_client: httpx.Async
         }
     }
 
+    ttl = min(float(token_info["expires_in"]), GOOGLE_TOKEN_CACHE_MAX_TTL_SECONDS)
+    google_token_cache.set(cache_key, (time.monotonic() + float(token_info["expires_in"]), result), ttl=ttl)
+    return result
+
+
+def is_id_token(token: str) -> bool:
+    """ID token — это JWT (header.payload.signature), access token Google — непрозрачная строка."""
+    return token.startswith("eyJ") and token.count(".") == 2
+
+
+async def verify_google_id_token(id_token: str, http_client: httpx.AsyncClient) -> dict:
+    """
+    Проверяет Google ID token локально (подпись по JWKS, aud, iss, exp) без похода
+    в tokeninfo и возвращает user info в формате oauth2/v2/userinfo.
+    """
+    try:
+        kid = jwt.get_unverified_header(id_token).get("kid")
+    except jwt.PyJWTError:
+        raise HTTPException(status_code=401, detail="Malformed ID token")
+    if not kid:
+        raise HTTPException(status_code=401, detail="ID token has no key id")
+
+    key = await google_jwks.get_key(kid, http_client)
+    audience = [client_id for client_id in (GOOGLE_CLIENT_ID, GOOGLE_CLIENT_ID_EXTENSION) if client_id]
+    try:
+        claims = jwt.decode(
+            id_token,
+            key,
+            algorithms=["RS256"],
+            audience=audience,
+            issuer=GOOGLE_ID_TOKEN_ISSUERS,
+            options={"require": ["exp", "iat", "sub", "aud", "iss"]},
+        )
+    except jwt.ExpiredSignatureError:
+        raise HTTPException(status_code=401, detail="Token has expired")
+    except jwt.PyJWTError as e:
+        raise HTTPException(status_code=401, detail=f"ID token validation failed: {str(e)}")
+
+    if not claims.get("email"):
+        raise HTTPException(status_code=401, detail="ID token has no email claim")
+
+    return {
+        "id": claims["sub"],
+        "email": claims["email"],
+        "verified_email": claims.get("email_verified", False),
+        "name": claims.get("name", ""),
+        "given_name": claims.get("given_name"),
+        "family_name": claims.get("family_name"),
+        "picture": claims.get("picture"),
+    }
+
 
 async def find_or_create_user(user_info: dict, db: AsyncSession) -> User:
     """
@@ -150,20 +310,39 @@ async def find_or_create_user(user_info: dict, db: AsyncSession) -> User:
 def generate_jwt(user_info: dict) -> str:
     """
     Генерирует кастомный JWT для использования в API
+    (короткоживущий, с jti — по нему токен можно отозвать)
     """
+    now = datetime.now(timezone.utc)
     payload = {
         "sub": user_info["id"],
         "email": user_info["email"],
         "name": user_info.get("name", ""),
+        "typ": "access",
+        "jti": uuid.uuid4().hex,
+        "iat": now,
+        "exp": now + timedelta(seconds=ACCESS_TOKEN_TTL_SECONDS),
     }
     
     return jwt.encode(payload, JWT_SECRET, algorithm="HS256")
 
 
+def generate_refresh_token(user_id: str) -> str:
+    """Генерирует refresh token: по нему /auth/refresh выдаёт новую пару токенов."""
+    now = datetime.now(timezone.utc)
+    payload = {
+        "sub": user_id,
+        "typ": "refresh",
+        "jti": uuid.uuid4().hex,
+        "iat": now,
+        "exp": now + timedelta(seconds=REFRESH_TOKEN_TTL_SECONDS),
+    }
+    return jwt.encode(payload, JWT_SECRET, algorithm="HS256")
+
+
 async def authenticate_with_google_token(access_token: str, db: AsyncSession, http_client: httpx.AsyncClient) -> tuple[User, str]:
     """
     Полный flow аутентификации для Chrome Identity:
-    1. Валидирует Google токен
+    1. Валидирует Google токен (ID token — локально по JWKS, access token — через tokeninfo)
     2. Получает user info  
     3. Создает/находит пользователя в БД
     4. Генерирует кастомный JWT
@@ -172,7 +351,10 @@ async def authenticate_with_google_token(access_token: str, db: AsyncSession, ht
     """
     try:
         # Получаем и валидируем user info
-        user_info = await validate_and_get_user_info(access_token, http_client)
+        if is_id_token(access_token):
+            user_info = await verify_google_id_token(access_token, http_client)
+        else:
+            user_info = await validate_and_get_user_info(access_token, http_client)
         
         # Создаем/находим пользователя
         user = await find_or_create_user(user_info, db)
@@ -1,18 +1,55 @@
+import os
+from typing import Optional
 from sqlalchemy.orm import noload
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import func, select, desc, delete
-from dapmeet.models.meeting import Meeting
-from dapmeet.models.segment import TranscriptSegment
+from sqlalchemy import any_, bindparam, func, select, desc, insert, tuple_, update, String
+from sqlalchemy.dialects.postgresql import ARRAY, aggregate_order_by, insert as pg_insert
+from dapmeet.models.meeting import Meeting, meeting_speakers
+from dapmeet.models.segment import (
+    TranscriptSegment,
+    TranscriptSegmentLatest,
+    SEGMENT_UPSERT_KEY,
+    segment_change_seq,
+)
 from dapmeet.models.user import User
 from datetime import datetime, timedelta, timezone
 from dapmeet.schemas.meetings import MeetingCreate, MeetingOutList
+from dapmeet.schemas.segment import TranscriptSegmentCreate
+from dapmeet.services.activity_metrics import meetings_per_day
+from dapmeet.services.segment_events import segment_events
+from dapmeet.services.segment_partitions import SEGMENT_PARTITION_TABLE
+
+# Режим хранения версий сегментов:
+#  - "append" — каждая версия пишется отдельной строкой, а последняя версия каждой
+#    реплики дополнительно поддерживается в transcript_segments_latest;
+#  - "upsert" — одна строка на (session_id, google_meet_user_id, message_id), новая версия
+#    перезаписывает старую. Требует уникального индекса uq_transcript_segments_message
+#    (создаётся миграцией или командой `python -m dapmeet.cmd.segments enable-upsert`).
+SEGMENT_STORAGE_MODE = os.getenv("SEGMENT_STORAGE_MODE", "append").lower()
+
+if SEGMENT_STORAGE_MODE not in ("append", "upsert"):
+    raise ValueError(f"Unknown SEGMENT_STORAGE_MODE '{SEGMENT_STORAGE_MODE}', expected 'append' or 'upsert'.")
+# Уникальный ключ реплики на таблице, секционированной по created_at, невозможен
+if SEGMENT_STORAGE_MODE == "upsert" and SEGMENT_PARTITION_TABLE:
+    raise ValueError(
+        "SEGMENT_STORAGE_MODE=upsert cannot be combined with SEGMENT_PARTITION_TABLE=1: "
+        "a partitioned transcript_segments cannot keep a unique key without created_at."
+    )
+
+
+def _row_key(row: dict) -> tuple:
+    return tuple(row[column] for column in SEGMENT_UPSERT_KEY)
+
+
+def _segment_key(segment: TranscriptSegment) -> tuple:
+    return tuple(getattr(segment, column) for column in SEGMENT_UPSERT_KEY)
 
 
 class MeetingService:
     def __init__(self, db: AsyncSession):
         self.db = db
 
-    async def get_or_create_meeting(self, meeting_data: MeetingCreate, user: User) -> Meeting:
+    async def get_or_create_meeting(self, meeting_data: MeetingCreate, user: User) -> tuple[Meeting, bool]:
         """
         Получает или создаёт встречу по уникальному ID сессии.
         Правила:
@@ -20,51 +57,58 @@ class MeetingService:
             создаём новую с unique_session_id = "<base_session_id>-<YYYY-MM-DD>" (дата без времени).
         - Если прошло < 24 часов — продолжаем писать в существующую.
         - Если встречи нет — создаём новую (без суффикса).
+
+        Безопасно при параллельных вызовах: создание — это INSERT ... ON CONFLICT DO NOTHING,
+        и проигравший запрос просто читает встречу победителя.
+        Возвращает (встреча, создана ли она этим вызовом).
         """
         base_session_id = f"{meeting_data.id}-{user.id}"
         now_utc = datetime.now(timezone.utc)
 
         # Ищем последнюю встречу по этому base_session_id (включая старые с суффиксом даты)
+        last_meeting = await self.get_latest_meeting(base_session_id)
+
+        if last_meeting is None:
+            # Встреч не было — создаём первую (без суффикса)
+            unique_session_id = base_session_id
+        elif now_utc - last_meeting.created_at < timedelta(hours=24):
+            # Меньше 24 часов — используем существующую встречу
+            return last_meeting, False
+        else:
+            # Больше/равно 24 часов — создаём новую с суффиксом даты (без времени)
+            unique_session_id = f"{base_session_id}-{now_utc.date().isoformat()}"
+
+        result = await self.db.scalars(
+            pg_insert(Meeting)
+            .values(
+                unique_session_id=unique_session_id,
+                meeting_id=meeting_data.id,
+                user_id=user.id,
+                title=meeting_data.title,
+            )
+            .on_conflict_do_nothing(index_elements=[Meeting.unique_session_id])
+            .returning(Meeting)
+        )
+        meeting = result.one_or_none()
+        created = meeting is not None
+        if not created:
+            # Встречу только что создал параллельный запрос — берём её
+            meeting = await self.db.get(Meeting, unique_session_id)
+        await self.db.commit()
+        if created:
+            meetings_per_day.increment(meeting.created_at)
+        return meeting, created
+
+    async def get_latest_meeting(self, base_session_id: str) -> Meeting | None:
+        """Последняя встреча серии по индексу (base_session_id, created_at DESC)."""
         result = await self.db.execute(
             select(Meeting)
-            .where(Meeting.unique_session_id.like(f"{base_session_id}%"))
+            .where(Meeting.base_session_id == base_session_id)
             .order_by(desc(Meeting.created_at))
             .limit(1)
         )
-        last_meeting = result.scalar_one_or_none()
-
-        if last_meeting:
-            age = now_utc - last_meeting.created_at
-            if age < timedelta(hours=24):
-                # Меньше 24 часов — используем существующую встречу
-                return last_meeting
-            else:
-                # Больше/равно 24 часов — создаём новую с суффиксом даты (без времени)
-                suffix = now_utc.date().isoformat()  # YYYY-MM-DD
-                new_unique_session_id = f"{base_session_id}-{suffix}"
-
-                new_meeting = Meeting(
-                    unique_session_id=new_unique_session_id,
-                    meeting_id=meeting_data.id,
-                    user_id=user.id,
-                    title=meeting_data.title,
-                )
-                self.db.add(new_meeting)
-                await self.db.commit()
-                await self.db.refresh(new_meeting)
-                return new_meeting
-
-        # Встреч не было — создаём первую (без суффикса)
-        new_meeting = Meeting(
-            unique_session_id=base_session_id,
-            meeting_id=meeting_data.id,
-            user_id=user.id,
-            title=meeting_data.title,
-        )
-        self.db.add(new_meeting)
-        await self.db.commit()
-        await self.db.refresh(new_meeting)
-        return new_meeting
+        return result.scalar_one_or_none()
+
     async def get_meeting_by_session_id(self, session_id: str, user_id: str) -> Meeting | None:
         """Получает одну встречу по ID сессии без связанных сегментов."""
         u_session_id = f"{session_id}-{user_id}"
@@ -76,87 +120,321 @@ class MeetingService:
         )
         return result.scalar_one_or_none()
 
-    async def get_latest_segments_for_session(self, session_id: str) -> list[TranscriptSegment]:
+    @staticmethod
+    def build_segment_rows(session_id: str, segments: list[TranscriptSegmentCreate]) -> list[dict]:
+        """Готовит строки transcript_segments для вставки (в т.ч. отложенной)."""
+        return [
+            {
+                "session_id": session_id,
+                "google_meet_user_id": seg.google_meet_user_id,
+                "speaker_username": seg.username,
+                "timestamp": seg.timestamp,
+                "text": seg.text,
+                "version": seg.ver,
+                "message_id": seg.mess_id,
+            }
+            for seg in segments
+        ]
+
+    async def insert_segment_rows(self, rows: list[dict]) -> list[TranscriptSegment]:
         """
-        Получает и обрабатывает сегменты транскрипции для указанной сессии,
-        используя SQL-запрос для фильтрации и сортировки.
+        Сохраняет строки сегментов (возможно, разных встреч) одним многострочным
+        INSERT ... RETURNING и одним COMMIT, без отдельного refresh() на каждую строку.
         """
-        partition_key = TranscriptSegment.google_meet_user_id + '-' + TranscriptSegment.message_id
-        cte = (
-            select(
-                TranscriptSegment,
-                func.row_number()
-                .over(
-                    partition_by=partition_key,
-                    order_by=[TranscriptSegment.message_id, TranscriptSegment.version.desc()],
+        session_ids = sorted({row["session_id"] for row in rows})
+        await self._bump_revisions(session_ids)
+        if SEGMENT_STORAGE_MODE == "upsert":
+            stored = await self._upsert_segment_rows(rows)
+        else:
+            result = await self.db.scalars(
+                insert(TranscriptSegment).values(rows).returning(TranscriptSegment)
+            )
+            stored = result.all()
+            await self._update_latest_segments(stored)
+        await self._add_speakers(rows)
+        await self.db.commit()
+        # Будим SSE-подписчиков только после коммита, чтобы они увидели новые строки
+        await segment_events.publish(session_ids)
+        return stored
+
+    async def _add_speakers(self, rows: list[dict]) -> None:
+        """Дописывает новых спикеров в meeting_speakers; уже известные пропускаются ON CONFLICT."""
+        speakers = sorted({(row["session_id"], row["speaker_username"]) for row in rows})
+        await self.db.execute(
+            pg_insert(meeting_speakers)
+            .values([{"session_id": session_id, "speaker_username": username} for session_id, username in speakers])
+            .on_conflict_do_nothing()
+        )
+
+    async def get_speakers(self, session_id: str) -> list[str]:
+        result = await self.db.execute(
+            select(meeting_speakers.c.speaker_username)
+            .where(meeting_speakers.c.session_id == session_id)
+            .order_by(meeting_speakers.c.speaker_username)
+        )
+        return result.scalars().all()
+
+    async def _bump_revisions(self, session_ids: list[str]) -> None:
+        """
+        Увеличивает Meeting.revision в той же транзакции, что и запись сегментов.
+        Встречи блокируются первыми и в одном порядке (подзапрос ORDER BY ... FOR UPDATE),
+        поэтому параллельные записи в одни встречи выстраиваются в очередь, а не ловят
+        deadlock. Один запрос на всю пачку, сколько бы встреч в ней ни было.
+        """
+        locked = (
+            select(Meeting.unique_session_id)
+            .where(Meeting.unique_session_id == any_(bindparam("session_ids", session_ids, type_=ARRAY(String))))
+            .order_by(Meeting.unique_session_id)
+            .with_for_update()
+            .subquery()
+        )
+        await self.db.execute(
+            update(Meeting)
+            .where(Meeting.unique_session_id == locked.c.unique_session_id)
+            .values(revision=Meeting.revision + 1)
+        )
+
+    async def _update_latest_segments(self, segments: list[TranscriptSegment]) -> None:
+        """Продвигает transcript_segments_latest на только что записанные версии (в той же транзакции)."""
+        latest: dict[tuple, TranscriptSegment] = {}
+        for seg in segments:
+            key = (seg.session_id, seg.google_meet_user_id, seg.message_id or "")
+            if key not in latest or (seg.version, seg.id) > (latest[key].version, latest[key].id):
+                latest[key] = seg
+
+        stmt = pg_insert(TranscriptSegmentLatest).values([
+            {
+                "session_id": session_id,
+                "google_meet_user_id": google_meet_user_id,
+                "message_id": message_id,
+                "segment_id": seg.id,
+                "speaker_username": seg.speaker_username,
+                "timestamp": seg.timestamp,
+                "text": seg.text,
+                "version": seg.version,
+                "created_at": seg.created_at,
+                "first_seen_at": seg.created_at,
+            }
+            for (session_id, google_meet_user_id, message_id), seg in latest.items()
+        ])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["session_id", "google_meet_user_id", "message_id"],
+            set_={
+                "segment_id": stmt.excluded.segment_id,
+                "speaker_username": stmt.excluded.speaker_username,
+                "timestamp": stmt.excluded.timestamp,
+                "text": stmt.excluded.text,
+                "version": stmt.excluded.version,
+                "created_at": stmt.excluded.created_at,
+                "change_seq": segment_change_seq.next_value(),
+            },
+            where=stmt.excluded.version > TranscriptSegmentLatest.version,
+        )
+        await self.db.execute(stmt)
+
+    async def _upsert_segment_rows(self, rows: list[dict]) -> list[TranscriptSegment]:
+        """
+        INSERT ... ON CONFLICT DO UPDATE WHERE excluded.version > version.
+        Возвращает актуальную строку для каждой входной строки (в том же порядке),
+        даже если пришедшая версия оказалась устаревшей и ничего не перезаписала.
+        """
+        # Строки без message_id не конфликтуют и вставляются как есть;
+        # повторы одного ключа внутри пачки схлопываем до старшей версии,
+        # иначе Postgres откажется обновлять одну строку дважды.
+        keyed: dict[tuple, dict] = {}
+        unkeyed: list[dict] = []
+        for row in rows:
+            if row["message_id"] is None:
+                unkeyed.append(row)
+                continue
+            key = _row_key(row)
+            if key not in keyed or row["version"] >= keyed[key]["version"]:
+                keyed[key] = row
+
+        stmt = pg_insert(TranscriptSegment).values(list(keyed.values()) + unkeyed)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(SEGMENT_UPSERT_KEY),
+            set_={
+                "speaker_username": stmt.excluded.speaker_username,
+                "timestamp": stmt.excluded.timestamp,
+                "text": stmt.excluded.text,
+                "version": stmt.excluded.version,
+                "change_seq": segment_change_seq.next_value(),
+            },
+            where=stmt.excluded.version > TranscriptSegment.version,
+        ).returning(TranscriptSegment)
+        result = await self.db.scalars(stmt, execution_options={"populate_existing": True})
+        written = result.all()
+
+        by_key = {_segment_key(seg): seg for seg in written if seg.message_id is not None}
+        unkeyed_written = iter([seg for seg in written if seg.message_id is None])
+
+        # Устаревшие версии не попали в RETURNING — дочитываем текущие строки
+        missing = [key for key in keyed if key not in by_key]
+        if missing:
+            current = await self.db.scalars(
+                select(TranscriptSegment).where(
+                    tuple_(*(getattr(TranscriptSegment, column) for column in SEGMENT_UPSERT_KEY)).in_(missing)
                 )
-                .label("row_num"),
-                func.min(TranscriptSegment.created_at)
-                .over(partition_by=partition_key)
-                .label("min_timestamp"),
             )
-            .where(TranscriptSegment.session_id == session_id)
-            .cte("ranked_segments")
+            by_key.update({_segment_key(seg): seg for seg in current})
+
+        return [
+            next(unkeyed_written) if row["message_id"] is None else by_key[_row_key(row)]
+            for row in rows
+        ]
+
+    async def add_segments(self, session_id: str, segments: list[TranscriptSegmentCreate]) -> list[TranscriptSegment]:
+        """Сохраняет пачку сегментов одной встречи в одной транзакции."""
+        return await self.insert_segment_rows(self.build_segment_rows(session_id, segments))
+
+    async def get_latest_segments_for_session(self, session_id: str) -> list[TranscriptSegment]:
+        """
+        Возвращает последние версии сегментов сессии в порядке первого появления.
+        Режим append читает готовую таблицу transcript_segments_latest, режим upsert —
+        саму transcript_segments (там уже только последние версии).
+        """
+        if SEGMENT_STORAGE_MODE == "upsert":
+            result = await self.db.scalars(
+                select(TranscriptSegment)
+                .where(TranscriptSegment.session_id == session_id)
+                .order_by(TranscriptSegment.created_at, TranscriptSegment.timestamp, TranscriptSegment.version)
+            )
+            return list(result.all())
+
+        result = await self.db.scalars(
+            select(TranscriptSegmentLatest)
+            .where(TranscriptSegmentLatest.session_id == session_id)
+            .order_by(
+                TranscriptSegmentLatest.first_seen_at,
+                TranscriptSegmentLatest.timestamp,
+                TranscriptSegmentLatest.version,
+            )
+        )
+        return [self._latest_to_segment(latest) for latest in result.all()]
+
+    async def get_segment_changes(
+        self, session_id: str, since: int, limit: int
+    ) -> tuple[list[TranscriptSegment], int, bool]:
+        """
+        Возвращает актуальные версии сегментов, вставленные или перезаписанные после
+        курсора since (change_seq), в порядке изменения. Результат: (сегменты, новый курсор,
+        есть ли ещё изменения). Стоимость пропорциональна числу новых изменений, а не длине встречи.
+        """
+        model = TranscriptSegment if SEGMENT_STORAGE_MODE == "upsert" else TranscriptSegmentLatest
+        result = await self.db.scalars(
+            select(model)
+            .where(model.session_id == session_id, model.change_seq > since)
+            .order_by(model.change_seq)
+            .limit(limit + 1)
         )
+        changed = list(result.all())
+        has_more = len(changed) > limit
+        changed = changed[:limit]
+        cursor = changed[-1].change_seq if changed else since
 
-        segment_columns = [c for c in cte.c if c.name not in ('row_num', 'min_timestamp')]
+        if model is TranscriptSegmentLatest:
+            changed = [self._latest_to_segment(latest) for latest in changed]
+        return changed, cursor, has_more
 
-        query = (
-            select(*segment_columns)
-            .where(cte.c.row_num == 1)
-            .order_by(cte.c.min_timestamp, cte.c.timestamp, cte.c.version)
+    async def get_segment_summary(self, session_id: str) -> tuple[int, int]:
+        """
+        Число актуальных сегментов встречи и текущий курсор change_seq — одним
+        index-only проходом по (session_id, change_seq), без чтения текстов.
+        """
+        model = TranscriptSegment if SEGMENT_STORAGE_MODE == "upsert" else TranscriptSegmentLatest
+        result = await self.db.execute(
+            select(func.count(), func.coalesce(func.max(model.change_seq), 0))
+            .where(model.session_id == session_id)
+        )
+        count, cursor = result.one()
+        return count, cursor
+
+    @staticmethod
+    def _latest_to_segment(latest: TranscriptSegmentLatest) -> TranscriptSegment:
+        return TranscriptSegment(
+            id=latest.segment_id,
+            session_id=latest.session_id,
+            google_meet_user_id=latest.google_meet_user_id,
+            speaker_username=latest.speaker_username,
+            timestamp=latest.timestamp,
+            text=latest.text,
+            version=latest.version,
+            message_id=latest.message_id or None,
+            created_at=latest.created_at,
+            change_seq=latest.change_seq,
         )
-        
-        exec_result = await self.db.execute(query)
-        rows = exec_result.mappings().all()
-        return [TranscriptSegment(**row) for row in rows]
 
     # In MeetingService
-    async def get_meetings_with_speakers(self, user_id: int, session_id: str = None) -> list[MeetingOutList]:
+    async def get_meetings_with_speakers(
+        self,
+        user_id: int,
+        session_id: str = None,
+        limit: Optional[int] = None,
+        after: Optional[tuple[datetime, str]] = None,
+    ) -> list[MeetingOutList]:
         """
         Get meetings with speakers - can be filtered to a single meeting or get all user meetings
-        
+
         Args:
             user_id: User ID to filter meetings
             session_id: Optional session ID to get specific meeting only
-        
+            limit: Optional page size
+            after: Optional keyset cursor (created_at, unique_session_id) of the last meeting
+                of the previous page
+
         Returns:
-            List of MeetingOutList objects
+            List of MeetingOutList objects, newest first
         """
-        # Base query with join and aggregation
-        base_stmt = (
-            select(
-                Meeting.unique_session_id,
-                Meeting.meeting_id,
-                Meeting.user_id,
-                Meeting.title,
-                Meeting.created_at,
-                func.array_agg(func.distinct(TranscriptSegment.speaker_username)).label('speakers'),
-            )
-            .select_from(Meeting)
-            .join(TranscriptSegment, Meeting.unique_session_id == TranscriptSegment.session_id, isouter=True)
-            .where(Meeting.user_id == user_id)
-        )
-        
+        # Сначала выбираем страницу встреч по индексу (user_id, created_at, unique_session_id),
+        # и только для неё собираем спикеров — стоимость не зависит от истории аккаунта
+        page_stmt = select(
+            Meeting.unique_session_id,
+            Meeting.meeting_id,
+            Meeting.user_id,
+            Meeting.title,
+            Meeting.created_at,
+        ).where(Meeting.user_id == user_id)
+
         # Add session filter if specified
         if session_id:
-            base_stmt = base_stmt.where(Meeting.unique_session_id == session_id)
-        
-        # Group and order
+            page_stmt = page_stmt.where(Meeting.unique_session_id == session_id)
+        if after is not None:
+            page_stmt = page_stmt.where(tuple_(Meeting.created_at, Meeting.unique_session_id) < after)
+
+        page_stmt = page_stmt.order_by(Meeting.created_at.desc(), Meeting.unique_session_id.desc())
+        if limit is not None:
+            page_stmt = page_stmt.limit(limit)
+        page = page_stmt.subquery()
+
+        # Join and aggregation over the page only; speakers come from meeting_speakers,
+        # so the cost is O(speakers), not O(segments)
         base_stmt = (
-            base_stmt.group_by(
-                Meeting.unique_session_id,
-                Meeting.meeting_id,
-                Meeting.user_id,
-                Meeting.title,
-                Meeting.created_at,
+            select(
+                page.c.unique_session_id,
+                page.c.meeting_id,
+                page.c.user_id,
+                page.c.title,
+                page.c.created_at,
+                func.array_agg(
+                    aggregate_order_by(meeting_speakers.c.speaker_username, meeting_speakers.c.speaker_username)
+                ).label('speakers'),
             )
-            .order_by(Meeting.created_at.desc())
+            .select_from(page)
+            .join(meeting_speakers, page.c.unique_session_id == meeting_speakers.c.session_id, isouter=True)
+            .group_by(
+                page.c.unique_session_id,
+                page.c.meeting_id,
+                page.c.user_id,
+                page.c.title,
+                page.c.created_at,
+            )
+            .order_by(page.c.created_at.desc(), page.c.unique_session_id.desc())
         )
-        
+
         exec_result = await self.db.execute(base_stmt)
         results = exec_result.all()
-        
+
         return [
             MeetingOutList(
                 unique_session_id=row.unique_session_id,
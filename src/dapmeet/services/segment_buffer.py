@@ -0,0 +1,161 @@
+# Отложенная запись (write-behind) сегментов транскрипции.
+#
+# Включается переменной окружения SEGMENT_WRITE_BEHIND=1. Эндпоинты кладут
+# строки в буфер процесса и сразу отвечают 202, а фоновая задача из lifespan
+# сбрасывает их в БД одним INSERT каждые SEGMENT_FLUSH_INTERVAL_MS миллисекунд
+# или как только накопилось SEGMENT_FLUSH_MAX_ROWS строк. Если пачка не
+# записалась, она повторяется по встречам в отдельных транзакциях, и теряются
+# (dropped_rows) только строки встреч, запись которых не удалась. При остановке
+# приложения буфер дописывается до конца.
+
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from dapmeet.services.meetings import MeetingService
+
+logger = logging.getLogger(__name__)
+
+
+class SegmentWriteBuffer:
+    def __init__(
+        self,
+        session_factory: async_sessionmaker,
+        flush_interval_ms: int = 200,
+        flush_max_rows: int = 500,
+        max_rows: int = 10000,
+    ):
+        self.session_factory = session_factory
+        self.flush_interval = flush_interval_ms / 1000
+        self.flush_max_rows = flush_max_rows
+        self.max_rows = max_rows
+
+        self._rows: deque = deque()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._closed = False
+
+        # Счётчики для подбора параметров под нагрузкой
+        self.enqueued_rows = 0
+        self.flushed_rows = 0
+        self.dropped_rows = 0
+        self.overflow_rows = 0
+        self.flushes = 0
+        self.failed_flushes = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self.total_flush_ms = 0.0
+
+    @classmethod
+    def from_env(cls, session_factory: Optional[async_sessionmaker]) -> Optional["SegmentWriteBuffer"]:
+        """Создаёт буфер, если он включён в окружении, иначе возвращает None."""
+        enabled = os.getenv("SEGMENT_WRITE_BEHIND", "").lower() in ("1", "true", "yes")
+        if not enabled or session_factory is None:
+            return None
+        return cls(
+            session_factory,
+            flush_interval_ms=int(os.getenv("SEGMENT_FLUSH_INTERVAL_MS", "200")),
+            flush_max_rows=int(os.getenv("SEGMENT_FLUSH_MAX_ROWS", "500")),
+            max_rows=int(os.getenv("SEGMENT_BUFFER_MAX_ROWS", "10000")),
+        )
+
+    def enqueue(self, rows: List[dict]) -> bool:
+        """
+        Кладёт строки в буфер. Возвращает False, если буфер закрыт или переполнен —
+        тогда вызывающий код должен записать строки синхронно.
+        """
+        if self._closed or len(self._rows) + len(rows) > self.max_rows:
+            self.overflow_rows += len(rows)
+            return False
+        self._rows.extend(rows)
+        self.enqueued_rows += len(rows)
+        if len(self._rows) >= self.flush_max_rows:
+            self._wakeup.set()
+        return True
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Закрывает буфер для новых строк и дописывает всё накопленное."""
+        self._closed = True
+        self._wakeup.set()
+        if self._task is not None:
+            await self._task
+        await self._flush_pending()
+
+    async def _run(self) -> None:
+        while not self._closed:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self._flush_pending()
+
+    async def _flush_pending(self) -> None:
+        while self._rows:
+            batch_size = min(len(self._rows), self.flush_max_rows)
+            batch = [self._rows.popleft() for _ in range(batch_size)]
+            await self._flush(batch)
+
+    async def _flush(self, batch: List[dict]) -> None:
+        started = time.perf_counter()
+        try:
+            await self._write(batch)
+            written = len(batch)
+        except Exception as e:
+            # Одна плохая встреча (например, удалённая) не должна терять сегменты остальных
+            self.failed_flushes += 1
+            logger.warning(f"Failed to flush {len(batch)} buffered segments, retrying per meeting: {str(e)}")
+            written = await self._write_per_session(batch)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.flushes += 1
+        self.flushed_rows += written
+        self.last_flush_ms = elapsed_ms
+        self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+        self.total_flush_ms += elapsed_ms
+
+    async def _write(self, rows: List[dict]) -> None:
+        async with self.session_factory() as db:
+            await MeetingService(db).insert_segment_rows(rows)
+
+    async def _write_per_session(self, batch: List[dict]) -> int:
+        """Пишет пачку по встречам, каждую в своей транзакции. Возвращает число записанных строк."""
+        by_session: Dict[str, List[dict]] = {}
+        for row in batch:
+            by_session.setdefault(row["session_id"], []).append(row)
+        written = 0
+        for session_id, rows in by_session.items():
+            try:
+                await self._write(rows)
+                written += len(rows)
+            except Exception as e:
+                self.dropped_rows += len(rows)
+                logger.error(f"Dropped {len(rows)} buffered segments of meeting {session_id}: {str(e)}")
+        return written
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": True,
+            "queue_depth": len(self._rows),
+            "queue_capacity": self.max_rows,
+            "flush_interval_ms": self.flush_interval * 1000,
+            "flush_max_rows": self.flush_max_rows,
+            "enqueued_rows": self.enqueued_rows,
+            "flushed_rows": self.flushed_rows,
+            "dropped_rows": self.dropped_rows,
+            "overflow_rows": self.overflow_rows,
+            "flushes": self.flushes,
+            "failed_flushes": self.failed_flushes,
+            "flush_latency_ms": {
+                "last": round(self.last_flush_ms, 2),
+                "avg": round(self.total_flush_ms / self.flushes, 2) if self.flushes else 0.0,
+                "max": round(self.max_flush_ms, 2),
+            },
+        }
@@ -0,0 +1,120 @@
+# Pub/sub уведомлений «в сессии появились новые сегменты».
+#
+# Событие несёт только unique_session_id: подписчик (SSE-поток) сам дочитывает
+# изменения по курсору change_seq, поэтому несколько уведомлений подряд
+# схлопываются в один запрос, а пропущенных данных не бывает.
+#
+# Бэкенд выбирается переменной SEGMENT_EVENTS_BACKEND:
+#   - "memory" (по умолчанию) — доставка внутри одного процесса;
+#   - "postgres" — LISTEN/NOTIFY через отдельное asyncpg-соединение, чтобы
+#     события видели все uvicorn-воркеры и инстансы.
+
+import asyncio
+import logging
+import os
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Iterable, Optional, Set
+
+from sqlalchemy.engine import make_url
+
+logger = logging.getLogger(__name__)
+
+NOTIFY_CHANNEL = "transcript_segments"
+
+
+class SegmentEventHub:
+    def __init__(self):
+        self._subscribers: Dict[str, Set[asyncio.Event]] = defaultdict(set)
+        self._connection: Optional[Any] = None  # asyncpg.Connection
+        self._lock = asyncio.Lock()
+        self._dsn: Optional[str] = None
+        self.backend = "memory"
+
+    async def start(self, backend: str, database_url: Optional[str]) -> None:
+        """Подключает выбранный бэкенд. Без вызова start() работает in-process доставка."""
+        if backend not in ("memory", "postgres"):
+            raise ValueError(f"Unknown SEGMENT_EVENTS_BACKEND '{backend}', expected 'memory' or 'postgres'.")
+        if backend == "postgres":
+            if not database_url:
+                raise RuntimeError("SEGMENT_EVENTS_BACKEND=postgres requires DATABASE_URL_ASYNC.")
+            # asyncpg принимает обычный postgresql:// DSN без указания драйвера SQLAlchemy
+            self._dsn = make_url(database_url).set(drivername="postgresql").render_as_string(hide_password=False)
+            await self._connect()
+        self.backend = backend
+
+    async def stop(self) -> None:
+        if self._connection is not None:
+            connection, self._connection = self._connection, None
+            await connection.close()
+
+    async def _connect(self) -> None:
+        # asyncpg нужен только бэкенду postgres — не импортируем его заранее
+        import asyncpg
+
+        self._connection = await asyncpg.connect(self._dsn)
+        await self._connection.add_listener(NOTIFY_CHANNEL, self._on_notify)
+        self._connection.add_termination_listener(self._on_terminated)
+
+    def _on_terminated(self, connection) -> None:
+        if self._connection is connection:
+            logger.warning("Segment events LISTEN connection lost, reconnecting")
+            self._connection = None
+            asyncio.get_running_loop().create_task(self._reconnect())
+
+    async def _reconnect(self) -> None:
+        delay = 1.0
+        while self._connection is None and self.backend == "postgres":
+            try:
+                await self._connect()
+            except Exception as e:
+                logger.error(f"Segment events reconnect failed: {str(e)}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30.0)
+                continue
+            # За время разрыва могли быть пропущены уведомления — будим всех подписчиков
+            for session_id in list(self._subscribers):
+                self._dispatch(session_id)
+
+    def _on_notify(self, connection, pid, channel, payload) -> None:
+        self._dispatch(payload)
+
+    def _dispatch(self, session_id: str) -> None:
+        for event in self._subscribers.get(session_id, ()):
+            event.set()
+
+    async def publish(self, session_ids: Iterable[str]) -> None:
+        """Сообщает подписчикам, что в сессиях есть изменения. Ошибки доставки не пробрасываются."""
+        if self.backend == "memory":
+            for session_id in session_ids:
+                self._dispatch(session_id)
+            return
+
+        if self._connection is None:
+            # Соединение переподключается; подписчики догонят по курсору при следующем событии
+            return
+        try:
+            async with self._lock:
+                for session_id in session_ids:
+                    await self._connection.execute("SELECT pg_notify($1, $2)", NOTIFY_CHANNEL, session_id)
+        except Exception as e:
+            logger.error(f"Failed to publish segment events: {str(e)}")
+
+    @asynccontextmanager
+    async def subscribe(self, session_id: str) -> AsyncIterator[asyncio.Event]:
+        """Событие, которое выставляется при каждом изменении сессии (сбрасывает подписчик)."""
+        event = asyncio.Event()
+        self._subscribers[session_id].add(event)
+        try:
+            yield event
+        finally:
+            self._subscribers[session_id].discard(event)
+            if not self._subscribers[session_id]:
+                del self._subscribers[session_id]
+
+
+segment_events = SegmentEventHub()
+
+
+async def start_segment_events(database_url: Optional[str]) -> None:
+    await segment_events.start(os.getenv("SEGMENT_EVENTS_BACKEND", "memory").lower(), database_url)
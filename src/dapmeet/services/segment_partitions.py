@@ -0,0 +1,259 @@
+# Помесячные партиции transcript_segments.
+#
+# После перевода (миграция e7a94c0b2d16 с SEGMENT_PARTITION_TABLE=1 или
+# `python -m dapmeet.cmd.segments partition`) таблица секционирована по created_at
+# (RANGE, месяц на партицию, UTC). Партиции на текущий и SEGMENT_PARTITION_MONTHS_AHEAD
+# следующих месяцев создаются заранее: при старте приложения и затем раз в
+# SEGMENT_PARTITION_CHECK_SECONDS. Несколько воркеров не мешают друг другу —
+# создание идёт под advisory lock. Строки вне созданных диапазонов попадают в
+# transcript_segments_default, чтобы вставка не падала, если обслуживание отстало;
+# когда партиция месяца всё же создаётся, его строки переносятся в неё из default.
+#
+# Старые партиции отцепляются командой
+# `python -m dapmeet.cmd.segments detach-partitions --before YYYY-MM` и остаются
+# обычными таблицами для архивации. Если таблица не секционирована (перевод не
+# выполнялся или включён режим upsert), всё здесь — no-op.
+
+import asyncio
+import logging
+import os
+from datetime import date, datetime, timezone
+from typing import Optional
+
+from sqlalchemy import Connection, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from dapmeet.models.segment import SEGMENT_UPSERT_INDEX, TranscriptSegment
+
+logger = logging.getLogger(__name__)
+
+# Перевод таблицы на партиции при миграции e7a94c0b2d16; несовместим с режимом upsert
+SEGMENT_PARTITION_TABLE = os.getenv("SEGMENT_PARTITION_TABLE", "").lower() in ("1", "true", "yes")
+SEGMENT_PARTITION_MONTHS_AHEAD = int(os.getenv("SEGMENT_PARTITION_MONTHS_AHEAD", "2"))
+SEGMENT_PARTITION_CHECK_SECONDS = float(os.getenv("SEGMENT_PARTITION_CHECK_SECONDS", str(6 * 3600)))
+
+SEGMENTS_TABLE = TranscriptSegment.__tablename__
+DEFAULT_PARTITION = f"{SEGMENTS_TABLE}_default"
+# Ключ pg_advisory_xact_lock для создания партиций
+PARTITION_LOCK_ID = 0x73656773
+
+IS_PARTITIONED_SQL = text(f"SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass('{SEGMENTS_TABLE}')")
+
+PARTITIONS_SQL = text(f"""
+    SELECT c.relname
+    FROM pg_inherits i
+    JOIN pg_class c ON c.oid = i.inhrelid
+    WHERE i.inhparent = '{SEGMENTS_TABLE}'::regclass
+""")
+
+LOCK_SQL = text("SELECT pg_advisory_xact_lock(:lock_id)").bindparams(lock_id=PARTITION_LOCK_ID)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{SEGMENTS_TABLE}_p{month:%Y_%m}"
+
+
+def parse_partition_month(name: str) -> Optional[date]:
+    """Месяц партиции по её имени или None для default и чужих таблиц."""
+    prefix = f"{SEGMENTS_TABLE}_p"
+    if not name.startswith(prefix):
+        return None
+    try:
+        return datetime.strptime(name[len(prefix):], "%Y_%m").date()
+    except ValueError:
+        return None
+
+
+def _create_partition_sql(name: str, month: date) -> str:
+    bounds = f"FROM ('{month} 00:00:00+00') TO ('{add_months(month, 1)} 00:00:00+00')"
+    in_range = f"created_at >= '{month} 00:00:00+00' AND created_at < '{add_months(month, 1)} 00:00:00+00'"
+    # Если строки этого месяца уже попали в default, CREATE TABLE ... PARTITION OF
+    # упадёт на проверке default. Тогда переносим их в отдельную таблицу и
+    # подключаем её партицией; default блокируется на время переноса, чтобы
+    # параллельная вставка не положила туда новые строки месяца.
+    return f"""
+        DO $$
+        BEGIN
+            IF to_regclass('{name}') IS NOT NULL THEN
+                RETURN;
+            END IF;
+            IF to_regclass('{DEFAULT_PARTITION}') IS NOT NULL THEN
+                LOCK TABLE {DEFAULT_PARTITION} IN ACCESS EXCLUSIVE MODE;
+                IF EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE {in_range}) THEN
+                    CREATE TABLE {name} (LIKE {SEGMENTS_TABLE} INCLUDING DEFAULTS);
+                    WITH moved AS (
+                        DELETE FROM {DEFAULT_PARTITION} WHERE {in_range} RETURNING *
+                    )
+                    INSERT INTO {name} SELECT * FROM moved;
+                    ALTER TABLE {SEGMENTS_TABLE} ATTACH PARTITION {name} FOR VALUES {bounds};
+                    RETURN;
+                END IF;
+            END IF;
+            CREATE TABLE {name} PARTITION OF {SEGMENTS_TABLE} FOR VALUES {bounds};
+        END $$
+    """
+
+
+# Индексы и FK transcript_segments; на секционированной таблице создаются на родителе
+# и сами переходят на все партиции
+SEGMENT_INDEXES_SQL = f"""
+    CREATE INDEX ix_transcript_segments_timestamp ON {SEGMENTS_TABLE} (timestamp);
+    CREATE INDEX ix_transcript_segments_session_message_version
+        ON {SEGMENTS_TABLE} (session_id, google_meet_user_id, message_id, version DESC);
+    CREATE INDEX ix_transcript_segments_session_speaker ON {SEGMENTS_TABLE} (session_id, speaker_username);
+    CREATE INDEX ix_transcript_segments_created_at ON {SEGMENTS_TABLE} (created_at DESC);
+    CREATE INDEX ix_transcript_segments_session_change_seq ON {SEGMENTS_TABLE} (session_id, change_seq);
+    ALTER TABLE {SEGMENTS_TABLE} ADD CONSTRAINT transcript_segments_session_id_fkey
+        FOREIGN KEY (session_id) REFERENCES meetings (unique_session_id) ON DELETE CASCADE;
+"""
+
+DROP_SEGMENT_INDEXES_SQL = """
+    DROP INDEX IF EXISTS ix_transcript_segments_timestamp;
+    DROP INDEX IF EXISTS ix_transcript_segments_session_message_version;
+    DROP INDEX IF EXISTS ix_transcript_segments_session_speaker;
+    DROP INDEX IF EXISTS ix_transcript_segments_created_at;
+    DROP INDEX IF EXISTS ix_transcript_segments_session_change_seq;
+"""
+
+
+def partition_table_sql(months_ahead: int) -> str:
+    """
+    DO-блок перевода transcript_segments на помесячные партиции (миграция
+    e7a94c0b2d16 и `segments partition`). Партиции покрывают уже записанные
+    месяцы и months_ahead месяцев вперёд; строки копируются под ACCESS EXCLUSIVE
+    блокировкой. Ничего не делает, если таблица уже секционирована или есть
+    уникальный индекс режима upsert.
+    """
+    return f"""
+        DO $$
+        DECLARE
+            id_sequence text := pg_get_serial_sequence('{SEGMENTS_TABLE}', 'id');
+            -- Границы месяцев считаются в UTC
+            month_start timestamp;
+            last_month timestamp := date_trunc('month', now() AT TIME ZONE 'UTC')
+                                    + interval '{int(months_ahead)} months';
+        BEGIN
+            IF (SELECT relkind FROM pg_class WHERE oid = '{SEGMENTS_TABLE}'::regclass) = 'p' THEN
+                RAISE NOTICE '{SEGMENTS_TABLE} is already partitioned';
+                RETURN;
+            END IF;
+            IF to_regclass('{SEGMENT_UPSERT_INDEX}') IS NOT NULL THEN
+                RAISE NOTICE '{SEGMENT_UPSERT_INDEX} exists (upsert mode): {SEGMENTS_TABLE} is not partitioned';
+                RETURN;
+            END IF;
+
+            LOCK TABLE {SEGMENTS_TABLE} IN ACCESS EXCLUSIVE MODE;
+            ALTER TABLE {SEGMENTS_TABLE} RENAME TO {SEGMENTS_TABLE}_unpartitioned;
+            ALTER TABLE {SEGMENTS_TABLE}_unpartitioned
+                RENAME CONSTRAINT {SEGMENTS_TABLE}_pkey TO {SEGMENTS_TABLE}_unpartitioned_pkey;
+            {DROP_SEGMENT_INDEXES_SQL}
+
+            CREATE TABLE {SEGMENTS_TABLE} (LIKE {SEGMENTS_TABLE}_unpartitioned INCLUDING DEFAULTS)
+                PARTITION BY RANGE (created_at);
+            ALTER TABLE {SEGMENTS_TABLE} ADD CONSTRAINT {SEGMENTS_TABLE}_pkey PRIMARY KEY (id, created_at);
+            IF id_sequence IS NOT NULL THEN
+                EXECUTE format('ALTER SEQUENCE %s OWNED BY {SEGMENTS_TABLE}.id', id_sequence);
+            END IF;
+
+            month_start := coalesce(
+                (SELECT date_trunc('month', min(created_at) AT TIME ZONE 'UTC') FROM {SEGMENTS_TABLE}_unpartitioned),
+                date_trunc('month', now() AT TIME ZONE 'UTC')
+            );
+            WHILE month_start <= last_month LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF {SEGMENTS_TABLE} FOR VALUES FROM (%L) TO (%L)',
+                    '{SEGMENTS_TABLE}_p' || to_char(month_start, 'YYYY_MM'),
+                    month_start AT TIME ZONE 'UTC',
+                    (month_start + interval '1 month') AT TIME ZONE 'UTC'
+                );
+                month_start := month_start + interval '1 month';
+            END LOOP;
+            CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {SEGMENTS_TABLE} DEFAULT;
+
+            INSERT INTO {SEGMENTS_TABLE} SELECT * FROM {SEGMENTS_TABLE}_unpartitioned;
+            DROP TABLE {SEGMENTS_TABLE}_unpartitioned;
+            {SEGMENT_INDEXES_SQL}
+        END $$
+    """
+
+
+def missing_partition_statements(existing: set, months_ahead: int, today: Optional[date] = None) -> list:
+    """DDL для недостающих партиций с текущего месяца на months_ahead вперёд (и default)."""
+    current = (today or datetime.now(timezone.utc).date()).replace(day=1)
+    statements = []
+    for offset in range(months_ahead + 1):
+        month = add_months(current, offset)
+        name = partition_name(month)
+        if name in existing:
+            continue
+        statements.append((name, text(_create_partition_sql(name, month))))
+    if DEFAULT_PARTITION not in existing:
+        statements.append((DEFAULT_PARTITION, text(
+            f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF {SEGMENTS_TABLE} DEFAULT"
+        )))
+    return statements
+
+
+async def ensure_segment_partitions(db: AsyncSession, months_ahead: int = SEGMENT_PARTITION_MONTHS_AHEAD) -> list[str]:
+    """Создаёт недостающие партиции. Возвращает имена созданных."""
+    if not await db.scalar(IS_PARTITIONED_SQL):
+        return []
+    await db.execute(LOCK_SQL)
+    existing = set((await db.scalars(PARTITIONS_SQL)).all())
+    created = []
+    for name, statement in missing_partition_statements(existing, months_ahead):
+        await db.execute(statement)
+        created.append(name)
+    await db.commit()
+    return created
+
+
+def ensure_segment_partitions_sync(conn: Connection, months_ahead: int = SEGMENT_PARTITION_MONTHS_AHEAD) -> list[str]:
+    """То же для синхронного соединения (CLI, create_tables.py/init_db); коммит — на вызывающем."""
+    if not conn.execute(IS_PARTITIONED_SQL).scalar():
+        return []
+    conn.execute(LOCK_SQL)
+    existing = set(conn.execute(PARTITIONS_SQL).scalars().all())
+    created = []
+    for name, statement in missing_partition_statements(existing, months_ahead):
+        conn.execute(statement)
+        created.append(name)
+    return created
+
+
+class SegmentPartitionMaintainer:
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self, session_factory: Optional[async_sessionmaker]) -> None:
+        if session_factory is not None:
+            self._task = asyncio.create_task(self._run(session_factory))
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self, session_factory: async_sessionmaker) -> None:
+        while True:
+            try:
+                async with session_factory() as db:
+                    created = await ensure_segment_partitions(db)
+                if created:
+                    logger.info(f"Created transcript segment partitions: {', '.join(created)}")
+            except Exception:
+                # Новые строки копятся в default до следующей удачной попытки
+                logger.exception("Failed to create transcript segment partitions")
+            await asyncio.sleep(SEGMENT_PARTITION_CHECK_SECONDS)
+
+
+segment_partitions = SegmentPartitionMaintainer()
@@ -0,0 +1,99 @@
+# Отзыв JWT без обращения к БД на каждый запрос.
+#
+# Отозванные jti лежат в таблице revoked_tokens, а каждый процесс держит в памяти
+# фильтр Блума по ним, который фоновая задача из lifespan перечитывает раз в
+# TOKEN_REVOCATION_REFRESH_SECONDS. Запрос с токеном, которого в фильтре нет
+# (почти все), проходит без I/O; при попадании в фильтр факт отзыва
+# подтверждается чтением по первичному ключу — это отсекает ложные срабатывания.
+# Отзыв, сделанный в другом процессе, становится виден здесь после очередного
+# обновления фильтра.
+
+import asyncio
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from dapmeet.core.bloom import BloomFilter
+from dapmeet.models.revoked_token import RevokedToken
+
+logger = logging.getLogger(__name__)
+
+TOKEN_REVOCATION_REFRESH_SECONDS = float(os.getenv("TOKEN_REVOCATION_REFRESH_SECONDS", "30"))
+# Запас ёмкости фильтра: отзывы между обновлениями добавляются в него локально
+BLOOM_MIN_CAPACITY = 1024
+
+
+class TokenRevocationList:
+    def __init__(self):
+        self._filter = BloomFilter(BLOOM_MIN_CAPACITY)
+        # Локальные отзывы, ещё не попавшие в перечитанный снимок
+        self._unsynced: set[str] = set()
+        self._task: Optional[asyncio.Task] = None
+        self.loaded_at: Optional[datetime] = None
+
+    def might_be_revoked(self, jti: str) -> bool:
+        return jti in self._filter
+
+    async def is_revoked(self, jti: str, db: AsyncSession) -> bool:
+        if not self.might_be_revoked(jti):
+            return False
+        return await db.get(RevokedToken, jti) is not None
+
+    async def revoke(self, jti: str, expires_at: datetime, db: AsyncSession) -> bool:
+        """Отзывает токен. Возвращает False, если он уже был отозван (например, параллельным запросом)."""
+        result = await db.execute(
+            pg_insert(RevokedToken)
+            .values(jti=jti, expires_at=expires_at)
+            .on_conflict_do_nothing(index_elements=[RevokedToken.jti])
+            .returning(RevokedToken.jti)
+        )
+        revoked = result.scalar_one_or_none() is not None
+        await db.commit()
+        self._filter.add(jti)
+        self._unsynced.add(jti)
+        return revoked
+
+    async def reload(self, db: AsyncSession) -> None:
+        """Перестраивает фильтр по ещё не истёкшим отзывам и чистит истёкшие."""
+        now = datetime.now(timezone.utc)
+        await db.execute(delete(RevokedToken).where(RevokedToken.expires_at <= now))
+        await db.commit()
+        jtis = (await db.scalars(select(RevokedToken.jti).where(RevokedToken.expires_at > now))).all()
+        # Отзывы, сделанные в этом процессе во время чтения, переносим в новый фильтр
+        self._unsynced.difference_update(jtis)
+        bloom = BloomFilter(max(len(jtis) * 2, BLOOM_MIN_CAPACITY))
+        for jti in (*jtis, *self._unsynced):
+            bloom.add(jti)
+        self._filter = bloom
+        self.loaded_at = now
+
+    def start(self, session_factory: Optional[async_sessionmaker]) -> None:
+        if session_factory is not None:
+            self._task = asyncio.create_task(self._run(session_factory))
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self, session_factory: async_sessionmaker) -> None:
+        while True:
+            try:
+                async with session_factory() as db:
+                    await self.reload(db)
+            except Exception as e:
+                # Оставляем прежний фильтр: локальные отзывы в нём уже есть
+                logger.error(f"Failed to reload revoked tokens: {str(e)}")
+            await asyncio.sleep(TOKEN_REVOCATION_REFRESH_SECONDS)
+
+
+token_revocations = TokenRevocationList()
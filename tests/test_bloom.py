@@ -0,0 +1,42 @@
+import asyncio
+import uuid
+
+from dapmeet.core.bloom import BloomFilter
+from dapmeet.services.token_revocation import TokenRevocationList
+
+
+def test_no_false_negatives():
+    bloom = BloomFilter(1000)
+    items = [uuid.uuid4().hex for _ in range(1000)]
+    for item in items:
+        bloom.add(item)
+
+    assert all(item in bloom for item in items)
+    assert bloom.count == 1000
+
+
+def test_false_positive_rate_close_to_target():
+    bloom = BloomFilter(2000, error_rate=0.01)
+    for n in range(2000):
+        bloom.add(f"revoked-{n}")
+
+    false_positives = sum(f"valid-{n}" in bloom for n in range(20000))
+
+    # При заполнении до ёмкости доля ложных срабатываний не выше целевой (с запасом на разброс)
+    assert false_positives / 20000 < 0.02
+
+
+def test_sizing_follows_capacity_and_error_rate():
+    bloom = BloomFilter(1000, error_rate=0.001)
+
+    # m = -n ln p / (ln 2)^2 ≈ 14.4 бита на элемент, k = m/n ln 2 ≈ 10
+    assert 14000 <= bloom.size <= 14500
+    assert bloom.hashes == 10
+    assert "anything" not in BloomFilter(0)
+
+
+def test_unrevoked_token_is_checked_without_database():
+    revocations = TokenRevocationList()
+
+    # Промах фильтра отвечает сразу: сессия БД не нужна
+    assert asyncio.run(revocations.is_revoked(uuid.uuid4().hex, db=None)) is False
@@ -0,0 +1,75 @@
+import types
+
+import pytest
+
+from dapmeet.core import cache
+from dapmeet.core.cache import TTLCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = types.SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(cache, "time", types.SimpleNamespace(monotonic=lambda: clock.now))
+    return clock
+
+
+def test_hit_and_miss_are_counted(clock):
+    ttl_cache = TTLCache(maxsize=10, ttl=30)
+    ttl_cache.set("user-1", {"id": "user-1"})
+
+    assert ttl_cache.get("user-1") == {"id": "user-1"}
+    assert ttl_cache.get("user-2") is None
+    assert ttl_cache.get("user-2", "fallback") == "fallback"
+    stats = ttl_cache.stats()
+    assert (stats["hits"], stats["misses"], stats["hit_ratio"]) == (1, 2, 0.3333)
+
+
+def test_entries_expire_after_ttl(clock):
+    ttl_cache = TTLCache(maxsize=10, ttl=30)
+    ttl_cache.set("a", 1)
+    ttl_cache.set("b", 2, ttl=5)
+
+    clock.now += 5
+    assert ttl_cache.get("b") is None
+    assert ttl_cache.get("a") == 1
+
+    clock.now += 25
+    assert ttl_cache.get("a") is None
+    # Истёкшие записи удаляются при обращении
+    assert len(ttl_cache) == 0
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    ttl_cache = TTLCache(maxsize=2, ttl=30)
+    ttl_cache.set("a", 1)
+    ttl_cache.set("b", 2)
+    ttl_cache.get("a")
+
+    ttl_cache.set("c", 3)
+
+    assert ttl_cache.get("b") is None
+    assert ttl_cache.get("a") == 1
+    assert ttl_cache.get("c") == 3
+
+
+def test_pop_and_clear(clock):
+    ttl_cache = TTLCache(maxsize=10, ttl=30)
+    ttl_cache.set("a", 1)
+    ttl_cache.set("b", 2)
+
+    ttl_cache.pop("a")
+    ttl_cache.pop("missing")
+    assert ttl_cache.get("a") is None and len(ttl_cache) == 1
+
+    ttl_cache.clear()
+    assert len(ttl_cache) == 0
+
+
+@pytest.mark.parametrize("maxsize, ttl", [(0, 30), (10, 0)])
+def test_disabled_cache_never_stores(clock, maxsize, ttl):
+    ttl_cache = TTLCache(maxsize=maxsize, ttl=ttl)
+    ttl_cache.set("a", 1)
+
+    assert not ttl_cache.enabled
+    assert ttl_cache.get("a") is None
+    assert len(ttl_cache) == 0
@@ -0,0 +1,204 @@
+import asyncio
+import time
+import types
+
+import httpx
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa
+from fastapi import HTTPException
+
+from dapmeet.core import cache
+from dapmeet.core.cache import TTLCache
+from dapmeet.services import google_auth_service
+from dapmeet.services.google_auth_service import GoogleJWKS, validate_and_get_user_info, verify_google_id_token
+
+CLIENT_ID = "web-client.apps.googleusercontent.com"
+ACCESS_TOKEN = "opaque-access-token"
+
+USER_INFO = {"id": "1001", "email": "user@example.com", "name": "User"}
+
+
+class Clock:
+    """Подменяет time.monotonic в модулях кэша и авторизации."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    fake_time = types.SimpleNamespace(monotonic=clock.monotonic)
+    monkeypatch.setattr(cache, "time", fake_time)
+    monkeypatch.setattr(google_auth_service, "time", fake_time)
+    return clock
+
+
+@pytest.fixture
+def google(monkeypatch, clock):
+    """Google по httpx.MockTransport; requests — список путей запросов."""
+    monkeypatch.setattr(google_auth_service, "GOOGLE_CLIENT_ID", CLIENT_ID)
+    monkeypatch.setattr(google_auth_service, "GOOGLE_CLIENT_ID_EXTENSION", None)
+    monkeypatch.setattr(google_auth_service, "google_token_cache", TTLCache(maxsize=100, ttl=300))
+
+    state = types.SimpleNamespace(requests=[], audience=CLIENT_ID, expires_in=3600)
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        state.requests.append(request.url.path)
+        if request.url.path.endswith("/tokeninfo"):
+            return httpx.Response(200, json={
+                "audience": state.audience, "scope": "email profile", "expires_in": state.expires_in,
+            })
+        if request.url.path.endswith("/userinfo"):
+            return httpx.Response(200, json=USER_INFO)
+        return httpx.Response(404)
+
+    state.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return state
+
+
+def test_access_token_cache_miss_then_hit(google, clock):
+    first = asyncio.run(validate_and_get_user_info(ACCESS_TOKEN, google.client))
+    assert sorted(google.requests) == ["/oauth2/v1/tokeninfo", "/oauth2/v2/userinfo"]
+    assert first["email"] == USER_INFO["email"]
+
+    clock.advance(100)
+    second = asyncio.run(validate_and_get_user_info(ACCESS_TOKEN, google.client))
+
+    assert len(google.requests) == 2
+    assert second["id"] == USER_INFO["id"]
+    # Оставшееся время жизни считается от момента проверки в Google
+    assert second["token_info"]["expires_in"] == 3500
+
+
+def test_access_token_cache_expires_after_max_ttl(google, clock):
+    asyncio.run(validate_and_get_user_info(ACCESS_TOKEN, google.client))
+
+    clock.advance(google_auth_service.GOOGLE_TOKEN_CACHE_MAX_TTL_SECONDS + 1)
+    asyncio.run(validate_and_get_user_info(ACCESS_TOKEN, google.client))
+
+    assert len(google.requests) == 4
+
+
+def test_access_token_cache_never_outlives_google_expiry(google, clock):
+    google.expires_in = 30
+    asyncio.run(validate_and_get_user_info(ACCESS_TOKEN, google.client))
+
+    clock.advance(31)
+    asyncio.run(validate_and_get_user_info(ACCESS_TOKEN, google.client))
+
+    assert len(google.requests) == 4
+
+
+def test_rejected_access_token_is_not_cached(google, clock):
+    google.audience = "someone-else.apps.googleusercontent.com"
+
+    for _ in range(2):
+        with pytest.raises(HTTPException) as error:
+            asyncio.run(validate_and_get_user_info(ACCESS_TOKEN, google.client))
+        assert error.value.status_code == 401
+
+    assert google.requests.count("/oauth2/v1/tokeninfo") == 2
+
+
+def _rsa_key():
+    return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+
+def _jwk(private_key, kid: str) -> dict:
+    jwk = jwt.algorithms.RSAAlgorithm.to_jwk(private_key.public_key(), as_dict=True)
+    return {**jwk, "kid": kid, "alg": "RS256", "use": "sig"}
+
+
+def _id_token(private_key, kid: str, **claims) -> str:
+    now = int(time.time())
+    payload = {
+        "iss": "https://accounts.google.com",
+        "aud": CLIENT_ID,
+        "sub": USER_INFO["id"],
+        "email": USER_INFO["email"],
+        "email_verified": True,
+        "name": USER_INFO["name"],
+        "iat": now,
+        "exp": now + 3600,
+        **claims,
+    }
+    return jwt.encode(payload, private_key, algorithm="RS256", headers={"kid": kid})
+
+
+@pytest.fixture
+def jwks(monkeypatch, clock):
+    """JWKS Google по httpx.MockTransport; keys — публикуемые ключи, fetches — число загрузок."""
+    monkeypatch.setattr(google_auth_service, "GOOGLE_CLIENT_ID", CLIENT_ID)
+    monkeypatch.setattr(google_auth_service, "GOOGLE_CLIENT_ID_EXTENSION", None)
+    monkeypatch.setattr(google_auth_service, "google_jwks", GoogleJWKS("https://google.test/certs"))
+
+    state = types.SimpleNamespace(keys=[], fetches=0)
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        state.fetches += 1
+        return httpx.Response(200, json={"keys": state.keys}, headers={"Cache-Control": "public, max-age=21600"})
+
+    state.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return state
+
+
+def test_id_token_verified_with_cached_keys(jwks, clock):
+    key = _rsa_key()
+    jwks.keys = [_jwk(key, "k1")]
+
+    for _ in range(3):
+        user_info = asyncio.run(verify_google_id_token(_id_token(key, "k1"), jwks.client))
+        assert user_info["id"] == USER_INFO["id"]
+        assert user_info["verified_email"] is True
+
+    assert jwks.fetches == 1
+
+
+def test_unknown_kid_triggers_refetch(jwks, clock):
+    old_key, new_key = _rsa_key(), _rsa_key()
+    jwks.keys = [_jwk(old_key, "k1")]
+    asyncio.run(verify_google_id_token(_id_token(old_key, "k1"), jwks.client))
+
+    # Google повернул ключи: новый kid подхватывается внеочередной загрузкой
+    jwks.keys = [_jwk(old_key, "k1"), _jwk(new_key, "k2")]
+    clock.advance(google_auth_service.GOOGLE_JWKS_MIN_REFRESH_SECONDS)
+    user_info = asyncio.run(verify_google_id_token(_id_token(new_key, "k2"), jwks.client))
+
+    assert user_info["email"] == USER_INFO["email"]
+    assert jwks.fetches == 2
+
+
+def test_unknown_kid_refetch_is_rate_limited(jwks, clock):
+    key = _rsa_key()
+    jwks.keys = [_jwk(key, "k1")]
+    asyncio.run(verify_google_id_token(_id_token(key, "k1"), jwks.client))
+
+    for _ in range(3):
+        with pytest.raises(HTTPException) as error:
+            asyncio.run(verify_google_id_token(_id_token(_rsa_key(), "forged"), jwks.client))
+        assert error.value.status_code == 401
+
+    assert jwks.fetches == 1
+
+
+@pytest.mark.parametrize("claims", [
+    {"aud": "someone-else.apps.googleusercontent.com"},
+    {"iss": "https://evil.example.com"},
+])
+def test_id_token_with_wrong_audience_or_issuer_is_rejected(jwks, clock, claims):
+    key = _rsa_key()
+    jwks.keys = [_jwk(key, "k1")]
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(verify_google_id_token(_id_token(key, "k1", **claims), jwks.client))
+
+    assert error.value.status_code == 401
+    assert error.value.detail.startswith("ID token validation failed")
@@ -0,0 +1,74 @@
+import time
+from datetime import datetime, timedelta, timezone
+
+from dapmeet.core.hll import HyperLogLog
+from dapmeet.services.activity_metrics import ActiveUsersWindow, DailyCounter
+
+
+def _hll(items) -> HyperLogLog:
+    hll = HyperLogLog()
+    for item in items:
+        hll.add(item)
+    return hll
+
+
+def test_empty_counts_zero():
+    assert HyperLogLog().count() == 0
+
+
+def test_small_sets_are_counted_almost_exactly():
+    assert _hll(["user-1"]).count() == 1
+    assert _hll(f"user-{n}" for n in range(100)).count() in range(98, 103)
+
+
+def test_duplicates_do_not_change_the_count():
+    hll = _hll(f"user-{n % 500}" for n in range(5000))
+    assert abs(hll.count() - 500) <= 500 * 0.05
+
+
+def test_large_set_within_standard_error():
+    # precision=12: стандартная ошибка ~1.6%, допускаем 3 сигмы
+    hll = _hll(f"user-{n}" for n in range(50000))
+    assert abs(hll.count() - 50000) <= 50000 * 0.05
+
+
+def test_merge_is_union():
+    left = _hll(f"user-{n}" for n in range(0, 3000))
+    right = _hll(f"user-{n}" for n in range(2000, 5000))
+
+    left.merge(right)
+
+    assert abs(left.count() - 5000) <= 5000 * 0.05
+
+
+def test_active_users_window_counts_distinct_users_per_window():
+    window = ActiveUsersWindow(max_minutes=60)
+    now = time.time()
+    for n in range(50):
+        window.record(f"user-{n}", now=now - 10 * 60)  # 10 минут назад
+    for n in range(40, 60):
+        window.record(f"user-{n}", now=now)
+
+    assert window.count(5, now=now) == 20
+    assert window.count(15, now=now) == 60
+
+
+def test_active_users_window_drops_stale_buckets():
+    window = ActiveUsersWindow(max_minutes=5)
+    now = time.time()
+    window.record("old", now=now - 10 * 60)
+    window.record("new", now=now)
+
+    assert len(window._buckets) == 1
+    assert window.count(60, now=now) == 1
+
+
+def test_daily_counter_keeps_recent_days():
+    counter = DailyCounter(days_kept=2)
+    today = datetime(2026, 10, 17, 12, tzinfo=timezone.utc)
+    for days_ago in (2, 1, 0, 0):
+        counter.increment(today - timedelta(days=days_ago))
+
+    assert counter.get(today.date()) == 2
+    assert counter.get((today - timedelta(days=1)).date()) == 1
+    assert counter.get((today - timedelta(days=2)).date()) == 0
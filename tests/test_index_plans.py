@@ -0,0 +1,225 @@
+"""
+Планы горячих запросов к сегментам на настоящем Postgres.
+
+Нужна переменная TEST_DATABASE_URL (любая postgres-строка, драйвер подменяется
+на asyncpg); без неё модуль пропускается. Таблицы создаются во временной схеме
+и удаляются после тестов. Seq scan отключён, поэтому тест ловит не выбор
+планировщика на маленьких данных, а отсутствие подходящего индекса или лишнюю сортировку.
+"""
+import asyncio
+import json
+import os
+import uuid
+from contextlib import asynccontextmanager
+
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from dapmeet.db.db import Base
+from dapmeet.models import chat_message, meeting, segment, user  # noqa: F401 — таблицы в Base.metadata
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+pytestmark = pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL is not set")
+
+SEED_SQL = [
+    "INSERT INTO users (id, email) SELECT 'u' || g, 'u' || g || '@example.com' FROM generate_series(1, 20) g",
+    """
+    INSERT INTO meetings (unique_session_id, meeting_id, user_id, title, created_at)
+    SELECT 'm' || g || '-u' || (g % 20 + 1), 'm' || g, 'u' || (g % 20 + 1), 'Meeting ' || g,
+           now() - g * interval '1 minute'
+    FROM generate_series(1, 200) g
+    """,
+    """
+    INSERT INTO transcript_segments
+        (session_id, google_meet_user_id, speaker_username, timestamp, text, version, message_id, created_at)
+    SELECT m.unique_session_id, 'g' || (s % 4), 'Speaker ' || (s % 4), m.created_at + s * interval '1 second',
+           'text ' || s, 1 + s % 3, (s / 3)::text, m.created_at + s * interval '1 second'
+    FROM meetings m, generate_series(1, 100) s
+    """,
+    """
+    INSERT INTO transcript_segments_latest
+        (session_id, google_meet_user_id, message_id, segment_id, speaker_username,
+         timestamp, text, version, created_at, first_seen_at)
+    SELECT DISTINCT ON (session_id, google_meet_user_id, message_id)
+           session_id, google_meet_user_id, message_id, id, speaker_username,
+           timestamp, text, version, created_at, created_at
+    FROM transcript_segments
+    ORDER BY session_id, google_meet_user_id, message_id, version DESC
+    """,
+    "INSERT INTO meeting_speakers (session_id, speaker_username) "
+    "SELECT DISTINCT session_id, speaker_username FROM transcript_segments",
+    "ANALYZE users, meetings, transcript_segments, transcript_segments_latest, meeting_speakers",
+]
+
+SESSION_ID = "m7-u8"
+
+INDEX_FAMILY_SQL = text("""
+    SELECT c.relname
+    FROM pg_inherits i
+    JOIN pg_class c ON c.oid = i.inhrelid
+    WHERE i.inhparent = to_regclass(:name)
+""")
+
+
+def _engine(schema: str):
+    url = make_url(TEST_DATABASE_URL).set(drivername="postgresql+asyncpg")
+    return create_async_engine(
+        url,
+        connect_args={"server_settings": {"search_path": schema, "enable_seqscan": "off"}},
+    )
+
+
+async def _create_schema(schema: str) -> None:
+    from dapmeet.services.segment_partitions import ensure_segment_partitions
+
+    engine = _engine(schema)
+    try:
+        async with engine.begin() as conn:
+            await conn.execute(text(f"CREATE SCHEMA {schema}"))
+            await conn.run_sync(Base.metadata.create_all)
+        async with AsyncSession(engine) as db:
+            await ensure_segment_partitions(db)
+        async with engine.begin() as conn:
+            for statement in SEED_SQL:
+                await conn.execute(text(statement))
+    finally:
+        await engine.dispose()
+
+
+async def _drop_schema(schema: str) -> None:
+    engine = _engine(schema)
+    try:
+        async with engine.begin() as conn:
+            await conn.execute(text(f"DROP SCHEMA IF EXISTS {schema} CASCADE"))
+    finally:
+        await engine.dispose()
+
+
+@pytest.fixture(scope="module")
+def schema():
+    name = f"plan_test_{uuid.uuid4().hex[:8]}"
+    try:
+        asyncio.run(_create_schema(name))
+        yield name
+    finally:
+        asyncio.run(_drop_schema(name))
+
+
+@asynccontextmanager
+async def _captured(engine):
+    """Собирает (SQL, параметры) всех запросов, выполненных внутри блока."""
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(engine.sync_engine, "before_cursor_execute", capture)
+    try:
+        yield statements
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", capture)
+
+
+def _nodes(plan: dict):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from _nodes(child)
+
+
+async def _plan(db: AsyncSession, statement: str, parameters) -> list:
+    conn = await db.connection()
+    result = await conn.exec_driver_sql("EXPLAIN (FORMAT JSON) " + statement, tuple(parameters or ()))
+    value = result.scalar()
+    document = json.loads(value) if isinstance(value, str) else value
+    return list(_nodes(document[0]["Plan"]))
+
+
+async def _index_family(db: AsyncSession, name: str) -> set:
+    """Имя индекса и индексов партиций, созданных из него на секционированной таблице."""
+    return {name} | set((await db.scalars(INDEX_FAMILY_SQL, {"name": name})).all())
+
+
+def _used_indexes(nodes: list) -> set:
+    return {node["Index Name"] for node in nodes if "Index Name" in node}
+
+
+def _run(schema: str, check):
+    async def main():
+        engine = _engine(schema)
+        try:
+            async with AsyncSession(engine) as db:
+                # Соединение открыто заранее, чтобы в перехват попали только запросы сервиса
+                await db.connection()
+                await check(engine, db)
+        finally:
+            await engine.dispose()
+
+    asyncio.run(main())
+
+
+def test_latest_segments_read_in_index_order(schema):
+    from dapmeet.services.meetings import SEGMENT_STORAGE_MODE, MeetingService
+
+    if SEGMENT_STORAGE_MODE != "append":
+        pytest.skip("transcript_segments_latest is used only in append mode")
+
+    async def check(engine, db):
+        async with _captured(engine) as statements:
+            segments = await MeetingService(db).get_latest_segments_for_session(SESSION_ID)
+        assert segments
+        [(statement, parameters)] = statements
+
+        nodes = await _plan(db, statement, parameters)
+
+        assert "ix_transcript_segments_latest_session_order" in _used_indexes(nodes)
+        assert not [node for node in nodes if node["Node Type"] == "Sort"]
+
+    _run(schema, check)
+
+
+def test_speakers_queries_use_indexes(schema):
+    from dapmeet.cmd.segments import BACKFILL_SPEAKERS_SQL
+    from dapmeet.services.meetings import MeetingService
+
+    async def check(engine, db):
+        async with _captured(engine) as statements:
+            speakers = await MeetingService(db).get_speakers(SESSION_ID)
+        assert speakers
+        [(statement, parameters)] = statements
+        nodes = await _plan(db, statement, parameters)
+        assert "meeting_speakers_pkey" in _used_indexes(nodes)
+        assert not [node for node in nodes if node["Node Type"] == "Sort"]
+
+        # Заполнение meeting_speakers из истории: DISTINCT спикеров по индексу (session_id, speaker_username)
+        compiled = BACKFILL_SPEAKERS_SQL.bindparams(session_ids=[SESSION_ID]).compile(dialect=engine.dialect)
+        parameters = [compiled.params[name] for name in compiled.positiontup]
+        nodes = await _plan(db, str(compiled), parameters)
+        family = await _index_family(db, "ix_transcript_segments_session_speaker")
+        assert _used_indexes(nodes) & family
+
+    _run(schema, check)
+
+
+def test_admin_activity_feed_uses_created_at_indexes(schema):
+    from dapmeet.api.admin import dashboard_activity
+
+    async def check(engine, db):
+        async with _captured(engine) as statements:
+            feed = await dashboard_activity(_={}, db=db)
+        assert feed["recent_meetings"] and feed["recent_segments"]
+        meetings_query, segments_query = statements
+
+        nodes = await _plan(db, *meetings_query)
+        assert "ix_meetings_created_at" in _used_indexes(nodes)
+
+        nodes = await _plan(db, *segments_query)
+        family = await _index_family(db, "ix_transcript_segments_created_at")
+        used = _used_indexes(nodes)
+        assert used and used <= family
+        # Партиции читаются по индексу и сливаются без общей сортировки
+        assert not [node for node in nodes if node["Node Type"] == "Sort"]
+
+    _run(schema, check)
@@ -0,0 +1,97 @@
+import asyncio
+import base64
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException, Response
+
+from dapmeet.api import meetings as meetings_api
+from dapmeet.api.meetings import _decode_meetings_cursor, _encode_meetings_cursor, get_meetings
+from dapmeet.schemas.meetings import MeetingOutList
+
+START = datetime(2026, 10, 17, 12, 0, tzinfo=timezone.utc)
+
+MEETINGS = [
+    MeetingOutList(
+        unique_session_id=f"m{n}-u1",
+        meeting_id=f"m{n}",
+        user_id="u1",
+        title=f"Meeting {n}",
+        created_at=START - timedelta(minutes=n),
+    )
+    for n in range(7)
+]
+
+
+class FakeMeetingService:
+    """Отдаёт MEETINGS так же, как get_meetings_with_speakers: от новых к старым, после курсора."""
+
+    calls = []
+
+    def __init__(self, db):
+        pass
+
+    async def get_meetings_with_speakers(self, user_id, limit=None, after=None):
+        FakeMeetingService.calls.append({"limit": limit, "after": after})
+        rows = [m for m in MEETINGS if after is None or (m.created_at, m.unique_session_id) < after]
+        return rows if limit is None else rows[:limit]
+
+
+@pytest.fixture(autouse=True)
+def fake_service(monkeypatch):
+    FakeMeetingService.calls = []
+    monkeypatch.setattr(meetings_api, "MeetingService", FakeMeetingService)
+
+
+def _get(limit=None, cursor=None):
+    response = Response()
+    meetings = asyncio.run(get_meetings(response=response, limit=limit, cursor=cursor, user_id="u1", db=None))
+    return meetings, response.headers.get("X-Next-Cursor")
+
+
+def test_cursor_round_trip():
+    cursor = _encode_meetings_cursor(MEETINGS[3])
+
+    assert _decode_meetings_cursor(cursor) == (MEETINGS[3].created_at, MEETINGS[3].unique_session_id)
+    # Курсор безопасно передаётся в query string
+    assert set(cursor) <= set("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_=")
+
+
+@pytest.mark.parametrize("cursor", [
+    "not base64!",
+    base64.urlsafe_b64encode(b"not json").decode(),
+    base64.urlsafe_b64encode(b'["not a date", "m1-u1"]').decode(),
+    base64.urlsafe_b64encode(b'{"created_at": 1}').decode(),
+])
+def test_invalid_cursor_is_400(cursor):
+    with pytest.raises(HTTPException) as error:
+        _decode_meetings_cursor(cursor)
+    assert error.value.status_code == 400
+
+
+def test_without_limit_and_cursor_returns_everything():
+    meetings, next_cursor = _get()
+
+    assert meetings == MEETINGS
+    assert next_cursor is None
+    assert FakeMeetingService.calls == [{"limit": None, "after": None}]
+
+
+def test_pages_follow_the_cursor_to_the_end():
+    seen = []
+    meetings, next_cursor = _get(limit=3)
+    seen += meetings
+    while next_cursor:
+        meetings, next_cursor = _get(limit=3, cursor=next_cursor)
+        seen += meetings
+
+    assert seen == MEETINGS
+    assert [call["limit"] for call in FakeMeetingService.calls] == [4, 4, 4]
+
+
+def test_cursor_without_limit_uses_default_page_size():
+    _, next_cursor = _get(limit=1)
+
+    _get(cursor=next_cursor)
+
+    assert FakeMeetingService.calls[-1]["limit"] == meetings_api.MEETINGS_PAGE_SIZE + 1
@@ -0,0 +1,123 @@
+import asyncio
+import random
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from dapmeet.core.metrics import (
+    BUCKET_BOUNDS_MS,
+    SUB_BUCKETS,
+    LatencyHistogram,
+    RequestMetrics,
+    RequestMetricsMiddleware,
+)
+
+
+def _exact_quantile(values, q):
+    ordered = sorted(values)
+    return ordered[max(int(q * len(ordered)) - 1, 0)]
+
+
+def test_empty_histogram():
+    histogram = LatencyHistogram()
+    assert histogram.quantile(0.99) == 0.0
+    assert histogram.count == 0
+
+
+@pytest.mark.parametrize("q", [0.5, 0.95, 0.99])
+def test_quantile_relative_error_is_bounded(q):
+    rng = random.Random(42)
+    values = [rng.lognormvariate(3, 1) for _ in range(20000)]
+    histogram = LatencyHistogram()
+    for value in values:
+        histogram.record(value)
+
+    exact = _exact_quantile(values, q)
+    estimate = histogram.quantile(q)
+
+    # Оценка — верхняя граница корзины: не меньше точного значения и не дальше ширины корзины
+    assert exact <= estimate <= exact * (1 + 1 / SUB_BUCKETS) + 1e-9
+
+
+def test_quantile_never_exceeds_max():
+    histogram = LatencyHistogram()
+    for value in (1.01, 1.02, 1.03):
+        histogram.record(value)
+    assert histogram.quantile(0.99) == 1.03
+
+    histogram.record(BUCKET_BOUNDS_MS[-1] * 10)
+    assert histogram.quantile(1.0) == BUCKET_BOUNDS_MS[-1] * 10
+
+
+def test_merge_equals_recording_everything_in_one():
+    left, right, both = LatencyHistogram(), LatencyHistogram(), LatencyHistogram()
+    for n in range(1, 500):
+        (left if n % 2 else right).record(n / 3)
+        both.record(n / 3)
+
+    left.merge(right)
+
+    assert left.counts == both.counts
+    assert left.count == both.count
+    assert left.max_ms == both.max_ms
+    assert left.quantile(0.95) == both.quantile(0.95)
+
+
+def test_snapshot_and_prometheus_output():
+    metrics = RequestMetrics()
+    metrics.record("GET", "/api/meetings/{meeting_id}", 200, 12.0)
+    metrics.record("GET", "/api/meetings/{meeting_id}", 500, 30.0)
+    metrics.record("POST", '/odd"route', 404, 5.0)
+
+    snapshot = metrics.snapshot()
+    assert snapshot["requests"] == 3
+    assert snapshot["status"] == {"2xx": 1, "3xx": 0, "4xx": 1, "5xx": 1}
+    assert snapshot["routes"][0]["route"] == "/api/meetings/{meeting_id}"
+    assert snapshot["routes"][0]["error_rate"] == 0.5
+
+    text = metrics.render_prometheus()
+    assert 'http_requests_total{method="GET",route="/api/meetings/{meeting_id}",status="5xx"} 1' in text
+    assert 'route="/odd\\"route"' in text
+
+
+def test_middleware_records_route_template():
+    metrics = RequestMetrics()
+    app = FastAPI()
+    app.add_middleware(RequestMetricsMiddleware, metrics=metrics)
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: int):
+        return {"id": item_id}
+
+    with TestClient(app) as client:
+        for item_id in (1, 2, 3):
+            assert client.get(f"/items/{item_id}").status_code == 200
+        assert client.get("/nowhere").status_code == 404
+
+    assert metrics.routes[("GET", "/items/{item_id}")].latency.count == 3
+    assert metrics.routes[("GET", "unmatched")].status_classes["4xx"] == 1
+
+
+def test_middleware_excludes_stream_lifetime_from_latency():
+    metrics = RequestMetrics()
+    app = FastAPI()
+    app.add_middleware(RequestMetricsMiddleware, metrics=metrics)
+
+    @app.get("/stream")
+    async def stream():
+        async def events():
+            for n in range(3):
+                await asyncio.sleep(0.2)
+                yield f"data: {n}\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    with TestClient(app) as client:
+        assert client.get("/stream").text.count("data:") == 3
+
+    # Поток жил ~600 мс, а в гистограмму попало только время до начала ответа
+    latency = metrics.routes[("GET", "/stream")].latency
+    assert latency.count == 1
+    assert latency.sum_ms < 200
@@ -0,0 +1,25 @@
+import sqlite3
+
+from dapmeet.db import pool as pool_module
+from dapmeet.db.pool import InstrumentedAsyncPool, PoolMetrics
+
+
+def test_snapshot_reports_configured_limits(monkeypatch):
+    metrics = PoolMetrics()
+    monkeypatch.setattr(pool_module, "pool_metrics", metrics)
+
+    pool = InstrumentedAsyncPool(lambda: sqlite3.connect(":memory:"), pool_size=2, max_overflow=3, timeout=5)
+    connection = pool.connect()
+    snapshot = metrics.snapshot()
+    connection.close()
+
+    assert snapshot["size"] == 2
+    assert snapshot["max_overflow"] == 3
+    assert snapshot["timeout_seconds"] == 5
+    assert snapshot["in_use"] == 1
+    assert snapshot["checkouts"] == 1 and snapshot["connects"] == 1
+
+    # dispose() пересоздаёт пул с теми же лимитами
+    recreated = pool.recreate()
+    assert metrics.pool is recreated
+    assert metrics.snapshot()["max_overflow"] == 3
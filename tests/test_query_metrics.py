@@ -0,0 +1,56 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import insert, select
+from sqlalchemy.dialects.postgresql import asyncpg
+
+from dapmeet.core.query_metrics import normalize_statement
+from dapmeet.models import chat_message, user  # noqa: F401 — регистрация мапперов
+from dapmeet.models.meeting import Meeting
+from dapmeet.models.segment import TranscriptSegment
+
+
+def _asyncpg_sql(statement) -> str:
+    """SQL в том виде, в каком его получает cursor.execute у asyncpg."""
+    return str(statement.compile(dialect=asyncpg.dialect(), compile_kwargs={"render_postcompile": True}))
+
+
+def _segment_row(n: int) -> dict:
+    return {
+        "session_id": "s",
+        "google_meet_user_id": "g",
+        "speaker_username": "u",
+        "timestamp": datetime(2026, 10, 17, tzinfo=timezone.utc),
+        "text": f"text {n}",
+        "version": 1,
+        "message_id": str(n),
+    }
+
+
+def test_multirow_insert_collapses_regardless_of_row_count():
+    two = _asyncpg_sql(insert(TranscriptSegment).values([_segment_row(1), _segment_row(2)]))
+    five = _asyncpg_sql(insert(TranscriptSegment).values([_segment_row(n) for n in range(5)]))
+    assert "$4::TIMESTAMP WITH TIME ZONE" in two
+
+    normalized = normalize_statement(two)
+
+    assert normalized == normalize_statement(five)
+    assert normalized.endswith("VALUES (...)")
+
+
+def test_in_list_collapses_regardless_of_length():
+    def in_list(ids):
+        return _asyncpg_sql(select(Meeting.title).where(Meeting.unique_session_id.in_(ids)))
+
+    two, three = in_list(["a", "b"]), in_list(["a", "b", "c"])
+    assert "IN ($1::VARCHAR, $2::VARCHAR, $3::VARCHAR)" in three
+
+    assert normalize_statement(two) == normalize_statement(three)
+    assert normalize_statement(three).endswith("IN (...)")
+
+
+def test_literals_are_replaced():
+    assert normalize_statement("SELECT * FROM t WHERE a = 'x''y' AND b > 10\n  LIMIT 5") == (
+        "SELECT * FROM t WHERE a = ? AND b > ? LIMIT ?"
+    )
+    # Номера параметров asyncpg не литералы
+    assert normalize_statement("SELECT $12::INTEGER") == "SELECT $12::INTEGER"
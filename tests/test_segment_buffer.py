@@ -0,0 +1,66 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+from dapmeet.services import segment_buffer
+from dapmeet.services.segment_buffer import SegmentWriteBuffer
+
+
+class FakeMeetingService:
+    """Вместо записи в БД запоминает пачки; пачка со встречей "deleted" падает целиком."""
+    written = []
+
+    def __init__(self, db):
+        pass
+
+    async def insert_segment_rows(self, rows):
+        if any(row["session_id"] == "deleted" for row in rows):
+            raise RuntimeError("violates foreign key constraint")
+        FakeMeetingService.written.append(rows)
+        return rows
+
+
+@asynccontextmanager
+async def fake_session():
+    yield None
+
+
+def make_buffer(monkeypatch):
+    FakeMeetingService.written = []
+    monkeypatch.setattr(segment_buffer, "MeetingService", FakeMeetingService)
+    return SegmentWriteBuffer(fake_session, flush_max_rows=100)
+
+
+def test_flush_writes_batch_in_one_insert(monkeypatch):
+    buffer = make_buffer(monkeypatch)
+    rows = [{"session_id": "a", "n": 1}, {"session_id": "b", "n": 2}]
+    assert buffer.enqueue(rows)
+
+    asyncio.run(buffer._flush_pending())
+
+    assert FakeMeetingService.written == [rows]
+    stats = buffer.stats()
+    assert (stats["flushed_rows"], stats["dropped_rows"], stats["failed_flushes"]) == (2, 0, 0)
+
+
+def test_failed_batch_is_retried_per_meeting(monkeypatch):
+    buffer = make_buffer(monkeypatch)
+    rows = [
+        {"session_id": "a", "n": 1},
+        {"session_id": "deleted", "n": 2},
+        {"session_id": "b", "n": 3},
+        {"session_id": "a", "n": 4},
+    ]
+    buffer.enqueue(rows)
+
+    asyncio.run(buffer._flush_pending())
+
+    # Строки встреч a и b записаны, порядок внутри встречи сохранён
+    assert FakeMeetingService.written == [
+        [{"session_id": "a", "n": 1}, {"session_id": "a", "n": 4}],
+        [{"session_id": "b", "n": 3}],
+    ]
+    stats = buffer.stats()
+    assert stats["flushed_rows"] == 3
+    assert stats["dropped_rows"] == 1
+    assert stats["failed_flushes"] == 1
+    assert stats["queue_depth"] == 0
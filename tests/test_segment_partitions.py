@@ -0,0 +1,75 @@
+from datetime import date
+
+from dapmeet.services.segment_partitions import (
+    DEFAULT_PARTITION,
+    add_months,
+    missing_partition_statements,
+    parse_partition_month,
+    partition_name,
+    partition_table_sql,
+)
+
+
+def test_add_months_rolls_over_year():
+    assert add_months(date(2026, 11, 1), 1) == date(2026, 12, 1)
+    assert add_months(date(2026, 11, 1), 2) == date(2027, 1, 1)
+    assert add_months(date(2027, 1, 1), -1) == date(2026, 12, 1)
+
+
+def test_partition_name_round_trip():
+    assert partition_name(date(2026, 10, 1)) == "transcript_segments_p2026_10"
+    assert parse_partition_month("transcript_segments_p2026_10") == date(2026, 10, 1)
+    assert parse_partition_month(DEFAULT_PARTITION) is None
+    assert parse_partition_month("transcript_segments_p2026_13") is None
+
+
+def test_missing_partitions_from_scratch():
+    statements = missing_partition_statements(set(), 2, today=date(2026, 11, 17))
+
+    assert [name for name, _ in statements] == [
+        "transcript_segments_p2026_11",
+        "transcript_segments_p2026_12",
+        "transcript_segments_p2027_01",
+        DEFAULT_PARTITION,
+    ]
+    december = str(statements[1][1])
+    assert "FOR VALUES FROM ('2026-12-01 00:00:00+00') TO ('2027-01-01 00:00:00+00')" in december
+    assert str(statements[-1][1]).endswith("PARTITION OF transcript_segments DEFAULT")
+
+
+def test_missing_partitions_skips_existing():
+    existing = {"transcript_segments_p2026_10", "transcript_segments_p2026_11", DEFAULT_PARTITION}
+
+    statements = missing_partition_statements(existing, 2, today=date(2026, 10, 31))
+
+    assert [name for name, _ in statements] == ["transcript_segments_p2026_12"]
+
+
+def test_missing_partitions_nothing_to_do():
+    existing = {"transcript_segments_p2026_10", DEFAULT_PARTITION}
+
+    assert missing_partition_statements(existing, 0, today=date(2026, 10, 1)) == []
+
+
+def test_month_rows_are_moved_out_of_default():
+    (name, statement), _ = missing_partition_statements(set(), 0, today=date(2026, 10, 5))
+    sql = str(statement)
+    in_range = "created_at >= '2026-10-01 00:00:00+00' AND created_at < '2026-11-01 00:00:00+00'"
+
+    # Строки месяца из default переносятся в новую таблицу, и только потом она подключается
+    assert f"LOCK TABLE {DEFAULT_PARTITION} IN ACCESS EXCLUSIVE MODE" in sql
+    assert f"DELETE FROM {DEFAULT_PARTITION} WHERE {in_range} RETURNING *" in sql
+    assert sql.index(f"INSERT INTO {name} SELECT * FROM moved") < sql.index(f"ATTACH PARTITION {name}")
+    # Без строк в default — обычное создание партиции
+    assert f"CREATE TABLE {name} PARTITION OF transcript_segments" in sql
+
+
+def test_partition_table_sql_is_guarded():
+    sql = partition_table_sql(3)
+
+    assert "interval '3 months'" in sql
+    # Повторный запуск и режим upsert выходят до блокировки таблицы
+    assert sql.index("already partitioned") < sql.index("LOCK TABLE transcript_segments")
+    assert sql.index("uq_transcript_segments_message") < sql.index("LOCK TABLE transcript_segments")
+    assert "PRIMARY KEY (id, created_at)" in sql
+    assert f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF transcript_segments DEFAULT" in sql
@@ -0,0 +1,100 @@
+import types
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from dapmeet.api import meetings as meetings_api
+from dapmeet.core.deps import get_async_db
+
+SESSION_ID = "m1-u1"
+
+FRAME = {
+    "seq": 1,
+    "google_meet_user_id": "g1",
+    "username": "Speaker",
+    "timestamp": "2026-10-17T12:00:00.000Z",
+    "text": "hello",
+    "ver": 1,
+    "mess_id": "1",
+}
+
+
+class FakeDb:
+    async def commit(self):
+        pass
+
+    async def rollback(self):
+        pass
+
+
+class FakeMeetingService:
+    """Запоминает сохранённые кадры; fail — исключение, которое бросит add_segments."""
+
+    stored = []
+    fail = None
+
+    def __init__(self, db):
+        pass
+
+    async def get_meeting_by_session_id(self, session_id, user_id):
+        return types.SimpleNamespace(unique_session_id=SESSION_ID)
+
+    async def add_segments(self, session_id, segments):
+        if FakeMeetingService.fail is not None:
+            raise FakeMeetingService.fail
+        FakeMeetingService.stored.extend(segments)
+        return [types.SimpleNamespace(id=100 + frame.seq) for frame in segments]
+
+
+@pytest.fixture
+def client(monkeypatch):
+    async def stream_user_id(*args):
+        return "u1"
+
+    async def fake_db():
+        yield FakeDb()
+
+    FakeMeetingService.stored = []
+    FakeMeetingService.fail = None
+    monkeypatch.setattr(meetings_api, "MeetingService", FakeMeetingService)
+    monkeypatch.setattr(meetings_api, "_stream_user_id", stream_user_id)
+    # Без таймера: пачка пишется по WS_FLUSH_MAX_FRAMES или при закрытии
+    monkeypatch.setattr(meetings_api, "WS_FLUSH_INTERVAL_SECONDS", 60)
+
+    app = FastAPI()
+    app.include_router(meetings_api.router, prefix="/api/meetings")
+    app.dependency_overrides[get_async_db] = fake_db
+    with TestClient(app) as client:
+        yield client
+
+
+def test_binary_frame_gets_error_ack(client):
+    with client.websocket_connect("/api/meetings/m1/segments/ws?ticket=t") as ws:
+        ws.send_bytes(b"\x00\x01")
+        [ack] = ws.receive_json()
+        assert ack == {"seq": None, "status": "error", "detail": "Binary frames are not supported"}
+
+        # Поток продолжает работать
+        ws.send_text("not json")
+        [ack] = ws.receive_json()
+        assert ack["status"] == "error"
+
+
+def test_pending_frames_are_stored_on_disconnect(client):
+    with client.websocket_connect("/api/meetings/m1/segments/ws?ticket=t") as ws:
+        ws.send_json(FRAME)
+        ws.send_json({**FRAME, "seq": 2, "ver": 2})
+
+    assert [frame.seq for frame in FakeMeetingService.stored] == [1, 2]
+
+
+def test_storage_error_is_acked(client, monkeypatch):
+    monkeypatch.setattr(meetings_api, "WS_FLUSH_MAX_FRAMES", 1)
+    FakeMeetingService.fail = RuntimeError("boom")
+
+    with client.websocket_connect("/api/meetings/m1/segments/ws?ticket=t") as ws:
+        ws.send_json(FRAME)
+        [ack] = ws.receive_json()
+
+    assert ack == {"seq": 1, "status": "error", "detail": "Failed to store segment"}
@@ -0,0 +1,124 @@
+import asyncio
+import logging
+
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+from dapmeet.api import meetings
+from dapmeet.core.deps import get_async_db
+from dapmeet.core.log_filters import RedactQuerySecretsFilter, redact_query_secrets
+from dapmeet.services import auth
+from dapmeet.services.auth import generate_stream_ticket, redeem_stream_ticket
+
+USER_ID = "u1"
+MEETING_ID = "meet-abc-u1"
+
+
+class FakeRevocations:
+    """Отзывы в памяти вместо таблицы revoked_tokens."""
+
+    def __init__(self):
+        self.jtis = set()
+
+    async def revoke(self, jti, expires_at, db) -> bool:
+        if jti in self.jtis:
+            return False
+        self.jtis.add(jti)
+        return True
+
+
+@pytest.fixture
+def revocations(monkeypatch):
+    monkeypatch.setattr(auth, "JWT_SECRET", "test-secret")
+    revocations = FakeRevocations()
+    monkeypatch.setattr(auth, "token_revocations", revocations)
+    return revocations
+
+
+def test_ticket_is_redeemed_once(revocations):
+    ticket = generate_stream_ticket(USER_ID, MEETING_ID)
+
+    payload = asyncio.run(redeem_stream_ticket(ticket, MEETING_ID, db=None))
+    assert payload["sub"] == USER_ID
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(redeem_stream_ticket(ticket, MEETING_ID, db=None))
+    assert error.value.status_code == 401
+    assert error.value.detail == "Stream ticket has already been used"
+
+
+def test_ticket_is_bound_to_meeting(revocations):
+    ticket = generate_stream_ticket(USER_ID, MEETING_ID)
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(redeem_stream_ticket(ticket, "other-meeting-u1", db=None))
+
+    assert error.value.detail == "Invalid stream ticket"
+    # Билет чужой встречи не гасится
+    assert not revocations.jtis
+
+
+def test_ticket_is_not_an_access_token(revocations):
+    ticket = generate_stream_ticket(USER_ID, MEETING_ID)
+
+    with pytest.raises(HTTPException) as error:
+        auth.decode_token(ticket)
+
+    assert error.value.detail == "Invalid token type"
+
+
+def test_access_token_is_not_a_ticket(revocations):
+    access_token = auth.jwt.encode({"sub": USER_ID, "sid": MEETING_ID, "jti": "j1", "exp": 2**31}, "test-secret")
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(redeem_stream_ticket(access_token, MEETING_ID, db=None))
+
+    assert error.value.detail == "Invalid token type"
+
+
+def test_expired_ticket_is_rejected(revocations, monkeypatch):
+    monkeypatch.setattr(auth, "STREAM_TICKET_TTL_SECONDS", -1)
+    ticket = generate_stream_ticket(USER_ID, MEETING_ID)
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(redeem_stream_ticket(ticket, MEETING_ID, db=None))
+
+    assert error.value.detail == "Token has expired"
+
+
+def test_sse_rejects_used_ticket(revocations):
+    async def fake_db():
+        yield None
+
+    app = FastAPI()
+    app.include_router(meetings.router, prefix="/api/meetings")
+    app.dependency_overrides[get_async_db] = fake_db
+    ticket = generate_stream_ticket(USER_ID, MEETING_ID)
+    asyncio.run(redeem_stream_ticket(ticket, MEETING_ID, db=None))
+
+    with TestClient(app) as client:
+        response = client.get(f"/api/meetings/{MEETING_ID}/segments/stream", params={"ticket": ticket})
+
+    # Переподключение EventSource со старым билетом: клиент должен взять новый
+    assert response.status_code == 401
+    assert response.json()["detail"] == "Stream ticket has already been used"
+
+
+@pytest.mark.parametrize("path, expected", [
+    ("/api/meetings/m1/segments/ws?token=eyJ.abc.def", "/api/meetings/m1/segments/ws?token=***"),
+    ("/api/meetings/m1/segments/stream?since=5&ticket=eyJ.x&x=1", "/api/meetings/m1/segments/stream?since=5&ticket=***&x=1"),
+    ("/api/meetings?limit=20", "/api/meetings?limit=20"),
+])
+def test_redact_query_secrets(path, expected):
+    assert redact_query_secrets(path) == expected
+
+
+def test_access_log_filter_redacts_path():
+    record = logging.LogRecord(
+        "uvicorn.access", logging.INFO, __file__, 1, '%s - "%s %s HTTP/%s" %d',
+        ("127.0.0.1:5000", "GET", "/api/meetings/m1/segments/ws?token=secret", "1.1", 101), None,
+    )
+
+    assert RedactQuerySecretsFilter().filter(record)
+    assert "secret" not in record.getMessage()